@@ -14,10 +14,11 @@ def create_app():
     #キャッシュの設定
     cache_config = {
         # Redisをバックエンドに使用
-        "CACHE_TYPE": "redis",
+        "CACHE_TYPE": "RedisCache",
         # Redisの接続先URL (ローカルのデフォルトポート)
         "CACHE_REDIS_URL": "redis://localhost:6379/0",
-        # キャッシュのデフォルト有効期限 (秒)。今回は関数デコレーターで指定するため不要だが、設定しておく。
+        # キャッシュのデフォルト有効期限 (秒)。ペイロードはデータバージョン付きのキーで
+        # 関数デコレーター側の PAYLOAD_CACHE_TIMEOUT を使うため、ここは既定値のみ。
         "CACHE_DEFAULT_TIMEOUT": 300 
     }
 
@@ -39,6 +40,15 @@ def create_app():
     from app.utils.db_manager import init_db
     init_db(base_dir)
 
+    # インデックスの不足を起動時に報告する（作成はアップロード時に自動で行われる）
+    from app.utils.data_loader import find_missing_indexes
+    try:
+        missing_indexes = find_missing_indexes()
+        for table_name, index_names in missing_indexes.items():
+            app.logger.warning(f"Missing indexes on {table_name}: {', '.join(index_names)}")
+    except Exception as e:
+        app.logger.warning(f"Index check skipped: {e}")
+
     # まとめて Flask に登録
     for key, value in settings.items():
         app.config[key.upper()] = value
@@ -14,6 +14,7 @@ import json
 
 from app.utils.dashboard_utility import make_vector, graph_individual_setting
 from app import cache
+from app.routes.routes_helper import PAYLOAD_CACHE_TIMEOUT, versioned_cache_key
 from app.utils.calculation import cal_total_return, cal_sharpe_ratio
 from app.utils.dashboard_utility import get_map_jp_to_en_sub_type
 from .Alloction_Matrix_service_detail import (
@@ -374,7 +375,7 @@ def _build_liquidity_horizon(df_collection_latest, df_asset_attribute, df_item_a
     json_str = json.dumps(fig_dict, default=str)
     return json_str
 
-@cache.cached(timeout=300)  # 300秒間（5分間）キャッシュを保持する
+@cache.cached(timeout=PAYLOAD_CACHE_TIMEOUT, make_cache_key=versioned_cache_key("build_Allocation_Matrix_payload"))  # データバージョンごとにキャッシュを保持する
 def build_Allocation_Matrix_payload(include_graphs: bool = True, include_summary: bool = True) -> Dict[str, Any]:
 
     print("--- [CACHE MISS] Running heavy calculation for build_Allocation_Matrix_payload ---")
@@ -1,7 +1,9 @@
 from app.utils.data_loader import (
     get_latest_date,
     query_table_aggregated,
-    get_raw_table
+    query_table_columns,
+    table_exists,
+    get_attribute_table
 )
 from typing import Dict, Any
 import numpy as np
@@ -15,7 +17,7 @@ from app.utils.dashboard_utility import make_vector, graph_individual_setting
 from app import cache
 from app.utils.calculation import cal_total_return, cal_sharpe_ratio
 from app.utils.dashboard_utility import get_map_jp_to_en_sub_type
-from app.routes.routes_helper import key_generator_with_params
+from app.routes.routes_helper import key_generator_with_params, PAYLOAD_CACHE_TIMEOUT
 
 def read_table_from_db():
     # 12か月前の月初を計算
@@ -24,20 +26,30 @@ def read_table_from_db():
         (latest_date - pd.DateOffset(months=12)).replace(day=1),
         pd.to_datetime("2024-10-01")
     )
-    df_asset_profit = query_table_aggregated(
-        table_name="asset_profit_detail",
-        aggregates={
-            "資産タイプ": "MAX",
-            "資産額": "SUM",
-            "トータルリターン": "SUM",
-            "取得価格": "SUM",
-        },
-        group_by=["date","資産サブタイプ"],
-        start_date=start_date,
-        end_date=latest_date,
-        filters=None,
-        order_by=["date"]
-    )
+    if table_exists("subtype_cache_daily"):
+        # バッチで集計済みの資産サブタイプ別キャッシュを読む
+        df_asset_profit = query_table_columns(
+            table_name="subtype_cache_daily",
+            columns=["date", "資産サブタイプ", "資産タイプ", "資産額", "トータルリターン", "取得価格"],
+            start_date=start_date,
+            end_date=latest_date,
+            order_by=["date"]
+        )
+    else:
+        df_asset_profit = query_table_aggregated(
+            table_name="asset_profit_detail",
+            aggregates={
+                "資産タイプ": "MAX",
+                "資産額": "SUM",
+                "トータルリターン": "SUM",
+                "取得価格": "SUM",
+            },
+            group_by=["date","資産サブタイプ"],
+            start_date=start_date,
+            end_date=latest_date,
+            filters=None,
+            order_by=["date"]
+        )
 
     df_asset_profit_latest = query_table_aggregated(
         table_name="asset_profit_detail",
@@ -54,9 +66,9 @@ def read_table_from_db():
     )
     #print(df_asset_profit_latest)
 
-    df_item_attribute = get_raw_table("item_attribute")
+    df_item_attribute = get_attribute_table("item_attribute")
 
-    df_asset_attribute = get_raw_table("asset_attribute")
+    df_asset_attribute = get_attribute_table("asset_attribute")
 
     return df_asset_profit, df_asset_profit_latest, df_item_attribute, df_asset_attribute
 
@@ -86,7 +98,7 @@ def get_liquidity_horizon_master_data(df_collection_latest, df_asset_attribute,
     
     return df_master
 
-@cache.cached(timeout=300, make_cache_key=key_generator_with_params)  # 300秒間（5分間）キャッシュを保持する
+@cache.cached(timeout=PAYLOAD_CACHE_TIMEOUT, make_cache_key=key_generator_with_params)  # データバージョンごとにキャッシュを保持する
 def liquidity_horizon_detail(graph_id: str, params: Dict[str, Any]):
 
     print("--- [CACHE MISS] Running heavy calculation for build_dashboard_payload ---")
@@ -2,7 +2,10 @@ from app.utils.data_loader import (
     get_latest_date,
     query_table_date_filter,
     query_table_aggregated,
-    get_raw_table
+    query_table_columns,
+    table_exists,
+    get_attribute_table,
+    densify_date_grid
 )
 import pandas as pd
 
@@ -17,25 +20,42 @@ def read_table_from_db():
     end_date = latest_date + pd.DateOffset(months=36)
     
     df_balance = query_table_date_filter("balance_detail", start_date, end_date)
+    # 0 の行は保存されていないので、目標の期間の終わり（end_date の前日）まで日付 × 収支項目の格子に戻す
+    # （目標のない月も月次集計から抜けないようにする）
+    df_balance = densify_date_grid(
+        df_balance, start_date, end_date - pd.Timedelta(days=1),
+        ["収支項目", "収支タイプ", "収支カテゴリー"], {"金額": 0}
+    )
     #print(df_balance)
     
     # attribute
-    df_item_attribute = get_raw_table("item_attribute")
+    df_item_attribute = get_attribute_table("item_attribute")
     
     # 最新の生活防衛資金
     sub_types = df_item_attribute.loc[df_item_attribute["資産目的"] == "Emergency Buffer","項目"].unique().tolist()
     
-    df_emergency_buffer = query_table_aggregated(
-        table_name="asset_profit_detail",
-        aggregates={
-            "資産額": "SUM",
-        },
-        group_by=["date"],
-        start_date=latest_date-pd.DateOffset(months=7),
-        end_date=latest_date,
-        filters={"資産サブタイプ": sub_types},
-        order_by=["date"]
-    )
+    if table_exists("subtype_cache_daily"):
+        # 集計済みの資産サブタイプ別キャッシュから日次合計を作る
+        df_emergency_buffer = query_table_columns(
+            table_name="subtype_cache_daily",
+            columns=["date", "資産額"],
+            start_date=latest_date-pd.DateOffset(months=7),
+            end_date=latest_date,
+            filters={"資産サブタイプ": sub_types},
+            order_by=["date"]
+        ).groupby("date", as_index=False)["資産額"].sum()
+    else:
+        df_emergency_buffer = query_table_aggregated(
+            table_name="asset_profit_detail",
+            aggregates={
+                "資産額": "SUM",
+            },
+            group_by=["date"],
+            start_date=latest_date-pd.DateOffset(months=7),
+            end_date=latest_date,
+            filters={"資産サブタイプ": sub_types},
+            order_by=["date"]
+        )
     #print(df_emergency_buffer)
     
     return df_balance, df_item_attribute, df_emergency_buffer
\ No newline at end of file
@@ -1,6 +1,9 @@
 from app.utils.data_loader import (
     get_latest_date,
     query_table_aggregated,
+    query_table_columns,
+    table_exists,
+    densify_date_grid,
 )
 from typing import Dict, Any
 import numpy as np
@@ -10,6 +13,7 @@ import plotly.graph_objects as go
 import plotly.io as pio
 import json
 from app import cache
+from app.routes.routes_helper import PAYLOAD_CACHE_TIMEOUT, versioned_cache_key
 
 from app.utils.dashboard_utility import (
     make_vector,
@@ -18,13 +22,22 @@ from app.utils.dashboard_utility import (
 )
 
 
-def _read_table_from_db():
-    # 12か月前の月初を計算
-    latest_date = get_latest_date()
-    start_date = max(
-        (latest_date - pd.DateOffset(months=12)).replace(day=1),
-        pd.to_datetime("2024-10-01")
-    )
+def _read_asset_totals(start_date, latest_date):
+    # 日次の資産合計（実績・目標）
+    # バッチで作成した集計済みキャッシュがあればそれを読み、無ければ明細を集計する
+    if table_exists("category_cache_daily"):
+        df = query_table_columns(
+            table_name="category_cache_daily",
+            columns=["date", "資産_実績_資産額", "資産_実績_トータルリターン", "資産_目標_資産額", "資産_目標_トータルリターン"],
+            start_date=start_date,
+            end_date=latest_date,
+            order_by=["date"]
+        ).rename(columns={
+            "資産_実績_資産額": "実績_資産額", "資産_実績_トータルリターン": "実績_トータルリターン",
+            "資産_目標_資産額": "目標_資産額", "資産_目標_トータルリターン": "目標_トータルリターン",
+        }).set_index("date")
+        return df[["実績_資産額", "実績_トータルリターン"]], df[["目標_資産額", "目標_トータルリターン"]]
+
     df_asset_profit = query_table_aggregated(
         table_name="asset_profit_detail",
         aggregates={
@@ -37,18 +50,6 @@ def _read_table_from_db():
         filters=None,
         order_by=["date"]
     ).rename(columns={"資産額": "実績_資産額", "トータルリターン": "実績_トータルリターン"}).set_index("date")
-    df_balance = query_table_aggregated(
-        table_name="balance_detail",
-        aggregates={
-            "金額": "SUM",
-            "目標": "SUM"
-        },
-        group_by=["date", "収支タイプ", "収支カテゴリー"],
-        start_date=start_date,
-        end_date=latest_date,
-        filters=None,
-        order_by=["date"]
-    ).set_index("date")
     df_target = query_table_aggregated(
         table_name="target_asset_profit",
         aggregates={
@@ -61,6 +62,32 @@ def _read_table_from_db():
         filters=None,
         order_by=["date"]
     ).rename(columns={"資産額": "目標_資産額", "トータルリターン": "目標_トータルリターン"}).set_index("date")
+    return df_asset_profit, df_target
+
+def _read_table_from_db():
+    # 12か月前の月初を計算
+    latest_date = get_latest_date()
+    start_date = max(
+        (latest_date - pd.DateOffset(months=12)).replace(day=1),
+        pd.to_datetime("2024-10-01")
+    )
+    df_asset_profit, df_target = _read_asset_totals(start_date, latest_date)
+    df_balance = query_table_aggregated(
+        table_name="balance_detail",
+        aggregates={
+            "金額": "SUM",
+            "目標": "SUM"
+        },
+        group_by=["date", "収支タイプ", "収支カテゴリー"],
+        start_date=start_date,
+        end_date=latest_date,
+        filters=None,
+        order_by=["date"]
+    )
+    # 0 の行は保存されていないので、日付 × 収支タイプ・カテゴリーの格子に戻す
+    df_balance = densify_date_grid(
+        df_balance, start_date, latest_date, ["収支タイプ", "収支カテゴリー"], {"金額": 0}
+    ).set_index("date")
 
     df = pd.concat([df_asset_profit, df_balance, df_target], axis=1)
     #print(df)
@@ -287,7 +314,7 @@ def _build_special_balance(df_collection):
     #fig.show()
     return json_str
 
-@cache.cached(timeout=300)  # 300秒間（5分間）キャッシュを保持する
+@cache.cached(timeout=PAYLOAD_CACHE_TIMEOUT, make_cache_key=versioned_cache_key("build_PCC_payload"))  # データバージョンごとにキャッシュを保持する
 def build_PCC_payload(include_graphs: bool = True, include_summary: bool = True) -> Dict[str, Any]:
     print("--- [CACHE MISS] Running heavy calculation for build_PCC_payload ---")
     
@@ -1,60 +1,350 @@
 from flask import Blueprint, request, jsonify, current_app
 import os
-import io
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import tempfile
+from contextlib import ExitStack
 import pandas as pd
-import sqlite3
-from werkzeug.exceptions import BadRequest, InternalServerError
-from app.utils.data_loader import update_from_csv,replace_to_table
+import pyarrow.parquet as pq
+from werkzeug.exceptions import BadRequest, NotFound, InternalServerError
+from app.utils.data_loader import (
+    publish_tables, iter_parquet_chunks, get_latest_date,
+    get_upload_manifest, get_data_version
+)
+from app.utils.db_manager import get_pool_metrics
 
 data_bp = Blueprint("data", __name__, url_prefix="/api/data")
 
+# batch/utils/make_cache.py で作成する集計済みキャッシュテーブル
+# (アップロードは任意。送られなかった場合は古いキャッシュを削除し、各サービスは集計クエリに戻る)
+CACHE_TABLES = [
+    "asset_cache_daily", "asset_cache_monthly", "asset_cache_yearly",
+    "category_cache_daily", "category_cache_monthly", "category_cache_yearly",
+    "subtype_cache_daily",
+]
+
+# 差分アップロード (mode=delta) で上書きするテーブルとキー列
+# それ以外のテーブル（目標・属性・キャッシュ）は小さいため常に全件置き換える
+DELTA_KEYS = {
+    "asset_profit_detail": ["date", "資産名"],
+    "balance_detail": ["date", "収支項目"],
+}
+# 0 の行を保存しない明細は、0 に戻った行をキーでは消せないため、基準日 (cutoff) 以降を丸ごと置き換える
+DELTA_RANGE_TABLES = ["balance_detail"]
+
+def _parse_cutoff(mode, value):
+    """差分アップロードの基準日（batch はこの日以降の行をすべて送る）を YYYY-MM-DD で返す"""
+    if mode != "delta":
+        return None
+    try:
+        cutoff = pd.to_datetime(value) if value else None
+    except (ValueError, TypeError):
+        cutoff = None
+    if cutoff is None or pd.isna(cutoff):
+        raise BadRequest("cutoff (YYYY-MM-DD) is required for delta mode")
+    return cutoff.strftime("%Y-%m-%d")
+
+def _replace_from(cutoff):
+    return {t: cutoff for t in DELTA_RANGE_TABLES} if cutoff else None
+
+# アップロード必須のテーブル（送信キーは file_<テーブル名>）
+REQUIRED_TABLES = [
+    "asset_profit_detail", "balance_detail",
+    "target_asset_profit", "target_parameter", "target_rate",
+    "asset_attribute", "item_attribute",
+]
+
 @data_bp.route("/upload/all", methods=["POST"])
 def upload_all():
+    # 0. モードの取得 (full: 全件置き換え / delta: 明細テーブルを差分で上書き)
+    mode = request.form.get("mode", "full")
+    if mode not in ("full", "delta"):
+        raise BadRequest(f"Invalid mode: {mode}")
+    cutoff = _parse_cutoff(mode, request.form.get("cutoff"))
+
     # 1. ファイルの取得
-    required_keys = [
-        "file_asset_profit_detail", "file_balance_detail",
-        "file_target_asset_profit", "file_target_parameter", "file_target_rate",
-        "file_asset_attribute", "file_item_attribute"
-    ]
+    required_keys = [f"file_{t}" for t in REQUIRED_TABLES]
     missing = [k for k in required_keys if k not in request.files]
     if missing:
         raise BadRequest(f"Missing required files: {', '.join(missing)}")
 
     try:
-        # 2. バイナリを読み取って Parquet → DataFrame
-        dfs = {}
-        for key in required_keys:
-            file_storage = request.files[key]     # FileStorage object
-            binary = file_storage.read()          # バイナリ読み込み
-
-            # Parquet はバイナリから直接 DataFrame にできる
-            dfs[key] = pd.read_parquet(io.BytesIO(binary))
+        # 2. アップロードされたストリームを Parquet として開く
+        #    ファイル全体を読み込まず、行グループ単位で影テーブルへ流し込む
+        #    (行数はフッターのメタデータから取得する)
+        parquet_files = {}
+        for key in required_keys + [f"file_{t}" for t in CACHE_TABLES]:
+            if key in request.files:
+                file_storage = request.files[key]     # FileStorage object (spooled)
+                parquet_files[key] = pq.ParquetFile(file_storage.stream)
 
     except Exception as e:
         return jsonify({"error": f"Failed to read parquet: {e}"}), 500
 
+    # 3. 影テーブルへロードし、1トランザクションでまとめて公開する
+    #    (送られなかったキャッシュテーブルは同じトランザクションで削除する)
+    table_names = list(REQUIRED_TABLES)
+    drop_tables = []
+    for table_name in CACHE_TABLES:
+        if f"file_{table_name}" in parquet_files:
+            table_names.append(table_name)
+        else:
+            drop_tables.append(table_name)
+
+    tables = {t: iter_parquet_chunks(parquet_files[f"file_{t}"]) for t in table_names}
+    rows = {t: parquet_files[f"file_{t}"].metadata.num_rows for t in table_names}
+
+    try:
+        # 4. 公開と同時にデータバージョンを進め、ペイロードキャッシュを切り替える
+        data_version = publish_tables(
+            tables,
+            upsert_keys=DELTA_KEYS if mode == "delta" else None,
+            drop_tables=drop_tables,
+            replace_from=_replace_from(cutoff),
+        )
+    except Exception as e:
+        return jsonify({"error": f"DB write failed: {e}"}), 500
+
+    # 5. 完了レスポンス
+    return jsonify({
+        "status": "success",
+        "mode": mode,
+        "data_version": data_version,
+        "rows": rows,
+    })
+
+
+# ----------------------------------------------------------------------
+# 分割アップロード（再開可能）
+# ----------------------------------------------------------------------
+# 1. POST /upload/session
+#       各ファイルの sha256 とサイズを送る。前回公開したファイルと同じものは unchanged になり送信不要。
+# 2. PUT  /upload/session/<session_id>/<file_key>?offset=N
+#       チャンクを順に送る。offset は受信済みのバイト数と一致している必要がある（不一致は 409）。
+# 3. GET  /upload/session/<session_id>
+#       進捗（ファイルごとの受信済みバイト数）を返す。
+# 4. POST /upload/session/<session_id>/commit
+#       sha256 を検証し、変更のあったテーブルだけを publish_tables で公開する。
+# 受信中のファイルは sha256 をファイル名にして spool ディレクトリに置くため、
+# 中断しても同じファイルなら次のセッションで続きから再開できる。
+
+_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+def _upload_file_keys():
+    return [f"file_{t}" for t in REQUIRED_TABLES + CACHE_TABLES]
+
+def _spool_dir():
+    upload_settings = current_app.config.get("UPLOAD") or {}
+    spool_dir = upload_settings.get("spool_dir") or os.path.join(tempfile.gettempdir(), "finance_upload_spool")
+    if not os.path.isabs(spool_dir):
+        # 相対パスはプロジェクトルート基準
+        spool_dir = os.path.join(os.path.dirname(current_app.root_path), spool_dir)
+    os.makedirs(os.path.join(spool_dir, "sessions"), exist_ok=True)
+    return spool_dir
+
+def _part_path(sha256):
+    return os.path.join(_spool_dir(), f"{sha256}.part")
+
+def _received_bytes(sha256):
+    path = _part_path(sha256)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def _session_path(session_id):
+    if not _SESSION_ID_PATTERN.match(session_id):
+        raise NotFound(f"Unknown upload session: {session_id}")
+    return os.path.join(_spool_dir(), "sessions", f"{session_id}.json")
+
+def _load_session(session_id):
+    path = _session_path(session_id)
+    if not os.path.exists(path):
+        raise NotFound(f"Unknown upload session: {session_id}")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_session(session):
+    path = _session_path(session["session_id"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _session_progress(session):
+    files = {}
+    for key, info in session["files"].items():
+        received = info["size"] if info["status"] == "unchanged" else _received_bytes(info["sha256"])
+        status = info["status"]
+        if status == "pending" and received >= info["size"]:
+            status = "complete"
+        files[key] = {"status": status, "size": info["size"], "received": received}
+
+    total = sum(f["size"] for f in files.values() if f["status"] != "unchanged")
+    received = sum(f["received"] for f in files.values() if f["status"] != "unchanged")
+    return {
+        "session_id": session["session_id"],
+        "mode": session["mode"],
+        "files": files,
+        "total_bytes": total,
+        "received_bytes": received,
+    }
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+@data_bp.route("/upload/session", methods=["POST"])
+def create_upload_session():
+    """
+    分割アップロードのセッションを作成する
+    body: {"mode": "full"|"delta", "cutoff": "YYYY-MM-DD" (delta のとき必須),
+           "files": {"file_<table>": {"sha256": "...", "size": 123}, ...}}
+    """
+    body = request.get_json(silent=True) or {}
+    mode = body.get("mode", "full")
+    if mode not in ("full", "delta"):
+        raise BadRequest(f"Invalid mode: {mode}")
+    cutoff = _parse_cutoff(mode, body.get("cutoff"))
+
+    files = body.get("files") or {}
+    unknown = [k for k in files if k not in _upload_file_keys()]
+    if unknown:
+        raise BadRequest(f"Unknown files: {', '.join(unknown)}")
+    missing = [f"file_{t}" for t in REQUIRED_TABLES if f"file_{t}" not in files]
+    if missing:
+        raise BadRequest(f"Missing required files: {', '.join(missing)}")
+
+    manifest = get_upload_manifest()
+    session_files = {}
+    for key, info in files.items():
+        sha256 = str(info.get("sha256", "")).lower()
+        size = info.get("size")
+        if not _SHA256_PATTERN.match(sha256) or not isinstance(size, int) or size < 0:
+            raise BadRequest(f"Invalid sha256 or size for {key}")
+        table_name = key[len("file_"):]
+        status = "unchanged" if manifest.get(table_name) == sha256 else "pending"
+        session_files[key] = {"sha256": sha256, "size": size, "status": status}
+
+    session = {"session_id": uuid.uuid4().hex, "mode": mode, "cutoff": cutoff, "files": session_files}
+    _save_session(session)
+    return jsonify(_session_progress(session)), 201
+
+@data_bp.route("/upload/session/<session_id>", methods=["GET"])
+def upload_session_progress(session_id):
+    """
+    分割アップロードの進捗を返す
+    """
+    return jsonify(_session_progress(_load_session(session_id)))
+
+@data_bp.route("/upload/session/<session_id>/<file_key>", methods=["PUT"])
+def upload_chunk(session_id, file_key):
+    """
+    チャンクを受信して spool ファイルに追記する（offset は受信済みバイト数）
+    """
+    session = _load_session(session_id)
+    info = session["files"].get(file_key)
+    if info is None:
+        raise NotFound(f"Unknown file in session: {file_key}")
+    if info["status"] == "unchanged":
+        return jsonify({"file": file_key, "status": "unchanged", "received": info["size"]})
+
+    offset = request.args.get("offset", type=int)
+    received = _received_bytes(info["sha256"])
+    if offset != received:
+        # クライアントは received から送り直す
+        return jsonify({"error": "offset mismatch", "file": file_key, "received": received}), 409
+
+    with open(_part_path(info["sha256"]), "ab") as f:
+        shutil.copyfileobj(request.stream, f, 1024 * 1024)
+    received = _received_bytes(info["sha256"])
+    if received > info["size"]:
+        os.remove(_part_path(info["sha256"]))
+        # spool を消したので、クライアントは received (0) から送り直す
+        return jsonify({
+            "error": f"{file_key}: received more bytes than declared; restart this file",
+            "file": file_key, "received": 0,
+        }), 409
+
+    return jsonify({"file": file_key, "status": "pending", "received": received, "size": info["size"]})
+
+@data_bp.route("/upload/session/<session_id>/commit", methods=["POST"])
+def commit_upload_session(session_id):
+    """
+    受信したファイルを検証し、変更のあったテーブルだけを公開する
+    """
+    session = _load_session(session_id)
+    progress = _session_progress(session)
+    incomplete = [k for k, f in progress["files"].items() if f["status"] == "pending"]
+    if incomplete:
+        return jsonify({"error": "upload incomplete", **progress}), 409
+
+    changed = {k: info for k, info in session["files"].items() if info["status"] != "unchanged"}
+    for key, info in changed.items():
+        if not os.path.exists(_part_path(info["sha256"])):
+            # 同じ内容の別セッションが先に commit して spool を片付けた場合など
+            return jsonify({
+                "error": f"{key}: uploaded file is missing; the file must be uploaded again",
+                "file": key, "received": 0,
+            }), 409
+        if _file_sha256(_part_path(info["sha256"])) != info["sha256"]:
+            if os.path.exists(_part_path(info["sha256"])):
+                os.remove(_part_path(info["sha256"]))
+            raise BadRequest(f"{key}: sha256 mismatch; the file must be uploaded again")
+
+    drop_tables = [t for t in CACHE_TABLES if f"file_{t}" not in session["files"]]
+    if not changed and not drop_tables:
+        os.remove(_session_path(session_id))
+        return jsonify({"status": "unchanged", "data_version": get_data_version(), "rows": {}})
+
     try:
-        # 3. DataFrame を DB に書き込む
-        replace_to_table(dfs["file_asset_profit_detail"], "asset_profit_detail")
-        replace_to_table(dfs["file_balance_detail"], "balance_detail")
-        replace_to_table(dfs["file_target_asset_profit"], "target_asset_profit")
-        replace_to_table(dfs["file_target_parameter"], "target_parameter")
-        replace_to_table(dfs["file_target_rate"], "target_rate")
-        replace_to_table(dfs["file_asset_attribute"], "asset_attribute")
-        replace_to_table(dfs["file_item_attribute"], "item_attribute")
+        with ExitStack() as stack:
+            parquet_files = {
+                key[len("file_"):]: pq.ParquetFile(stack.enter_context(open(_part_path(info["sha256"]), "rb")))
+                for key, info in changed.items()
+            }
+            rows = {t: pf.metadata.num_rows for t, pf in parquet_files.items()}
+            data_version = publish_tables(
+                {t: iter_parquet_chunks(pf) for t, pf in parquet_files.items()},
+                upsert_keys=DELTA_KEYS if session["mode"] == "delta" else None,
+                drop_tables=drop_tables,
+                content_hashes={key[len("file_"):]: info["sha256"] for key, info in changed.items()},
+                replace_from=_replace_from(session.get("cutoff")),
+            )
     except Exception as e:
         return jsonify({"error": f"DB write failed: {e}"}), 500
 
-    # 4. 完了レスポンス
+    # 同じ内容のファイルは spool を共有するため、sha256 単位で片付ける
+    for sha256 in {info["sha256"] for info in changed.values()}:
+        if os.path.exists(_part_path(sha256)):
+            os.remove(_part_path(sha256))
+    os.remove(_session_path(session_id))
+
     return jsonify({
         "status": "success",
-        "rows": {
-            "asset_profit_detail": len(dfs["file_asset_profit_detail"]),
-            "balance_detail": len(dfs["file_balance_detail"]),
-            "target_asset_profit": len(dfs["file_target_asset_profit"]),
-            "target_parameter": len(dfs["file_target_parameter"]),
-            "target_rate": len(dfs["file_target_rate"]),
-            "asset_attribute": len(dfs["file_asset_attribute"]),
-            "item_attribute": len(dfs["file_item_attribute"]),
-        }
+        "mode": session["mode"],
+        "data_version": data_version,
+        "rows": rows,
+        "unchanged": [k for k, info in session["files"].items() if info["status"] == "unchanged"],
     })
+
+
+@data_bp.route("/latest_date", methods=["GET"])
+def latest_date():
+    """
+    DBの最新日付を返す（バッチの差分アップロードの起点）
+    """
+    latest = get_latest_date()
+    return jsonify({"latest_date": latest.strftime("%Y-%m-%d") if latest is not None else None})
+
+
+@data_bp.route("/pool/metrics", methods=["GET"])
+def pool_metrics():
+    """
+    DB接続プールの状態とチェックアウト統計を返す（プールサイズ調整用）
+    """
+    return jsonify(get_pool_metrics("finance"))
@@ -1,7 +1,8 @@
 import json
 import hashlib
 from flask import request, make_response, jsonify, current_app
-from typing import Dict, Any
+from typing import Dict, Any, Callable
+from app.utils.data_loader import get_data_version
 
 def apply_etag(payload: dict):
     """
@@ -47,6 +48,24 @@ def apply_etag(payload: dict):
 # カスタムキャッシュキー生成関数
 # ----------------------------------------------------------------------
 
+# ペイロードキャッシュの有効期限 (秒)
+# キーにデータバージョンを含め、アップロード時はキーが切り替わるため長めに取る
+PAYLOAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+def versioned_cache_key(name: str) -> Callable[..., str]:
+    """
+    データバージョンを含むキャッシュキー生成関数を返す。
+    @cache.cached(make_cache_key=versioned_cache_key("...")) の形で使う。
+    """
+    def make_cache_key(*args, **kwargs):
+        try:
+            args_str = json.dumps([args, kwargs], sort_keys=True)
+        except Exception:
+            args_str = str((args, kwargs))
+        return f'{name}:v{get_data_version()}:{args_str}'
+
+    return make_cache_key
+
 def key_generator_with_params(graph_id: str, params: Dict[str, Any]):
     # 1. params 辞書をソートし、JSON文字列に変換
     try:
@@ -57,7 +76,8 @@ def key_generator_with_params(graph_id: str, params: Dict[str, Any]):
     
     # 2. 最終キーを生成: モジュール名を含めず、関数名と引数のみでキーを作成
     #    この関数が使われる場所は限定的であるため、これで衝突は起きにくい
-    cache_key = f'{graph_id}:{params_str}'
+    #    データバージョンを含め、アップロード後は新しいキーで再計算させる
+    cache_key = f'{graph_id}:v{get_data_version()}:{params_str}'
     
     return cache_key
 
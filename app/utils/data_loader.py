@@ -1,8 +1,16 @@
 import pandas as pd
 import sqlite3
 import os
-from typing import Union, List
+import io
+import threading
+from contextlib import contextmanager
+import itertools
+from typing import Union, List, Dict, Callable, Any, Iterable, Iterator
 from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import g, has_app_context
+from sqlalchemy import text, inspect
 
 # データベース接続マネージャーをインポート
 from .db_manager import get_engine, get_db_path
@@ -12,6 +20,142 @@ from .db_manager import get_engine, get_db_path
 # 2. コードが短く、読みやすい
 # 3. 例外発生時も DB が壊れない
 
+# ------ データバージョン -------
+# アップロードのたびに単調増加するデータバージョンを DB のメタデータテーブルに保持する。
+# ペイロードキャッシュのキーやメタデータのメモに含めることで、TTL に頼らず
+# アップロード直後から古いキャッシュを参照しないようにする。
+# (Redis は LRU で追い出されうるため、バージョン自体は DB に置く)
+METADATA_TABLE = "app_metadata"
+DATA_VERSION_KEY = "data_version"
+
+def _ensure_metadata_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {METADATA_TABLE} ("
+        "name VARCHAR(64) PRIMARY KEY, value BIGINT NOT NULL)"
+    ))
+
+def _query_data_version() -> int:
+    engine = get_engine("finance")
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(METADATA_TABLE):
+            return 0
+        value = conn.execute(
+            text(f"SELECT value FROM {METADATA_TABLE} WHERE name = :name"),
+            {"name": DATA_VERSION_KEY}
+        ).scalar()
+    return int(value) if value is not None else 0
+
+def get_data_version() -> int:
+    """
+    現在のデータバージョンを返す（リクエスト内では1回だけ DB を参照する）
+    """
+    if not has_app_context():
+        return _query_data_version()
+    if "data_version" not in g:
+        g.data_version = _query_data_version()
+    return g.data_version
+
+def _increment_data_version(conn) -> int:
+    # 呼び出し側のトランザクション内でバージョンを進める
+    _ensure_metadata_table(conn)
+    updated = conn.execute(
+        text(f"UPDATE {METADATA_TABLE} SET value = value + 1 WHERE name = :name"),
+        {"name": DATA_VERSION_KEY}
+    ).rowcount
+    if not updated:
+        conn.execute(
+            text(f"INSERT INTO {METADATA_TABLE} (name, value) VALUES (:name, 1)"),
+            {"name": DATA_VERSION_KEY}
+        )
+    return int(conn.execute(
+        text(f"SELECT value FROM {METADATA_TABLE} WHERE name = :name"),
+        {"name": DATA_VERSION_KEY}
+    ).scalar())
+
+def _on_data_version_changed(version: int):
+    invalidate_metadata_cache()
+    if has_app_context():
+        g.data_version = version
+
+# ------ アップロード済みファイルの記録 -------
+# 各テーブルへ最後に公開したファイルの sha256 を記録し、分割アップロードで
+# 内容が変わっていないファイルの再送を省く。公開・削除のたびに publish_tables が更新する。
+UPLOAD_MANIFEST_TABLE = "upload_manifest"
+
+def get_upload_manifest() -> Dict[str, str]:
+    """
+    テーブル名と、最後に公開したファイルの sha256 の対応を返す
+    """
+    engine = get_engine("finance")
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(UPLOAD_MANIFEST_TABLE):
+            return {}
+        rows = conn.execute(text(f"SELECT table_name, sha256 FROM {UPLOAD_MANIFEST_TABLE}")).all()
+    return {table_name: sha256 for table_name, sha256 in rows}
+
+def _record_upload_manifest(conn, entries: Dict[str, Any]):
+    # 呼び出し側のトランザクション内で更新する（sha256 が None の場合は記録を消す）
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {UPLOAD_MANIFEST_TABLE} ("
+        "table_name VARCHAR(64) PRIMARY KEY, sha256 VARCHAR(64) NOT NULL)"
+    ))
+    for table_name, sha256 in entries.items():
+        conn.execute(
+            text(f"DELETE FROM {UPLOAD_MANIFEST_TABLE} WHERE table_name = :table_name"),
+            {"table_name": table_name}
+        )
+        if sha256:
+            conn.execute(
+                text(f"INSERT INTO {UPLOAD_MANIFEST_TABLE} (table_name, sha256) VALUES (:table_name, :sha256)"),
+                {"table_name": table_name, "sha256": sha256}
+            )
+
+# ------ メタデータのメモ化 -------
+# 最新日付・行数・属性テーブルなどの軽いメタデータは、1回のペイロード作成中に
+# 何度も参照されるため2段でメモ化する。
+#   1. リクエスト単位 (Flask g): 同一リクエスト内の重複クエリをなくす
+#   2. データ世代単位 (プロセス内): データバージョンと、このプロセスでの
+#      書き込み回数をキーに含めて無効化する
+_metadata_memo = {}
+_metadata_version = 0
+_metadata_lock = threading.Lock()
+
+def invalidate_metadata_cache():
+    """テーブル更新後に呼び出し、メモ化したメタデータを破棄する"""
+    global _metadata_version
+    with _metadata_lock:
+        _metadata_version += 1
+        _metadata_memo.clear()
+    if has_app_context():
+        g.pop("metadata_memo", None)
+        g.pop("data_version", None)
+
+def _memoize_metadata(key, loader: Callable[[], Any]):
+    request_memo = g.setdefault("metadata_memo", {}) if has_app_context() else None
+    if request_memo is not None and key in request_memo:
+        value = request_memo[key]
+    else:
+        version_key = (_metadata_version, get_data_version(), key)
+        with _metadata_lock:
+            found = version_key in _metadata_memo
+            value = _metadata_memo.get(version_key)
+        if not found:
+            value = loader()
+            with _metadata_lock:
+                # 読み込み中に無効化された場合は古い世代として保存しない
+                if version_key[0] == _metadata_version:
+                    # 他プロセスでバージョンが進んだ場合に備え、古いバージョンの値は捨てる
+                    for stale in [k for k in _metadata_memo if k[1] != version_key[1]]:
+                        del _metadata_memo[stale]
+                    _metadata_memo[version_key] = value
+        if request_memo is not None:
+            request_memo[key] = value
+
+    # 呼び出し側での加工がメモに波及しないようにコピーを返す
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return value
+
 # ------ 読み込み -------
 def get_raw_table(table):
     engine = get_engine("finance")
@@ -19,7 +163,13 @@ def get_raw_table(table):
         df = pd.read_sql_table(table, conn)
     return df
 
-def get_latest_date():
+def get_attribute_table(table):
+    """
+    属性テーブル（asset_attribute, item_attribute など小さいマスタ）をメモ化して取得する
+    """
+    return _memoize_metadata(("attribute_table", table), lambda: get_raw_table(table))
+
+def _query_latest_date():
     sql = "SELECT MAX(date) AS latest_date FROM asset_profit_detail"
     engine = get_engine("finance")
     with engine.connect() as conn:
@@ -32,6 +182,88 @@ def get_latest_date():
 
     return pd.to_datetime(latest_date)
 
+def get_latest_date():
+    return _memoize_metadata("latest_date", _query_latest_date)
+
+def get_row_count(table_name: str) -> int:
+    """
+    テーブルの行数をメモ化して取得する
+    """
+    if not isinstance(table_name, str) or not table_name.isidentifier():
+        raise ValueError(f"Invalid table name: {table_name}")
+
+    def _query_row_count():
+        engine = get_engine("finance")
+        with engine.connect() as conn:
+            df = pd.read_sql_query(f"SELECT COUNT(*) AS row_count FROM {table_name}", conn)
+        return int(df["row_count"].iloc[0])
+
+    return _memoize_metadata(("row_count", table_name), _query_row_count)
+
+def table_exists(table_name: str) -> bool:
+    """
+    テーブルの有無をメモ化して返す（キャッシュテーブルの有無で読み込み先を切り替える用）
+    """
+    def _query_table_exists():
+        engine = get_engine("finance")
+        with engine.connect() as conn:
+            return inspect(conn).has_table(table_name)
+
+    return _memoize_metadata(("table_exists", table_name), _query_table_exists)
+
+def _quote_identifier(name: str) -> str:
+    # キャッシュテーブルの列名は日本語や記号を含むためクォートする
+    return '"' + str(name).replace('"', '""') + '"'
+
+def query_table_columns(
+    table_name: str,
+    columns: list,
+    start_date: pd.Timestamp = None,
+    end_date: pd.Timestamp = None,
+    filters: dict = None,
+    order_by: list = None
+) -> pd.DataFrame:
+    """
+    集計済みテーブル（*_cache_*）から必要な列だけを日付範囲で取得する関数
+    end_date は当日を含む（query_table_aggregated と同じ）
+    """
+    if not isinstance(table_name, str) or not table_name.isidentifier():
+        raise ValueError(f"Invalid table name: {table_name}")
+
+    sql = f"SELECT {', '.join(_quote_identifier(c) for c in columns)} FROM {table_name}"
+
+    params = {}
+    where_clauses = []
+    if start_date is not None:
+        where_clauses.append("date >= :start_date")
+        params["start_date"] = pd.to_datetime(start_date).strftime("%Y-%m-%d")
+    if end_date is not None:
+        next_day = pd.to_datetime(end_date) + pd.Timedelta(days=1)
+        where_clauses.append("date < :end_date")
+        params["end_date"] = next_day.strftime("%Y-%m-%d")
+    if filters:
+        for i, (col, val) in enumerate(filters.items()):
+            values = val if isinstance(val, (list, tuple)) else [val]
+            placeholders = []
+            for j, v in enumerate(values):
+                pname = f"param_{i}_{j}"
+                placeholders.append(f":{pname}")
+                params[pname] = v
+            where_clauses.append(f"{_quote_identifier(col)} IN ({', '.join(placeholders)})")
+
+    if where_clauses:
+        sql += " WHERE " + " AND ".join(where_clauses)
+    if order_by:
+        sql += " ORDER BY " + ", ".join(_quote_identifier(c) for c in order_by)
+
+    engine = get_engine("finance")
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text(sql), conn, params=params)
+
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
 def query_table_aggregated(
     table_name: str,
     aggregates: dict,
@@ -110,8 +342,182 @@ def query_table_date_filter(table_name, start_date:pd.Timestamp, end_date:pd.Tim
     df["date"] = pd.to_datetime(df["date"])
     return df
 
+def densify_date_grid(
+    df: pd.DataFrame,
+    start_date: pd.Timestamp,
+    end_date: pd.Timestamp,
+    keys: List[str],
+    fill_values: Dict[str, Any],
+    date_col: str = "date"
+) -> pd.DataFrame:
+    """
+    0 の行を保存しない明細（balance_detail など）を、日付 × キーの格子に戻す関数
+
+    start_date から end_date（当日を含む）の毎日について、df に現れるキーの組み合わせが
+    すべて揃うように行を追加する。追加した行は fill_values の値で埋め、それ以外の列は欠損にする。
+    期間外の行はそのまま残す。
+    """
+    if df.empty:
+        return df
+    dates = pd.date_range(start_date, end_date, freq="D", name=date_col)
+    combos = df[keys].drop_duplicates()
+    grid = pd.merge(dates.to_frame(index=False), combos, how="cross")
+
+    df_full = pd.merge(grid, df, on=[date_col] + keys, how="outer", indicator=True)
+    added = df_full["_merge"] == "left_only"
+    for col, value in fill_values.items():
+        df_full.loc[added, col] = value
+    df_full = df_full.drop(columns="_merge")
+    return df_full.sort_values([date_col] + keys, kind="stable").reset_index(drop=True)
 
 
+# ------ 一括ロード -------
+# to_sql は複数行 INSERT を組み立てるため、数十万行の明細では遅い。
+# PostgreSQL は COPY ... FROM STDIN、SQLite は executemany を1トランザクションで使う。
+# 全件置き換えは一時テーブルへロードしてから RENAME で入れ替える。
+
+# 一括ロード中だけ変更する SQLite の PRAGMA (終了後に元へ戻す)
+SQLITE_BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",     # 64MB
+}
+
+# SQLAlchemy が SQLite の DATETIME 列に保存する形式と揃える
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+def _create_empty_table(conn, df: pd.DataFrame, table_name: str):
+    # 列の型は to_sql と同じ規則で決める
+    df.head(0).to_sql(table_name, conn, if_exists="replace", index=False)
+
+def _copy_rows_postgresql(conn, df: pd.DataFrame, table_name: str):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep="\\N")
+    buffer.seek(0)
+
+    cols = ", ".join(_quote_identifier(c) for c in df.columns)
+    sql = f"COPY {table_name} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    # SQLAlchemy と同じ DBAPI 接続（同じトランザクション）で COPY する
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+def _sqlite_rows(df: pd.DataFrame):
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime(SQLITE_DATETIME_FORMAT).astype(object)
+        else:
+            values = series.astype(object)
+        # NaN / NaT は NULL
+        data[col] = values.where(series.notna(), None)
+    return list(pd.DataFrame(data, columns=df.columns).itertuples(index=False, name=None))
+
+def _copy_rows_sqlite(conn, df: pd.DataFrame, table_name: str):
+    cols = ", ".join(_quote_identifier(c) for c in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    conn.exec_driver_sql(
+        f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})",
+        _sqlite_rows(df)
+    )
+
+def _copy_rows(conn, df: pd.DataFrame, table_name: str):
+    """既存テーブルへ DataFrame の行を一括で追加する"""
+    if conn.dialect.name == "postgresql":
+        _copy_rows_postgresql(conn, df, table_name)
+    else:
+        _copy_rows_sqlite(conn, df, table_name)
+
+def _apply_sqlite_pragmas(conn, pragmas: dict) -> dict:
+    # synchronous などはトランザクション内では変更できないため、
+    # SQLAlchemy のトランザクション（BEGIN）を経由せず DBAPI 接続で直接実行する
+    previous = {}
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            previous[name] = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+    return previous
+
+@contextmanager
+def _bulk_connection():
+    """一括ロード用の接続（SQLite では PRAGMA を一時的に変更する）"""
+    engine = get_engine("finance")
+    with engine.connect() as conn:
+        is_sqlite = conn.dialect.name == "sqlite"
+        previous_pragmas = _apply_sqlite_pragmas(conn, SQLITE_BULK_PRAGMAS) if is_sqlite else {}
+        try:
+            yield conn
+        finally:
+            if previous_pragmas:
+                _apply_sqlite_pragmas(conn, previous_pragmas)
+
+def _swap_table(conn, staging_table: str, table_name: str):
+    """ロード済みの一時テーブルを本テーブルと入れ替える（呼び出し側のトランザクション内）"""
+    if inspect(conn).has_table(table_name):
+        conn.execute(text(f"DROP TABLE {table_name}"))
+    conn.execute(text(f"ALTER TABLE {staging_table} RENAME TO {table_name}"))
+
+def _merge_staging(conn, staging_table: str, table_name: str, key_columns: List[str], columns: List[str]):
+    """一時テーブルの行で、同じキーを持つ本テーブルの行を置き換える（呼び出し側のトランザクション内）"""
+    # NULL 同士も一致とみなす比較演算子
+    null_safe_eq = "IS" if conn.dialect.name == "sqlite" else "IS NOT DISTINCT FROM"
+    match = " AND ".join(
+        f"{table_name}.{_quote_identifier(c)} {null_safe_eq} s.{_quote_identifier(c)}"
+        for c in key_columns
+    )
+    conn.execute(text(
+        f"DELETE FROM {table_name} WHERE EXISTS "
+        f"(SELECT 1 FROM {staging_table} s WHERE {match})"
+    ))
+
+    cols = ", ".join(_quote_identifier(c) for c in columns)
+    conn.execute(text(
+        f"INSERT INTO {table_name} ({cols}) SELECT {cols} FROM {staging_table}"
+    ))
+    conn.execute(text(f"DROP TABLE {staging_table}"))
+
+def _replace_date_range(conn, staging_table: str, table_name: str, columns: List[str], cutoff: str):
+    """本テーブルの cutoff 以降の行を、一時テーブルの行で置き換える（呼び出し側のトランザクション内）"""
+    conn.execute(
+        text(f"DELETE FROM {table_name} WHERE date >= :cutoff"),
+        {"cutoff": pd.to_datetime(cutoff).strftime("%Y-%m-%d")}
+    )
+
+    cols = ", ".join(_quote_identifier(c) for c in columns)
+    conn.execute(text(
+        f"INSERT INTO {table_name} ({cols}) SELECT {cols} FROM {staging_table}"
+    ))
+    conn.execute(text(f"DROP TABLE {staging_table}"))
+
+def bulk_load_table(df: pd.DataFrame, table_name: str, if_exists: str = "replace") -> int:
+    """
+    DataFrame をテーブルへ一括ロードして、件数を返す。
+
+    Args:
+        df (pd.DataFrame): ロードする DataFrame
+        table_name (str): ロード先テーブル名
+        if_exists (str): "replace" (一時テーブル経由で入れ替え) または "append"
+
+    Returns:
+        int: ロードした行数
+    """
+    if if_exists not in ("replace", "append"):
+        raise ValueError(f"Invalid if_exists: {if_exists}")
+
+    staging_table = f"{table_name}__load"
+    with _bulk_connection() as conn, conn.begin():
+        if if_exists == "append" and inspect(conn).has_table(table_name):
+            _copy_rows(conn, df, table_name)
+        else:
+            _create_empty_table(conn, df, staging_table)
+            _copy_rows(conn, df, staging_table)
+            _swap_table(conn, staging_table, table_name)
+            _create_indexes(conn, table_name)
+    return len(df)
+
 # ------ 書き込み -------
 def append_to_table(df: pd.DataFrame, table_name: str) -> int:
     """
@@ -131,14 +537,12 @@ def append_to_table(df: pd.DataFrame, table_name: str) -> int:
     if not isinstance(table_name, str) or not table_name.isidentifier():
         raise ValueError(f"Invalid table name: {table_name}")
 
-    # --- SQLAlchemyエンジンを使ってDB接続 ---
-    engine = get_engine("finance")
     try:
-        with engine.begin() as conn:
-            df.to_sql(table_name, conn, if_exists="append", index=False)
-        return len(df)
+        return bulk_load_table(df, table_name, if_exists="append")
     except Exception as e:
         raise Exception(f"DB追加に失敗しました: {e}")
+    finally:
+        invalidate_metadata_cache()
 
 def update_from_csv(csv_path: str, table_name: str) -> int:
     """
@@ -162,22 +566,213 @@ def replace_to_table(df, table_name):
     if not isinstance(table_name, str) or not table_name.isidentifier():
         raise ValueError(f"Invalid table name: {table_name}")
 
-    # --- SQLAlchemyエンジンを使ってDB接続 ---
+    try:
+        return bulk_load_table(df, table_name, if_exists="replace")
+    except Exception as e:
+        raise Exception(f"DB上書きに失敗しました: {e}")
+    finally:
+        invalidate_metadata_cache()
+
+def drop_table_if_exists(table_name: str):
+    if not isinstance(table_name, str) or not table_name.isidentifier():
+        raise ValueError(f"Invalid table name: {table_name}")
+
+    engine = get_engine("finance")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+    finally:
+        invalidate_metadata_cache()
+
+# Parquet の整数・真偽値列は、行グループごとに欠損の有無で dtype が変わらないよう
+# pandas の nullable 型で読み込む（影テーブルの列型をファイルのスキーマで固定するため）
+_PARQUET_TYPES_MAPPER = {
+    pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}.get
+
+def iter_parquet_chunks(parquet_file: pq.ParquetFile) -> Iterator[pd.DataFrame]:
+    """
+    Parquet を行グループ単位の DataFrame として順に返す。
+    最初に 0 行の DataFrame (列と型のみ) を返すので、行グループが無くてもテーブルを作成できる。
+    メモリ使用量はファイル全体ではなく行グループの大きさに比例する。
+    """
+    yield parquet_file.schema_arrow.empty_table().to_pandas(types_mapper=_PARQUET_TYPES_MAPPER)
+    for i in range(parquet_file.num_row_groups):
+        yield parquet_file.read_row_group(i).to_pandas(types_mapper=_PARQUET_TYPES_MAPPER)
+
+def _load_shadow_table(data, shadow_table: str) -> List[str]:
+    """DataFrame または DataFrame のイテラブルを影テーブルへロードし、列名を返す"""
+    chunks = iter([data]) if isinstance(data, pd.DataFrame) else iter(data)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError(f"{shadow_table}: no data to load")
+
+    with _bulk_connection() as conn, conn.begin():
+        _create_empty_table(conn, first, shadow_table)
+        for chunk in itertools.chain([first], chunks):
+            if not chunk.empty:
+                _copy_rows(conn, chunk, shadow_table)
+    return list(first.columns)
+
+def publish_tables(
+    tables: Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]],
+    upsert_keys: Dict[str, List[str]] = None,
+    drop_tables: List[str] = None,
+    content_hashes: Dict[str, str] = None,
+    replace_from: Dict[str, str] = None
+) -> int:
+    """
+    複数テーブルをまとめて公開し、新しいデータバージョンを返す。
+
+    1. 各 DataFrame（または iter_parquet_chunks などの DataFrame のイテラブル）を
+       影テーブル (<table>__shadow) へロードする（本テーブルには触れない）
+    2. 1トランザクションで、影テーブルとの入れ替え・差分の反映・インデックスの作成・
+       不要テーブルの削除・データバージョンの更新を行う
+
+    読み手は常に「すべて古い」か「すべて新しい」状態のどちらかを見る。
+    途中で失敗した場合は何も公開されない。
+
+    Args:
+        tables (Dict[str, DataFrame | Iterable[DataFrame]]): テーブル名と内容
+        upsert_keys (Dict[str, List[str]]): 差分で反映するテーブルとキー列
+            (ここに無いテーブルは全件置き換え)
+        drop_tables (List[str]): 同時に削除するテーブル
+        content_hashes (Dict[str, str]): 公開するファイルの sha256
+            (upload_manifest に記録する。無いテーブルは記録を消す)
+        replace_from (Dict[str, str]): 差分で、指定日以降を丸ごと置き換えるテーブルとその日付
+            (0 の行を保存しない明細など、キーの一致では古い行を消せないテーブル。
+             日付は差分ファイルを作ったときの基準日で、その日以降の行がすべて送られている前提)
+
+    Returns:
+        int: 新しいデータバージョン
+    """
+    upsert_keys = upsert_keys or {}
+    drop_tables = drop_tables or []
+    replace_from = replace_from or {}
+    for table_name in list(tables) + list(drop_tables):
+        if not isinstance(table_name, str) or not table_name.isidentifier():
+            raise ValueError(f"Invalid table name: {table_name}")
+    for table_name, data in tables.items():
+        if not isinstance(data, (pd.DataFrame, Iterable)):
+            raise TypeError(f"{table_name}: expected a DataFrame or an iterable of DataFrames, got {type(data)}")
+
+    shadows = {table_name: f"{table_name}__shadow" for table_name in tables}
     engine = get_engine("finance")
     try:
+        # 1. 影テーブルへロード
+        columns = {}
+        for table_name, data in tables.items():
+            columns[table_name] = _load_shadow_table(data, shadows[table_name])
+
+        # 2. 公開（1トランザクション）
         with engine.begin() as conn:
-            df.to_sql(table_name, conn, if_exists="replace", index=False)
-        return len(df)
+            for table_name, shadow in shadows.items():
+                if table_name in replace_from and inspect(conn).has_table(table_name):
+                    _replace_date_range(conn, shadow, table_name, columns[table_name], replace_from[table_name])
+                elif table_name in upsert_keys and inspect(conn).has_table(table_name):
+                    _merge_staging(
+                        conn, shadow, table_name,
+                        upsert_keys[table_name], columns[table_name]
+                    )
+                else:
+                    _swap_table(conn, shadow, table_name)
+                # 入れ替え後のテーブルにインデックスを作成し、統計情報を更新する
+                _create_indexes(conn, table_name)
+            for table_name in drop_tables:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            content_hashes = content_hashes or {}
+            _record_upload_manifest(
+                conn, {t: content_hashes.get(t) for t in list(tables) + list(drop_tables)}
+            )
+            version = _increment_data_version(conn)
+
     except Exception as e:
-        raise Exception(f"DB上書きに失敗しました: {e}")
+        # 公開前に失敗した場合は影テーブルを片付ける
+        with engine.begin() as conn:
+            for shadow in shadows.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+        invalidate_metadata_cache()
+        raise Exception(f"DB公開に失敗しました: {e}")
+
+    _on_data_version_changed(version)
+    return version
 
 # ------ インデックス -------
-def create_index_if_not_exists(table_name, column_name):
+# ダッシュボードのクエリ（date の範囲指定 + 資産サブタイプ・資産名・収支タイプなどでの集計）に
+# 合わせたインデックス定義。テーブルの作成・入れ替えのたびに自動で作成する。
+# インデックス名は PostgreSQL ではスキーマ内で一意なため、テーブル名を前置した ASCII 名にする。
+INDEX_SPECS = {
+    "asset_profit_detail": [
+        ("idx_asset_profit_detail_date", ["date"]),
+        ("idx_asset_profit_detail_date_subtype", ["date", "資産サブタイプ"]),
+        ("idx_asset_profit_detail_name_date", ["資産名", "date"]),
+    ],
+    "balance_detail": [
+        ("idx_balance_detail_date", ["date"]),
+        ("idx_balance_detail_date_type", ["date", "収支タイプ"]),
+        ("idx_balance_detail_date_item", ["date", "収支項目"]),
+    ],
+    "target_asset_profit": [
+        ("idx_target_asset_profit_date", ["date"]),
+    ],
+    "asset_cache_daily": [("idx_asset_cache_daily_date_name", ["date", "資産名"])],
+    "asset_cache_monthly": [("idx_asset_cache_monthly_date_name", ["date", "資産名"])],
+    "asset_cache_yearly": [("idx_asset_cache_yearly_date_name", ["date", "資産名"])],
+    "category_cache_daily": [("idx_category_cache_daily_date", ["date"])],
+    "category_cache_monthly": [("idx_category_cache_monthly_date", ["date"])],
+    "category_cache_yearly": [("idx_category_cache_yearly_date", ["date"])],
+    "subtype_cache_daily": [("idx_subtype_cache_daily_date_subtype", ["date", "資産サブタイプ"])],
+}
+
+def _create_indexes(conn, table_name: str, analyze: bool = True):
+    """INDEX_SPECS のインデックスを作成し、統計情報を更新する（呼び出し側のトランザクション内）"""
+    specs = INDEX_SPECS.get(table_name)
+    if not specs:
+        return
+    columns = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    for index_name, index_columns in specs:
+        if not set(index_columns) <= columns:
+            # 列が無い場合は作成しない（起動時チェックで報告される）
+            continue
+        cols = ", ".join(_quote_identifier(c) for c in index_columns)
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({cols})"))
+    if analyze:
+        conn.execute(text(f"ANALYZE {table_name}"))
+
+def ensure_indexes(table_names: List[str] = None):
+    """
+    INDEX_SPECS のインデックスを（無ければ）作成し、ANALYZE を実行する
+    """
     engine = get_engine("finance")
-    index_name = f"idx_{table_name}_{column_name}"
-    sql = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_name});"
+    with engine.begin() as conn:
+        for table_name in table_names or INDEX_SPECS:
+            if inspect(conn).has_table(table_name):
+                _create_indexes(conn, table_name)
+
+def find_missing_indexes() -> Dict[str, List[str]]:
+    """
+    存在するテーブルについて、INDEX_SPECS にあって DB に無いインデックス名を返す
+    """
+    missing = {}
+    engine = get_engine("finance")
+    # SQLite は接続しただけで空ファイルが作られるため、DB が無ければ確認しない
+    if engine.dialect.name == "sqlite" and not os.path.exists(get_db_path("finance")):
+        return missing
     with engine.connect() as conn:
-        conn.execute(sql)
+        inspector = inspect(conn)
+        for table_name, specs in INDEX_SPECS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+            names = [index_name for index_name, _ in specs if index_name not in existing]
+            if names:
+                missing[table_name] = names
+    return missing
+
+def create_index_if_not_exists(table_name, column_name):
+    create_composite_index(table_name, [column_name])
 
 def create_composite_index(table_name, columns):
     """
@@ -185,11 +780,11 @@ def create_composite_index(table_name, columns):
     columns: list of str
     """
     engine = get_engine("finance")
-    index_name = f"idx_{table_name}_{'_'.join(columns)}"
-    cols = ", ".join(columns)
-    sql = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({cols});"
-    with engine.connect() as conn:
-        conn.execute(sql)
+    index_name = _quote_identifier(f"idx_{table_name}_{'_'.join(columns)}")
+    cols = ", ".join(_quote_identifier(c) for c in columns)
+    sql = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({cols})"
+    with engine.begin() as conn:
+        conn.execute(text(sql))
     
 if __name__ == "__main__":
     base_dir = os.path.dirname(
@@ -7,6 +7,8 @@
 
 import os
 import sqlite3
+import threading
+import time
 from typing import Optional, Union
 from pathlib import Path
 from contextlib import contextmanager
@@ -22,8 +24,10 @@ except ImportError:
     PSYCOPG2_AVAILABLE = False
 
 try:
-    from sqlalchemy import create_engine
+    from sqlalchemy import create_engine, event
     from sqlalchemy.engine import Engine
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    from sqlalchemy.pool import QueuePool
     SQLALCHEMY_AVAILABLE = True
 except ImportError:
     SQLALCHEMY_AVAILABLE = False
@@ -40,6 +44,85 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # with open(SETTING_FILE, 'r', encoding='utf-8') as f:
 #     SETTINGS = yaml.safe_load(f)
 
+# setting.yaml の database.pool が無い場合の既定値
+DEFAULT_POOL_SETTINGS = {
+    "size": 5,
+    "max_overflow": 10,
+    "timeout": 30,
+    "recycle": 1800,
+    "pre_ping": True,
+}
+
+
+class PoolMetrics:
+    """
+    接続プールのチェックアウト状況を集計するクラス
+
+    プールサイズの調整用に、チェックアウト回数・待ち時間・タイムアウト回数・
+    新規物理接続数・同時チェックアウト数のピークを記録します。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.connects = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait: float, checked_out: int):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "total_wait_sec": round(self.total_wait, 6),
+                "avg_wait_sec": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "max_wait_sec": round(self.max_wait, 6),
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+
+def _metered_pool_class(metrics: PoolMetrics):
+    """
+    チェックアウトの待ち時間を metrics に記録する QueuePool を作成する
+
+    engine.dispose() 時のプール再生成でも同じクラスが使われるよう、
+    エンジンごとにクラスを作って metrics を閉じ込めます。
+    """
+    class MeteredQueuePool(QueuePool):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                conn = super().connect()
+            except PoolTimeoutError:
+                metrics.record_timeout()
+                raise
+            metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+            return conn
+
+    return MeteredQueuePool
+
 
 class DatabaseManager:
     """
@@ -50,6 +133,8 @@ class DatabaseManager:
     
     _instance = None
     _connection_pool = None
+    _engines = None
+    _pool_metrics = None
     
     def __new__(cls, base_dir: Optional[Union[str, Path]] = None):
         """シングルトンパターンで実装"""
@@ -82,6 +167,14 @@ class DatabaseManager:
             self.settings = yaml.safe_load(f)
 
         self.db_type = os.getenv("DB_TYPE", "sqlite").lower()
+        self.pool_settings = {
+            **DEFAULT_POOL_SETTINGS,
+            **(self.settings['database'].get('pool') or {})
+        }
+        # 接続文字列ごとに1つのエンジン（＝接続プール）を保持する
+        self._engines = {}
+        self._pool_metrics = {}
+        self._engine_lock = threading.Lock()
         
         if self.db_type == "postgresql":
             if not PSYCOPG2_AVAILABLE:
@@ -147,44 +240,108 @@ class DatabaseManager:
                 else:
                     conn.close()
     
+    def _connection_string(self) -> str:
+        """SQLAlchemy用の接続文字列を作成"""
+        if self.db_type == "postgresql":
+            return (
+                f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+                f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+            )
+        # sqlite: db_name引数は無視して常にfinance_dbを使用
+        return f"sqlite:///{self.finance_db}"
+
+    def _create_engine(self, connection_string: str) -> "Engine":
+        """プール設定を反映したエンジンを作成"""
+        metrics = PoolMetrics()
+        engine = create_engine(
+            connection_string,
+            poolclass=_metered_pool_class(metrics),
+            pool_size=int(self.pool_settings["size"]),
+            max_overflow=int(self.pool_settings["max_overflow"]),
+            pool_timeout=float(self.pool_settings["timeout"]),
+            pool_recycle=int(self.pool_settings["recycle"]),
+            pool_pre_ping=bool(self.pool_settings["pre_ping"]),
+        )
+
+        is_sqlite = engine.dialect.name == "sqlite"
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            metrics.record_connect()
+            if is_sqlite:
+                # pysqlite は DDL の前に自動で COMMIT するため、トランザクション制御を自前で行う
+                # (DROP / ALTER TABLE を含むテーブルの入れ替えを1トランザクションにする)
+                dbapi_connection.isolation_level = None
+
+        if is_sqlite:
+            @event.listens_for(engine, "begin")
+            def _on_begin(conn):
+                conn.exec_driver_sql("BEGIN")
+
+        self._pool_metrics[connection_string] = metrics
+        return engine
+
     def get_sqlalchemy_engine(self, db_name: str = "finance") -> Optional["Engine"]:
         """
         SQLAlchemyエンジンを取得
+
+        エンジンは接続文字列ごとに1度だけ作成してキャッシュし、
+        以降の呼び出しでは同じ接続プールを再利用します。
         """
         if not SQLALCHEMY_AVAILABLE:
             raise ImportError(
                 "SQLAlchemy is not installed. "
                 "Install it with: pip install SQLAlchemy"
             )
-        
-        if self.db_type == "postgresql":
-            connection_string = (
-                f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-                f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-            )
-        else:  # sqlite
-            # db_name引数は無視して常にfinance_dbを使用
-            db_path = self.finance_db
-            connection_string = f"sqlite:///{db_path}"
-        
-        return create_engine(connection_string)
-    
+
+        connection_string = self._connection_string()
+        engine = self._engines.get(connection_string)
+        if engine is None:
+            with self._engine_lock:
+                engine = self._engines.get(connection_string)
+                if engine is None:
+                    engine = self._create_engine(connection_string)
+                    self._engines[connection_string] = engine
+        return engine
+
+    def get_pool_metrics(self, db_name: str = "finance") -> dict:
+        """
+        接続プールの状態とチェックアウト統計を取得
+        """
+        connection_string = self._connection_string()
+        engine = self._engines.get(connection_string)
+        if engine is None:
+            return {"initialized": False}
+
+        pool = engine.pool
+        return {
+            "initialized": True,
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "settings": dict(self.pool_settings),
+            **self._pool_metrics[connection_string].snapshot(),
+        }
+
     def get_db_path(self, db_name: str = "finance") -> str:
         """
         データベースパスまたは接続文字列を取得
         """
         if self.db_type == "postgresql":
-            return (
-                f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-                f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-            )
+            return self._connection_string()
         else:  # sqlite
             # db_name引数は無視して常にfinance_dbを使用
             db_path = self.finance_db
             return str(db_path)
     
     def close_pool(self):
-        """接続プールをクローズ（PostgreSQLの場合のみ）"""
+        """接続プールをクローズ（SQLAlchemyエンジンとPostgreSQLの接続プール）"""
+        with self._engine_lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._pool_metrics.clear()
         if self.db_type == "postgresql" and self._connection_pool:
             self._connection_pool.closeall()
             self._connection_pool = None
@@ -242,3 +399,11 @@ def get_db_path(db_name: str = "finance") -> str:
     """
     _check_db_manager()
     return db_manager.get_db_path(db_name)
+
+
+def get_pool_metrics(db_name: str = "finance") -> dict:
+    """
+    接続プールのメトリクスを取得するヘルパー関数
+    """
+    _check_db_manager()
+    return db_manager.get_pool_metrics(db_name)
@@ -1,21 +1,12 @@
 import pandas as pd
 import numpy as np
+from functools import lru_cache
 from ..lib import reference_data_store as urds
 from .decorator import require_columns, require_columns_with_dtype
-from .main_helper import safe_pipe
+from .main_helper import safe_pipe, missing_date_key_rows
 
-# 文字コードの不具合確認（部首コードは変換する)
-def change_Utf8Code(strName: str):
-  """
-  指定された文字列内の部首コードを対応する漢字に変換します。
-
-  Args:
-      strName (str): 変換対象の文字列。
-
-  Returns:
-      str: 部首コードが漢字に変換された文字列。
-  """
-  ddTable = {
+# 部首コード -> 対応する漢字のコード
+RADICAL_CODE_TABLE = {
     "2e83": "0x4e5a",
     "2e85": "0x4ebb",
     "2e89": "0x5202",
@@ -276,17 +267,42 @@ def change_Utf8Code(strName: str):
     "2fd3": "0x9f8d",
     "2fd4": "0x9f9c",
     "2fd5": "0x9fa0",
-    }
-  tempStr = strName
-  for i in range(len(strName)):
-    uniCode = str(hex(ord(strName[i]))).replace("0x","")
-    uniCodeDec = ord(strName[i])
-    # 部首コード
-    if (uniCodeDec >= int(0x2E80)) and (uniCodeDec <= int(0x2FDF)):
-        #print(tempStr[i])
-        #print(chr(int(ddTable[uniCode], 16)))
-        tempStr = tempStr.replace(chr(uniCodeDec) ,chr(int(ddTable[uniCode], 16)))
-  return tempStr
+}
+# str.translate 用の変換表（モジュール読み込み時に1回だけ作る）
+RADICAL_TRANSLATION = str.maketrans({
+    chr(int(radical, 16)): chr(int(kanji, 16)) for radical, kanji in RADICAL_CODE_TABLE.items()
+})
+
+# 文字コードの不具合確認（部首コードは変換する)
+@lru_cache(maxsize=4096)
+def change_Utf8Code(strName: str):
+  """
+  指定された文字列内の部首コードを対応する漢字に変換します。
+  変換表に無い部首コードはそのまま残します。
+
+  Args:
+      strName (str): 変換対象の文字列。
+
+  Returns:
+      str: 部首コードが漢字に変換された文字列。
+  """
+  return strName.translate(RADICAL_TRANSLATION)
+
+def translate_radicals(series):
+  """
+  Series の部首コードを漢字に変換する。
+  ユニーク値ごとに1回だけ変換し（結果は change_Utf8Code でメモ化）、欠損値はそのまま残す。
+  """
+  codes, uniques = pd.factorize(series)
+  if len(uniques) == 0:
+    return series
+  translated = np.array(
+    [change_Utf8Code(x) if isinstance(x, str) else x for x in uniques], dtype=object
+  )
+  result = series.copy()
+  mask = codes >= 0
+  result[mask] = translated[codes[mask]]
+  return result
 
 def normalize_text(df):
     df_normalized = df.replace({'\n':"", "‧":"・"}, regex=True)
@@ -297,28 +313,21 @@ def normalize_text(df):
         .astype('float64')
     )
     # 部首コードの変換
-    df_normalized["資産名"] = df_normalized["資産名"].apply(
-        lambda x: change_Utf8Code(x) if pd.notna(x) else x
-    )
-    df_normalized["金融機関口座"] = df_normalized["金融機関口座"].apply(
-        lambda x: change_Utf8Code(x) if pd.notna(x) else x
-    )
+    df_normalized["資産名"] = translate_radicals(df_normalized["資産名"])
+    df_normalized["金融機関口座"] = translate_radicals(df_normalized["金融機関口座"])
     return df_normalized
 
 def get_account_name_from_table(df):
     df_processed = df.copy()
     mask = df_processed["金融機関口座"].isna()
-    for idx in df_processed[mask].index:
-        asset_name = df_processed.loc[idx, "資産名"]
-        match = urds.df_asset_attribute[
-            urds.df_asset_attribute["資産名"].str.contains(asset_name, na=False)
-        ]
-        if not match.empty:
-            # 最初の一致を補完
-            df_processed.loc[idx, "金融機関口座"] = match.iloc[0]["金融機関口座"]
-        else:
-            # 一致がなければ NaN のまま
-            df_processed.loc[idx, "金融機関口座"] = np.nan
+    index = urds.get_asset_attribute_index()
+
+    def find_account(asset_name):
+        # 資産名を含む最初の資産属性の口座で補完（一致がなければ NaN のまま）
+        account = index.find_account(asset_name)
+        return np.nan if account is None else account
+
+    df_processed.loc[mask, "金融機関口座"] = df_processed.loc[mask, "資産名"].map(find_account)
     return df_processed
 
 @require_columns_with_dtype({"date": "datetime64[ns]","資産額": "float64","取得価格": "float64","保有数": "float64","評価損益": "float64","平均取得単価": "float64"})
@@ -372,21 +381,12 @@ def unify_asset_name(df):
 
 def register_nothing_date_asset_by_zero(df):
     # 欠けている資産はゼロで登録する
-    dfs=[]
-    asset_name_list_ref = urds.df_asset_attribute["資産名"].to_list()
-    for date in df["date"].unique():
-        asset_name_list = df[df["date"] == date]["資産名"].to_list()
-        diff_list = list(set(asset_name_list_ref) - set(asset_name_list))
-
-        df_add = pd.DataFrame({
-            "date": date,"資産名": diff_list,
-            "金融機関口座":np.nan,"資産額": 0.0,"取得価格":0.0
-        })
-        dfs.append(df_add)
-    df_result = pd.concat(dfs, ignore_index=True)
+    df_result = missing_date_key_rows(
+        df, df["date"].unique(), urds.df_asset_attribute["資産名"],
+        {"金融機関口座": np.nan, "資産額": 0.0, "取得価格": 0.0}
+    )
     df_final = pd.concat([df, df_result],axis=0)
-    df_final.sort_values("date", inplace=True)
-    df_final.reset_index(drop=True)
+    df_final.sort_values("date", inplace=True, kind="stable")
     return df_final
 
 @require_columns(["date", "資産額", "取得価格","保有数","評価損益","平均取得単価","金融機関口座","資産名"], df_arg_index=0)
@@ -1,31 +1,37 @@
 import pandas as pd
+import numpy as np
 import os
+import time
 import pdfplumber
 from pdfminer.pdfparser import PDFSyntaxError
 import logging
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from .decorator import check_args_types, require_columns, require_columns_with_dtype
+from .agg_settings import PDF_PAGES_PER_TASK
 
 #V002
-def process_single_pdf(date, PATH_ASSET_RAW_DATA):
-    fname = date.strftime("%y%m%d")
-    file_path = os.path.join(PATH_ASSET_RAW_DATA, fname + ".pdf")
+def extract_pdf_tables(file_path, fname, pages=None):
+    """
+    PDF からテーブルを抽出する
+    pages: 対象ページ番号（1始まり）のリスト。None なら全ページ
+    戻り値: (tables, complete) / complete=False は読み込みエラーあり（キャッシュしない）
+    テーブルはプロセス間の受け渡しを軽くするため tuple のタプルで返す
+    """
     tables_by_file = []
-
-    if not os.path.exists(file_path):
-        print(f"[WARN] PDF not found: {file_path}")
-        return fname, tables_by_file
+    complete = True
 
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page_idx, page in enumerate(pdf.pages):
+        with pdfplumber.open(file_path, pages=pages) as pdf:
+            for page in pdf.pages:
+                page_idx = page.page_number - 1
                 try:
                     tables = page.find_tables()
                     #if "251110" in file_path:
                     #    print(file_path, page_idx, len(tables))
                 except Exception as e:
                     print(f"[ERROR] Failed to detect tables in {fname} page {page_idx}: {e}")
+                    complete = False
                     continue
 
                 for table in tables:
@@ -33,6 +39,7 @@ def process_single_pdf(date, PATH_ASSET_RAW_DATA):
                         data = table.extract()
                     except Exception as e:
                         print(f"[ERROR] Failed to extract table in {fname} page {page_idx}: {e}")
+                        complete = False
                         continue
 
                     if not data or not data[0]:
@@ -40,94 +47,212 @@ def process_single_pdf(date, PATH_ASSET_RAW_DATA):
 
                     header = data[0]
                     if "預⾦・現⾦・暗号資産" not in header:
-                        tables_by_file.append(data)
+                        tables_by_file.append(tuple(tuple(row) for row in data))
 
     except PDFSyntaxError as e:
         print(f"[ERROR] Corrupted PDF (syntax error): {file_path}")
         print("        Details:", e)
+        complete = False
     except Exception as e:
         print(f"[ERROR] Unexpected error while reading PDF: {file_path}")
         print("        Details:", e)
+        complete = False
+
+    return tables_by_file, complete
+
+def _pdf_path(date, PATH_ASSET_RAW_DATA):
+    fname = date.strftime("%y%m%d")
+    return fname, os.path.join(PATH_ASSET_RAW_DATA, fname + ".pdf")
+
+def _count_pages(file_path):
+    """ページ数を返す。開けない PDF は None（ファイル単位のタスクにしてワーカー側でエラーを出す）"""
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return None
+
+def _split_pages(n_pages, pages_per_task):
+    if n_pages is None:
+        return [None]
+    return [
+        list(range(first, min(first + pages_per_task, n_pages + 1)))
+        for first in range(1, n_pages + 1, pages_per_task)
+    ] or [None]
+
+def _extract_first_pages_task(fname, file_path, pages_per_task):
+    """ファイルの最初のタスク。ページ数を数え、先頭のページだけ抽出する（残りは呼び出し側が投入する）"""
+    start = time.perf_counter()
+    n_pages = _count_pages(file_path)
+    pages = _split_pages(n_pages, pages_per_task)[0]
+    tables, complete = extract_pdf_tables(file_path, fname, pages=pages)
+    return fname, 1, tables, complete, time.perf_counter() - start, n_pages
+
+def _extract_pages_task(fname, file_path, pages):
+    start = time.perf_counter()
+    tables, complete = extract_pdf_tables(file_path, fname, pages=pages)
+    return fname, pages[0], tables, complete, time.perf_counter() - start, None
 
-    return fname, tables_by_file
+def resolve_max_workers(max_workers=None):
+    """ワーカー数。指定が無ければ CPU 数を使う"""
+    if max_workers:
+        return max_workers
+    return os.cpu_count() or 1
+
+def _print_timings(timings, wall, n_tasks, top=5):
+    busy = sum(timings.values())
+    print(
+        f"[INFO] Parsed {len(timings)} PDFs in {n_tasks} tasks: "
+        f"wall {wall:.1f}s, worker time {busy:.1f}s (x{busy / wall if wall else 0:.1f} parallel)"
+    )
+    for fname, elapsed in sorted(timings.items(), key=lambda x: x[1], reverse=True)[:top]:
+        print(f"        {fname}: {elapsed:.2f}s")
 
 @check_args_types({0: pd.Timestamp, 1: pd.Timestamp})
-def load_asset_raw_from_pdf(start_date, end_date, PATH_ASSET_RAW_DATA, max_workers=None):
-    all_tables_by_file = {}
+def load_asset_raw_from_pdf(start_date, end_date, PATH_ASSET_RAW_DATA, max_workers=None, cache=None,
+                            pages_per_task=PDF_PAGES_PER_TASK):
+    """
+    max_workers: ワーカー数（None なら CPU 数）
+    cache: PdfTableCache を渡すと、抽出済みの PDF は解析せずキャッシュから読む
+    pages_per_task: 1タスクで処理するページ数
+    """
+    tables_by_fname = {}
     dates = pd.date_range(start=start_date, end=end_date, freq="D")
 
+    # ---- キャッシュ参照（未抽出・変更された PDF だけ解析する） ----
+    pending = []
+    for date in dates:
+        fname, file_path = _pdf_path(date, PATH_ASSET_RAW_DATA)
+        if not os.path.exists(file_path):
+            print(f"[WARN] PDF not found: {file_path}")
+            continue
+        tables = cache.get(file_path) if cache is not None else None
+        if tables is None:
+            pending.append((fname, file_path))
+        else:
+            tables_by_fname[fname] = tables
+
     # --- 重要：WindowsではProcessPoolExecutor を mainブロック内で実行すること ---
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(process_single_pdf, date, PATH_ASSET_RAW_DATA): date
-            for date in dates
-        }
+    if pending:
+        start = time.perf_counter()
+        paths = dict(pending)
+        # ファイルごとに、ページ先頭番号 -> テーブル を集め、全チャンクが揃ったら確定する
+        parts = {fname: {} for fname, _ in pending}
+        complete = {fname: True for fname, _ in pending}
+        timings = {fname: 0.0 for fname, _ in pending}
 
-        for future in as_completed(futures):
-            fname, tables = future.result()
-            if tables:
-                all_tables_by_file[fname] = tables
+        with ProcessPoolExecutor(max_workers=resolve_max_workers(max_workers)) as executor:
+            # ページ数は親プロセスで数えず、ファイルごとの最初のタスクで数えて残りのページを投入する
+            futures = {
+                executor.submit(_extract_first_pages_task, fname, file_path, pages_per_task)
+                for fname, file_path in pending
+            }
+            remaining = {fname: 1 for fname, _ in pending}
+            n_tasks = len(futures)
 
-    return all_tables_by_file
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    fname, first_page, tables, ok, elapsed, n_pages = future.result()
+                    parts[fname][first_page] = tables
+                    complete[fname] &= ok
+                    timings[fname] += elapsed
+                    remaining[fname] -= 1
+                    if n_pages is not None:
+                        chunks = _split_pages(n_pages, pages_per_task)[1:]
+                        remaining[fname] += len(chunks)
+                        n_tasks += len(chunks)
+                        futures.update(
+                            executor.submit(_extract_pages_task, fname, paths[fname], pages)
+                            for pages in chunks
+                        )
+                    if remaining[fname]:
+                        continue
+
+                    tables = []
+                    for _, page_tables in sorted(parts.pop(fname).items()):
+                        tables.extend(page_tables)
+                    if cache is not None and complete[fname]:
+                        cache.put(paths[fname], tables)
+                    tables_by_fname[fname] = tables
+
+        _print_timings(timings, time.perf_counter() - start, n_tasks)
+
+    if cache is not None:
+        cache.save()
+        print(f"[INFO] {cache.summary()}")
+
+    # 日付順に並べ、テーブルが無いファイルは除く
+    return {
+        fname: tables_by_fname[fname]
+        for fname in sorted(tables_by_fname)
+        if tables_by_fname[fname]
+    }
+
+# 抽出テーブルの列名 -> 標準カラム（先に書いた列名を優先する）
+RAW_COLUMN_SYNONYMS = {
+    ("種類‧名称", "種類・名称", "銘柄名", "名称"): "資産名",
+    ("保有⾦融機関",): "金融機関口座",
+    ("残⾼", "評価額", "現在価値", "現在の価値"): "資産額",
+    ("取得価額",): "取得価格",
+    ("保有数",): "保有数",
+    ("評価損益",): "評価損益",
+    ("平均取得単価",): "平均取得単価"
+}
+RAW_COLUMNS = ["date","資産名","金融機関口座","資産額","取得価格","保有数","評価損益","平均取得単価"]
+
+def _map_header(header):
+    """ヘッダー行から {標準カラム: 列位置} を作る"""
+    positions = {}
+    for key_tuple, target_col in RAW_COLUMN_SYNONYMS.items():
+        for col in key_tuple:
+            if col in header:
+                positions[target_col] = header.index(col)
+                break  # 見つかったら次へ（重複防止）
+    return positions
 
 def get_asset_raw_from_table(all_tables_by_file):
     if not isinstance(all_tables_by_file, dict):
         raise TypeError("all_tables_by_file は dict を期待しています")
 
-    # 資産名、現在価値、取得価格などをサーチして取得する
-    df_raw_data = pd.DataFrame(columns=["date","資産名","金融機関口座","資産額","取得価格","保有数","評価損益","平均取得単価"])
+    # 資産名、現在価値、取得価格などをサーチして列ごとのリストに積み、最後に1回だけ DataFrame にする
+    value_columns = RAW_COLUMNS[1:]
+    columns = {col: [] for col in value_columns}
+    dates = []
     for file, file_data in all_tables_by_file.items():
+        try:
+            file_date = pd.to_datetime(file, format="%y%m%d")
+        except Exception:
+            print(f"[ERROR] Invalid date format in file name: {file}")
+            continue
+
         for table in file_data:
             # ---- (1) table 構造チェック ----
             if not table or not table[0]:
                 continue
+            header, rows = table[0], table[1:]
             # ---- (2) ヘッダー判定 ----
-            try:
-                if table[0][0] == "預⾦‧現⾦‧暗号資産":
-                    continue
-            except Exception:
+            if header[0] == "預⾦‧現⾦‧暗号資産":
                 continue
-            # ---- (3) DataFrame 変換 ----
-            try:
-                df_table = pd.DataFrame(table[1:], columns=table[0])
-            except Exception as e:
-                print(f"[ERROR] Failed to convert table in {file}: {e}")
+            # ---- (3) 行の長さチェック（ヘッダーより短い行は None で埋める） ----
+            width = len(header)
+            if any(len(row) > width for row in rows):
+                print(f"[ERROR] Failed to convert table in {file}: row is wider than header")
                 continue
-
-            # 新しい一時データフレーム（共通カラム構成で作る）
-            tmp_df = pd.DataFrame(columns=df_raw_data.columns)
-
-            # 各列をスキャンして、対応する標準カラムにマッピング
-            col_map = {
-                ("種類‧名称", "種類・名称", "銘柄名", "名称"): "資産名",
-                ("保有⾦融機関",): "金融機関口座",
-                ("残⾼", "評価額", "現在価値", "現在の価値"): "資産額",
-                ("取得価額",): "取得価格",
-                ("保有数",): "保有数",
-                ("評価損益",): "評価損益",
-                ("平均取得単価",): "平均取得単価"
-            }
-
-            for key_tuple, target_col in col_map.items():
-                for col in key_tuple:
-                    if col in df_table.columns:
-                        tmp_df[target_col] = df_table[col]
-                        break  # 見つかったら次へ（重複防止）
-
-            # ---- (5) 日付追加 ----
-            try:
-                tmp_df["date"] = pd.to_datetime(file, format="%y%m%d")
-            except Exception:
-                print(f"[ERROR] Invalid date format in file name: {file}")
-                continue
-            # ---- (6) tmp_df が実質空ならスキップ ----
-            if tmp_df.dropna(how="all").empty:
+            # ---- (4) 標準カラムへのマッピング。対応列が無い・行が無いならスキップ ----
+            positions = _map_header(header)
+            if not positions or not rows:
                 continue
-            # ---- (7) カラム全 NaN drop（初回はしない）----
-            bad_cols = df_raw_data.columns[df_raw_data.isna().all()]
-            if len(bad_cols) > 0:
-                df_raw_data = df_raw_data.drop(columns=bad_cols)
 
-            df_raw_data = pd.concat([df_raw_data, tmp_df], ignore_index=True)
+            for col in value_columns:
+                idx = positions.get(col)
+                if idx is None:
+                    columns[col].extend([np.nan] * len(rows))
+                else:
+                    columns[col].extend(row[idx] if idx < len(row) else None for row in rows)
+            # ---- (5) 日付追加 ----
+            dates.extend([file_date] * len(rows))
 
+    df_raw_data = pd.DataFrame(columns, columns=value_columns, dtype=object)
+    df_raw_data.insert(0, "date", pd.DatetimeIndex(dates, dtype="datetime64[ns]"))
     return df_raw_data
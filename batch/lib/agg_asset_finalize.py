@@ -1,11 +1,9 @@
 import pandas as pd
 import numpy as np
 import numpy_financial as npf
-from monthdelta import monthmod
-import datetime
 from ..lib import reference_data_store as urds
 from .decorator import require_columns
-from .main_helper import safe_pipe
+from .main_helper import safe_pipe, missing_date_key_rows
 from .file_io import save_csv
 import subprocess
 from .agg_settings import PATH_ASSET_ATTRIBUTE
@@ -40,22 +38,16 @@ def add_columns(df):
     return df_added
 
 def fill_missing_dates_forward(df, df_asset_profit):
-    # 全日付のDataFrameを作る
+    # 全日付 × 全資産のDataFrameを作る
     start_date = df_asset_profit["date"].max()
-    all_dates = pd.DataFrame({"date": pd.date_range(start_date, df["date"].max())})
-    
-    # 各資産ごとに処理
-    results = []
-    for asset, g in df.groupby("資産名"):
+    all_dates = pd.date_range(start_date, df["date"].max())
+    assets = df["資産名"].dropna().unique()
+    grid = pd.MultiIndex.from_product([all_dates, assets], names=["date", "資産名"]).to_frame(index=False)
 
-        merged = pd.merge_asof(all_dates, g.sort_values("date"), on="date", direction="backward")
-        merged["資産名"] = asset
-
-        min_date = g["date"].min()
-        merged = merged[merged["date"] >= min_date]
-
-        results.append(merged)
-    filled = pd.concat(results, ignore_index=True)
+    # 資産ごとに、その日以前で直近の行を当てる（資産の初回日付より前は一致が無いので除く）
+    source = df[df["資産名"].notna()].sort_values("date", kind="stable").assign(_matched=True)
+    filled = pd.merge_asof(grid, source, on="date", by="資産名", direction="backward")
+    filled = filled[filled["_matched"].notna()].drop(columns="_matched")
 
     df_before = df[df["date"] < start_date]
     df_updated = pd.concat([df_before, filled], ignore_index=True)
@@ -65,21 +57,16 @@ def fill_missing_dates_forward(df, df_asset_profit):
 def fill_missing_asset_name(df, df_asset_profit):
     df_data = df.copy()
     df_data.reset_index(drop=True, inplace=True)
-    df_ref = urds.df_asset_attribute.copy()
 
     end_date = df_asset_profit["date"].max()
-    dfs = []
-    for date in pd.date_range(start="2024-12-01", end=end_date):
-        asset_list_data = df_data[df_data["date"] == date]["資産名"].to_list()
-        asset_list_ref = df_ref["資産名"].to_list()
-        diff_list = list(set(asset_list_ref) - set(asset_list_data))
-        df_add = pd.DataFrame({\
-            "date": date,"資産名": diff_list,\
-            "資産タイプ":np.nan,"資産サブタイプ":np.nan,\
-            "金融機関口座":np.nan,"資産額": 0.0,"トータルリターン":np.nan,\
-            "含み損益":np.nan,"実現損益":np.nan,"取得価格":0.0})
-        dfs.append(df_add)
-    df_result = pd.concat(dfs, ignore_index=True)
+    df_result = missing_date_key_rows(
+        df_data, pd.date_range(start="2024-12-01", end=end_date), urds.df_asset_attribute["資産名"],
+        {
+            "資産タイプ":np.nan,"資産サブタイプ":np.nan,
+            "金融機関口座":np.nan,"資産額": 0.0,"トータルリターン":np.nan,
+            "含み損益":np.nan,"実現損益":np.nan,"取得価格":0.0
+        }
+    )
     df_final = pd.concat([df_data, df_result],axis=0)
     return df_final
 
@@ -117,18 +104,42 @@ def fill_missing_others(df):
         df_filled.loc[df["資産名"] == item, "金融機関口座"] = subtype
     return df_filled
 
-def cal_pension(df, df_asset_profit):
+def _elapsed_months(start_date, dates):
+    """start_date から各日付までの経過月数（monthmod と同じく、日が開始日に達して1か月と数える）"""
+    start_date = pd.Timestamp(start_date)
+    dates = pd.DatetimeIndex(dates)
+    months = (dates.year - start_date.year) * 12 + (dates.month - start_date.month)
+    return np.where(dates.day < start_date.day, months - 1, months)
+
+def cal_pension(df, df_asset_profit, pension_parameters=None):
     df_cal = df.copy()
-    start_date_PersonalPension = datetime.date(2012,3,28)
-    start_date = df_asset_profit["date"].max().date()
-    end_date = df_cal["date"].max().date()
-    for date in pd.date_range(start=start_date, end=end_date):
-        rel_delta, remainder = monthmod(start_date_PersonalPension, date.date())
-        value_asset = npf.fv(0.0111/12, rel_delta.months, -20412, 0)
-        value_acquisition = 20412 * rel_delta.months
-        mask = (df_cal["資産サブタイプ"] == "確定年金") & (df_cal["date"] == date)
-        df_cal.loc[mask, "資産額"] = value_asset
-        df_cal.loc[mask, "取得価格"] = value_acquisition
+    params = urds.PENSION_PARAMETERS if pension_parameters is None else pension_parameters
+    start_date = df_asset_profit["date"].max().normalize()
+    end_date = df_cal["date"].max().normalize()
+    in_range = (df_cal["date"] >= start_date) & (df_cal["date"] <= end_date)
+
+    # 行ごとに適用する年金パラメータを決める
+    n = len(df_cal)
+    target = np.zeros(n, dtype=bool)
+    months = np.zeros(n)
+    monthly_rate = np.zeros(n)
+    payment = np.zeros(n)
+    for param in params:
+        mask = in_range & (df_cal["資産サブタイプ"] == param["資産サブタイプ"])
+        if param.get("資産名"):
+            mask &= df_cal["資産名"] == param["資産名"]
+        mask = mask.to_numpy() & ~target
+        months[mask] = _elapsed_months(param["開始日"], df_cal.loc[mask, "date"])
+        monthly_rate[mask] = param["年利"] / 12
+        payment[mask] = param["月額掛金"]
+        target |= mask
+
+    # 積立額の将来価値と掛金累計をまとめて計算して一度に反映する
+    # 年利0の商品は npf.fv 内で 0 除算になるが、結果は掛金累計が選ばれる
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value_asset = npf.fv(monthly_rate[target], months[target], -payment[target], 0)
+    value_acquisition = payment[target] * months[target]
+    df_cal.loc[target, ["資産額", "取得価格"]] = np.column_stack([value_asset, value_acquisition])
     return df_cal
 
 @require_columns(["date", "資産額", "取得価格","金融機関口座","資産名"], df_arg_index=0)
@@ -1,5 +1,7 @@
 import pandas as pd
-from .reference_data_store import BALANCE_RULES
+import numpy as np
+import re
+from .reference_data_store import BALANCE_RULES, LIVING_ADJUST_RULES
 from .decorator import require_columns, check_args_types
 
 def filter_and_clean_raw(start_date, end_date, df):
@@ -25,35 +27,121 @@ def set_detail_from_raw(df_detail, df_filtered, item):
     df["収支項目"] = item
     return pd.concat([df_detail, df], ignore_index=True)
 
-@require_columns(["date", "金額", "保有金融機関", "大項目", "中項目", "内容", "メモ"], df_arg_index=1)
-def collect_balance(df_balance_detail, df_raw):
-    def combine(*dfs):
-        dfs = [d for d in dfs if d is not None and not d.empty]
-        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
-    for category, conditions in BALANCE_RULES.items():
-        dfs = []
-        for cond in conditions:
-            if len(cond) == 2 and isinstance(cond[0], str):
-                dfs.append(single_filter_df_by_value(df_raw, cond[0], cond[1]))
-            else:
-                dfs.append(double_filter_df_by_value(df_raw, cond[0][0], cond[0][1], cond[1][0], cond[1][1]))
-
-        df_tmp = combine(*dfs)
-        df_balance_detail = set_detail_from_raw(df_balance_detail, df_tmp, category)
-
-    return df_balance_detail
+class BalanceRuleClassifier:
+    """
+    BALANCE_RULES による収支項目の判定。
+
+    条件の文字列を列ごとにまとめ、各列のユニーク値に対して1回だけ部分一致を判定する
+    （全パターンの正規表現で一致しない値を先に除外する）。二重条件は行単位の AND で評価する。
+
+    match:
+        "first": 各行を最初に一致した収支項目にだけ割り当てる
+        "multi": 一致したすべての収支項目に割り当てる（同じ収支項目の複数条件に一致しても1行）
+    """
+    MATCH_MODES = ("first", "multi")
+
+    def __init__(self, rules):
+        self.categories = list(rules)
+        # (収支項目, ((列, 値), ...)) のリスト。単一条件も1要素のタプルにそろえる
+        self.rules = []
+        for category, conditions in rules.items():
+            for cond in conditions:
+                if len(cond) == 2 and isinstance(cond[0], str):
+                    cond = (cond,)
+                self.rules.append((category, tuple(cond)))
+
+        self.patterns = {}
+        for _, conds in self.rules:
+            for col, value in conds:
+                values = self.patterns.setdefault(col, [])
+                if value not in values:
+                    values.append(value)
+        self._prefilter = {
+            col: re.compile("|".join(re.escape(v) for v in values))
+            for col, values in self.patterns.items()
+        }
+        self.hits = None
+        self.n_rows = self.n_unmatched = self.n_multi = 0
+
+    def _column_matches(self, series, col):
+        """各行が列のパターンを含むかどうか（行 × パターン）"""
+        values = self.patterns[col]
+        codes, uniques = pd.factorize(series)
+        # 最終行は欠損値（codes=-1）用で常に False
+        table = np.zeros((len(uniques) + 1, len(values)), dtype=bool)
+        prefilter = self._prefilter[col]
+        for i, text in enumerate(uniques):
+            if isinstance(text, str) and prefilter.search(text):
+                table[i] = [v in text for v in values]
+        return table[codes]
+
+    def match_matrix(self, df):
+        """各行が各ルールに一致するかどうか（行 × ルール）"""
+        col_matches = {col: self._column_matches(df[col], col) for col in self.patterns}
+        matrix = np.ones((len(df), len(self.rules)), dtype=bool)
+        for j, (_, conds) in enumerate(self.rules):
+            for col, value in conds:
+                matrix[:, j] &= col_matches[col][:, self.patterns[col].index(value)]
+        return matrix
+
+    def classify(self, df, match="multi"):
+        """一致した行に 収支項目 列を付けて返す（収支項目の順、元の行順）"""
+        if match not in self.MATCH_MODES:
+            raise ValueError(f"match は {self.MATCH_MODES} のいずれかを指定してください: {match}")
+
+        rule_matrix = self.match_matrix(df)
+        category_matrix = np.zeros((len(df), len(self.categories)), dtype=bool)
+        for j, (category, _) in enumerate(self.rules):
+            category_matrix[:, self.categories.index(category)] |= rule_matrix[:, j]
+
+        n_matched = category_matrix.sum(axis=1)
+        self.hits = pd.DataFrame({
+            "収支項目": [category for category, _ in self.rules],
+            "条件": [" & ".join(f"{col}⊇{value}" for col, value in conds) for _, conds in self.rules],
+            "件数": rule_matrix.sum(axis=0),
+        })
+        self.n_rows = len(df)
+        self.n_unmatched = int((n_matched == 0).sum())
+        self.n_multi = int((n_matched > 1).sum())
+
+        if match == "first":
+            first = np.argmax(category_matrix, axis=1)
+            category_matrix = np.zeros_like(category_matrix)
+            category_matrix[n_matched > 0, first[n_matched > 0]] = True
+
+        dfs = [
+            df[category_matrix[:, k]].assign(収支項目=category)
+            for k, category in enumerate(self.categories)
+            if category_matrix[:, k].any()
+        ]
+        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=[*df.columns, "収支項目"])
+
+    def report(self):
+        """判定件数の診断出力"""
+        print(
+            f"[INFO] 収支ルール判定: {self.n_rows}行 / 未分類 {self.n_unmatched}行 / "
+            f"複数の収支項目に一致 {self.n_multi}行"
+        )
+        for _, row in self.hits[self.hits["件数"] == 0].iterrows():
+            print(f"[WARN] 一致する行がないルール: {row['収支項目']} ({row['条件']})")
 
-def collect_living_adjust(df_balance_detail):
-    accounts = ["PayPayカード", "Amazon.co.jp", "楽天市場", "Yahoo!ショッピング", "さとふる", "楽天市場(my Rakuten)"]
-    items = ["子供費用","子供","家電","ふるさと納税","固定資産税","自動車税"]
-
-    df_Living_adjust = pd.DataFrame()
-    for item in items:
-        for account in accounts:
-            df = single_filter_df_exact_match_by_value(df_balance_detail, "収支項目", item)
-            df = single_filter_df_by_value(df, "保有金融機関", account)
-            df_Living_adjust = pd.concat([df_Living_adjust, df], axis=0)
-            #display(df)
+@require_columns(["date", "金額", "保有金融機関", "大項目", "中項目", "内容", "メモ"], df_arg_index=1)
+def collect_balance(df_balance_detail, df_raw, match="multi"):
+    classifier = BalanceRuleClassifier(BALANCE_RULES)
+    df_classified = classifier.classify(df_raw, match=match)
+    classifier.report()
+    return pd.concat([df_balance_detail, df_classified], ignore_index=True)
+
+def collect_living_adjust(df_balance_detail, rules=None):
+    rules = LIVING_ADJUST_RULES if rules is None else rules
+    account_pattern = "|".join(re.escape(account) for account in rules["保有金融機関"])
+
+    # 対象の収支項目かつ対象の保有金融機関（部分一致）の行。1行は1回だけ数える
+    mask = (
+        df_balance_detail["収支項目"].isin(rules["収支項目"]) &
+        df_balance_detail["保有金融機関"].str.contains(account_pattern, na=False, regex=True)
+    )
+    df_Living_adjust = df_balance_detail[mask]
     monthly_sum = (
         df_Living_adjust.groupby(df_Living_adjust["date"].dt.to_period("M"))["金額"]
         .sum()
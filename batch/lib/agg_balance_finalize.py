@@ -1,52 +1,72 @@
 from ..lib import reference_data_store as urds
 import pandas as pd
-import itertools
 from .decorator import require_columns, check_args_types
 
+# balance_detail に日次で持つ収支項目（この順に並ぶ）
+BALANCE_ITEMS = ['車検A', '給与', '車検B', 'ポイント', 'NTT', '車', '年金', '児童手当', '生活費',
+                '子供費用', 'ローン返済', 'ローン一括', '所得税還付', '特典', '家電', 'ふるさと納税',
+                '固定資産税', '自動車税', '子供', '年末調整', '賞与', '退職金', '贈与']
 
-def fill_missing_dates(start_date, end_date, df):
-    items = ['車検A', '給与', '車検B', 'ポイント', 'NTT', '車', '年金', '児童手当', '生活費',
-            '子供費用', 'ローン返済', 'ローン一括', '所得税還付', '特典', '家電', 'ふるさと納税',
-            '固定資産税', '自動車税', '子供', '年末調整', '賞与', '退職金', '贈与']
+# 日数 × 収支項目ぶん同じ文字列が並ぶ列は category で持つ（parquet も辞書エンコードになる）
+CATEGORY_COLUMNS = ["収支項目", "収支タイプ", "収支カテゴリー"]
 
-    all_combinations = pd.DataFrame(
-        list(itertools.product(pd.date_range(start_date, end_date, freq="D"), items)),
-        columns=["date", "収支項目"]
 
+def fill_missing_dates(start_date, end_date, df, items=None):
+    """
+    日付 × 収支項目の全組み合わせに揃え、無い組み合わせの金額を 0 にする。
+    items に無い収支項目の行は落とす。収支項目は category になる。
+    """
+    items = BALANCE_ITEMS if items is None else items
+    index = pd.MultiIndex.from_product(
+        [pd.date_range(start_date, end_date, freq="D"), items], names=["date", "収支項目"]
     )
-    df_full = pd.merge(all_combinations, df, on=["date", "収支項目"], how="left")
+    df_full = df.set_index(["date", "収支項目"]).reindex(index).reset_index()
     df_full["金額"] = df_full["金額"].fillna(0)
+    df_full["収支項目"] = pd.Categorical(df_full["収支項目"], categories=items)
     return df_full
 
 def add_type_and_category(df):
-    df["収支タイプ"] = pd.Series(dtype="object")
-    df["収支カテゴリー"] = pd.Series(dtype="object")
-    item_cols = df["収支項目"].unique().tolist()
-    df_tmp = urds.df_balance_attribute
-
-    for item in item_cols:
-        type = df_tmp.loc[df_tmp["収支項目"] == item, "収支タイプ"].iloc[0]
-        category = df_tmp.loc[df_tmp["収支項目"] == item, "収支カテゴリー"].iloc[0]
-        df.loc[df["収支項目"] == item, "収支タイプ"] = type
-        df.loc[df["収支項目"] == item, "収支カテゴリー"] = category
+    """収支属性から収支タイプ・収支カテゴリーを付ける（収支項目ごとに最初の行を使う）"""
+    df_attr = urds.df_balance_attribute.drop_duplicates("収支項目").set_index("収支項目")
+    missing = set(df["収支項目"].dropna().unique()) - set(df_attr.index)
+    if missing:
+        raise KeyError(f"収支属性に登録されていない収支項目があります: {sorted(missing)}")
+
+    for col in ["収支タイプ", "収支カテゴリー"]:
+        df[col] = df["収支項目"].map(df_attr[col]).astype("category")
     return df
 
+def _align_categories(df_left, df_right, cols):
+    """両方の列を同じカテゴリーの category に揃える（merge をコードのまま行うため）"""
+    for col in cols:
+        left = df_left[col].astype("category").cat.categories
+        right = pd.Index(df_right[col].dropna().unique())
+        dtype = pd.CategoricalDtype(left.union(right, sort=False))
+        df_left[col] = df_left[col].astype(dtype)
+        df_right[col] = df_right[col].astype(dtype)
+
 def add_target(start_date, end_date, df):
     mask = (df["date"] >= start_date) & (df["date"] <= end_date)
-    df = df[mask]
+    df = df[mask].copy()
 
     mask = (urds.df_balance_target["date"] >= start_date) & (urds.df_balance_target["date"] <= end_date+pd.DateOffset(years=3))
     df_target = urds.df_balance_target[mask]
-    df_target = df_target[~df_target["収支項目"].str.contains("年金拠出", na=False)]
+    df_target = df_target[~df_target["収支項目"].str.contains("年金拠出", na=False)].copy()
     df_target.loc[df_target["収支カテゴリー"] == "支出", "目標"] *= -1
 
+    _align_categories(df, df_target, CATEGORY_COLUMNS)
     df_merge = pd.merge(df, df_target,on=["date","収支項目","収支タイプ","収支カテゴリー"],how="outer")
     df_merge["金額"] = df_merge["金額"].fillna(0)
     return df_merge
 
+def drop_empty_rows(df):
+    """実績が 0 で、目標も無い（または 0 の）行を落とす"""
+    mask = (df["金額"] != 0) | (df["目標"].fillna(0) != 0)
+    return df[mask].reset_index(drop=True)
+
 @check_args_types({0: pd.Timestamp, 1: pd.Timestamp})
 @require_columns(["date", "収支項目", "金額",'内容', '保有金融機関', '大項目', '中項目', 'メモ'], df_arg_index=2)
-def finalize_data(start_date, end_date, df):
+def finalize_data(start_date, end_date, df, sparse=False):
     df_finalized = df.copy()
     # 不要列を削除し、日付順に並び替えます
     df_removed = df_finalized.drop(['内容', '保有金融機関', '大項目', '中項目', 'メモ'], axis=1)\
@@ -59,5 +79,7 @@ def finalize_data(start_date, end_date, df):
     df_add_type = add_type_and_category(df_filled_missing_dates)
     # 目標の列を追加します。
     df_add_target = add_target(start_date, end_date, df_add_type)
-
+    # 疎な保存では、実績・目標とも 0 の行を落とします。
+    if sparse:
+        return drop_empty_rows(df_add_target)
     return df_add_target
@@ -3,6 +3,7 @@ import numpy as np
 from ..lib import reference_data_store as urds
 from .agg_balance_collection import single_filter_df_by_value, double_filter_df_by_value
 from .main_helper import safe_pipe
+from .loan_engine import rate_on_dates, loan_balance_path
 
 # 対象：国内株式、投資信託、確定年金、確定拠出年金、セキュリティートークン
 # 含み損益を計算
@@ -43,27 +44,8 @@ def _get_asset_name(accounts, asset_name_key, sub_type_filters=None):
     if pd.isna(asset_name_key) or not isinstance(asset_name_key, str):
         return None
 
-    # フィルタ条件を動的に作る
-    if sub_type_filters:
-        mask_sub_type = urds.df_asset_attribute["資産サブタイプ"].isin(sub_type_filters)
-    else:
-        mask_sub_type = True
-    mask_name = mask_sub_type & urds.df_asset_attribute["資産名"].str.contains(asset_name_key, na=False)
-
-    if pd.isna(accounts) or not isinstance(accounts, str) or accounts.strip() == "":
-        # 銀行名が空 ⇒ 金融機関口座を絞り込まない（全件対象）
-        mask_account = True
-    else:
-        mask_account = urds.df_asset_attribute["金融機関口座"].str.contains(accounts, na=False)
-
-    # 条件適用
-    df_sub = urds.df_asset_attribute[mask_account & mask_name]
-
-    # 結果
-    if not df_sub.empty:
-        return df_sub.iloc[0]["資産名"]
-    else:
-        return None
+    # 銀行名が空 ⇒ 金融機関口座を絞り込まない（全件対象）
+    return urds.get_asset_attribute_index().find_asset_name(accounts, asset_name_key, sub_type_filters)
 
 # 対象：普通預金、定期預金、仕組預金
 # 預金の実現損益を計算
@@ -243,7 +225,75 @@ def set_realized_dividend(df_balance_raw):
     )
     return df_in[["date", "資産名", "実現損益"]]
 
-def _set_realized_capital(df_asset_profit,df_balance_raw):
+# 売却損益の計算方法（average: 移動平均法 / estimated_lots: 推定口数による先入先出の近似）
+LOT_METHODS = ("average", "estimated_lots")
+
+def _estimated_lot_realized_gain(df, diff):
+    """
+    推定口数による売却損益（先入先出法の近似。全資産をまとめて配列で計算）
+    資産データに保有数が無いため、口数は資産額から作った基準価額で推定する。
+    推定した口数がずれると売却原価もずれるので、厳密な先入先出法の値ではない。
+    - 基準価額は売買の無い日の資産額の変化率を累積したもの
+    - 初日の保有分と取得価格の増加分を、その日の基準価額で買い付けたロットとする
+    - 売却口数は 取得価格の減少分 ÷ 前日の平均取得単価（前日の取得価格 ÷ 推定保有口数）
+    - 売却原価は売却口数を古いロットから順に取り崩した額、売却額は売却口数 × 前日の基準価額
+
+    保有口数は held[t] = held[t-1] * (1 - f[t]) + lot_units[t]（f: 売却割合）の線形漸化式なので、
+    累積積による閉形式で求める。全量売却（f = 1）の日で区間を切って計算し直す。
+    """
+    # 資産ごとに行が連続するよう並べ替える（資産内の順序は保つ）
+    codes = df.groupby("資産名", sort=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    asset = codes[order]
+    d = diff.to_numpy(dtype=float)[order]
+    value = df["資産額"].to_numpy(dtype=float)[order]
+    acquisition = df["取得価格"].to_numpy(dtype=float)[order]
+
+    first = np.ones(len(asset), dtype=bool)
+    first[1:] = asset[1:] != asset[:-1]
+
+    def previous(x, fill):
+        return np.where(first, fill, np.roll(x, 1))
+
+    def by(keys, x):
+        return pd.Series(x).groupby(keys)
+
+    prev_value = previous(value, np.nan)
+    prev_acquisition = previous(acquisition, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where((d == 0) & (prev_value > 0) & (value > 0), value / prev_value, 1.0)
+        price = by(asset, ratio).cumprod().to_numpy()
+        prev_price = previous(price, price)
+
+        lot_cost = np.where(first, acquisition, np.where(d > 0, d, 0.0))
+        lot_units = np.where(first, np.maximum(value, 0.0), lot_cost) / price
+
+        # 売却割合と保有口数（全量売却の日から区間を切り直す）
+        f = np.where((d < 0) & (prev_acquisition > 0), np.minimum(-d / prev_acquisition, 1.0), 0.0)
+        segment = np.cumsum(first | (f == 1.0))
+        growth = by(segment, np.where(first | (f == 1.0), 1.0, 1.0 - f)).cumprod().to_numpy()
+        held = growth * by(segment, lot_units / growth).cumsum().to_numpy()
+        units_sold = f * previous(held, 0.0)
+
+    # 全資産のロットを1本の累積に並べ、資産ごとの起点からの売却口数で原価を引く
+    lot_units = np.where(lot_units > 0, lot_units, 0.0)
+    lot_cost = np.where(lot_units > 0, lot_cost, 0.0)
+    cum_units = np.concatenate([[0.0], np.cumsum(lot_units)])
+    cum_cost = np.concatenate([[0.0], np.cumsum(lot_cost)])
+    base = cum_units[:-1][first][asset]
+    stop = cum_units[1:][np.roll(first, -1)][asset]
+    sold_end = np.minimum(base + by(asset, units_sold).cumsum().to_numpy(), stop)
+    sold_start = np.maximum(sold_end - units_sold, base)
+    sold_cost = np.interp(sold_end, cum_units, cum_cost) - np.interp(sold_start, cum_units, cum_cost)
+
+    gains = np.empty(len(asset))
+    gains[order] = units_sold * prev_price - sold_cost
+    return pd.Series(gains, index=df.index)
+
+def _set_realized_capital(df_asset_profit, df_balance_raw, lot_method="average"):
+    if lot_method not in LOT_METHODS:
+        raise ValueError(f"lot_method は {LOT_METHODS} のいずれかを指定してください: {lot_method}")
+
     # 対象資産名
     target_sub_type = ["国内株式","投資信託","セキュリティートークン"]
     df = urds.df_asset_attribute.copy()
@@ -252,25 +302,30 @@ def _set_realized_capital(df_asset_profit,df_balance_raw):
         (df["金融機関口座"] != "FOLIO")
     target_asset = df[mask]["資産名"].to_list()
 
-    df = df_asset_profit.set_index("date")
-    df_tmp = pd.DataFrame(columns=["date","資産名","実現損益"])
-
-    for asset in target_asset:
-        df_diff = df[df["資産名"] == asset]["取得価格"].diff().fillna(0)
-        df_sale = df_diff[df_diff<-5]
-        for date, value in df_sale.items():
-            mask = (df.index == (date-pd.Timedelta(days=1))) & (df["資産名"] == asset)
-            predate_acquisition = df[mask]["取得価格"].iloc[0]
-            predate_unrealized_profit = df[mask]["含み損益"].iloc[0]
-            gain_loss_on_sale= predate_unrealized_profit * abs(value / predate_acquisition)
-            df_tmp.loc[len(df_tmp)] = {"date":date, "資産名":asset, "実現損益":gain_loss_on_sale}
-    return df_tmp
-
-def set_realized_dividend_and_capital(df_asset_profit,df_balance_raw):
+    # 資産ごとに取得価格の差分と前日の値を求め、取得価格が減った日を売却とみなす
+    df = df_asset_profit[df_asset_profit["資産名"].isin(target_asset)]
+    grouped = df.groupby("資産名", sort=False)
+    diff = grouped["取得価格"].diff().fillna(0)
+    sale = diff < -5
+
+    if lot_method == "average":
+        predate_acquisition = grouped["取得価格"].shift()
+        predate_unrealized_profit = grouped["含み損益"].shift()
+        gain_loss_on_sale = predate_unrealized_profit * (diff / predate_acquisition).abs()
+    else:
+        gain_loss_on_sale = _estimated_lot_realized_gain(df, diff)
+
+    return pd.DataFrame({
+        "date": df.loc[sale, "date"],
+        "資産名": df.loc[sale, "資産名"],
+        "実現損益": gain_loss_on_sale[sale],
+    }).reset_index(drop=True)
+
+def set_realized_dividend_and_capital(df_asset_profit,df_balance_raw,lot_method="average"):
     # 配当所得
     df_reg_dividend = set_realized_dividend(df_balance_raw)
     # 売却損益
-    df_reg_capital = _set_realized_capital(df_asset_profit,df_balance_raw)
+    df_reg_capital = _set_realized_capital(df_asset_profit,df_balance_raw,lot_method=lot_method)
     # 結合
     df_reg_dividend_and_capital = pd.merge(
         df_reg_dividend, df_reg_capital, on=["date","資産名"], how="outer", suffixes=["_x","_y"]
@@ -378,19 +433,8 @@ def set_total_returns(df_asset_profit):
     df.reset_index(inplace=True)
     return df
 
-def _get_loan_interest_rate(date):
-    # 2024/10/1 - 2025/1/1: 0.65%
-    if date < pd.Timestamp("2025-01-01"):
-        return 0.0065
-    # 2025/1/1 - 2025/7/1: 0.75%
-    elif date < pd.Timestamp("2025-07-01"):
-        return 0.0075
-    # 2025/7/1 - ... : 1.0%
-    else:
-        return 0.0100
-
 def set_loan_balance(df_asset_profit, START_DATE, end_date, df_balance):
-    df = df_asset_profit.set_index("date").copy()
+    df = df_asset_profit.copy()
 
     mask = df_balance["収支項目"].isin(["ローン返済", "ローン一括"])
     loan_repayment = (
@@ -400,20 +444,14 @@ def set_loan_balance(df_asset_profit, START_DATE, end_date, df_balance):
         .reindex(pd.date_range(START_DATE, end_date), fill_value=0)
     )
 
-    current_balance = -22424499.520794038    # 2024/10/1
     dates = loan_repayment.index
-    
-    debt_mask = df["資産タイプ"] == "負債"
-    for d, repayment in loan_repayment.items():
-        rate = _get_loan_interest_rate(d)
-        daily_interest = current_balance * rate / 365
-
-        new_balance = current_balance + daily_interest - repayment
-        new_balance = min(new_balance, 0)
-        current_balance = new_balance
-
-        if d in df.index:
-            df.loc[debt_mask & (df.index == d), "資産額"] = new_balance
+    daily_rate = rate_on_dates(urds.LOAN_RATE_SCHEDULE, "ローン金利", dates) / 365
+    balance = pd.Series(
+        loan_balance_path(urds.LOAN_INITIAL_BALANCE, daily_rate, -loan_repayment.to_numpy()),
+        index=dates
+    )
 
-    df.reset_index(inplace=True)
-    return df
+    # 負債の行に日付で合わせて一度に反映する
+    debt_mask = (df["資産タイプ"] == "負債") & df["date"].isin(dates)
+    df.loc[debt_mask, "資産額"] = balance.reindex(df.loc[debt_mask, "date"]).to_numpy()
+    return df.reset_index(drop=True)
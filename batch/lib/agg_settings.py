@@ -16,9 +16,31 @@ PATH_BALANCE_DETAIL = "G:/マイドライブ/AssetManager/total/output/balance_d
 PATH_ASSET_RAW_DATA = "G:/マイドライブ/AssetManager/assetData/資産内訳"
 PATH_BALANCE_RAW_DATA = "G:/マイドライブ/AssetManager/assetData/収支CSV"
 
+# PDF テーブル抽出結果のキャッシュ (batch/lib/pdf_table_cache.py)
+PATH_PDF_TABLE_CACHE = "G:/マイドライブ/AssetManager/total/cache/pdf_tables"
+
+# PDF 解析の並列設定（PDF_MAX_WORKERS=None なら CPU 数）
+PDF_MAX_WORKERS = None
+PDF_PAGES_PER_TASK = 4
+
 # Intermediate file path for Development
 PATH_ASSET_PROFIT_DETAIL_TEST = "G:/マイドライブ/AssetManager/total/output/asset_detail_test.parquet"
 PATH_ASSET_PROFIT_DETAIL_TEST2 = "G:/マイドライブ/AssetManager/total/output/asset_detail_test2.parquet"
 
+# Cache Table Path (APIへアップロードして *_cache_* テーブルとして配信する)
+PATH_ASSET_CACHE_DAILY = "G:/マイドライブ/AssetManager/total/cache/asset_cache_daily.parquet"
+PATH_ASSET_CACHE_MONTHLY = "G:/マイドライブ/AssetManager/total/cache/asset_cache_monthly.parquet"
+PATH_ASSET_CACHE_YEARLY = "G:/マイドライブ/AssetManager/total/cache/asset_cache_yearly.parquet"
+PATH_CATEGORY_CACHE_DAILY = "G:/マイドライブ/AssetManager/total/cache/category_cache_daily.parquet"
+PATH_CATEGORY_CACHE_MONTHLY = "G:/マイドライブ/AssetManager/total/cache/category_cache_monthly.parquet"
+PATH_CATEGORY_CACHE_YEARLY = "G:/マイドライブ/AssetManager/total/cache/category_cache_yearly.parquet"
+PATH_SUBTYPE_CACHE_DAILY = "G:/マイドライブ/AssetManager/total/cache/subtype_cache_daily.parquet"
+
+# 売却損益の計算方法（average: 移動平均法 / estimated_lots: 推定口数による先入先出の近似）
+REALIZED_CAPITAL_LOT_METHOD = "average"
 
+# 収支ルールの判定方法（multi: 一致したすべての収支項目 / first: 最初に一致した収支項目のみ）
+BALANCE_RULE_MATCH = "multi"
 
+# balance_detail に実績・目標とも 0 の行を保存しない（ダッシュボードは読み込み時に日付の格子へ戻す）
+BALANCE_DETAIL_SPARSE = True
@@ -96,6 +96,23 @@ def make_asset_cache_monthly(df_asset_profit, start_date, end_date):
 def make_asset_cache_yearly(df_asset_profit, start_date_yearly, end_date):
     return _make_asset_cache_aggregated(df_asset_profit, start_date_yearly, end_date, 'Y')
 
+# 資産サブタイプごとのキャッシュDB用 - LONG型
+# (サブタイプは種類が多く、WIDE型にすると列名が長くなりすぎるためLONG型で持つ)
+def make_subtype_cache_daily(df_asset_profit, start_date, end_date):
+    df = _filter_by_date(df_asset_profit, start_date, end_date)
+    df_agg = (
+        df
+        .groupby(['date', '資産サブタイプ'], as_index=False, dropna=False)
+        .agg({
+            "資産タイプ": 'max',
+            "資産額": 'sum',
+            "トータルリターン": 'sum',
+            "取得価格": 'sum',
+        })
+    )
+    df_agg.reset_index(drop=True, inplace=True)
+    return df_agg
+
 # カテゴリーごとのキャッシュDB用 - WIDE型
 def make_category_cache_daily(df_asset_profit, df_balance, df_target, start_date, end_date):
     # 資産 - 実績
@@ -2,6 +2,9 @@ import pandas as pd
 import os
 from .exceptions import FileFormatError, MissingFileError, RawDataError
 
+# 保存する parquet の圧縮形式（API へのアップロード量を減らすため zstd）
+PARQUET_COMPRESSION = "zstd"
+
 def load_parquet(filepath):
     if not filepath.lower().endswith(".parquet"):
         raise FileFormatError(f"Not a parquet file: {filepath}")
@@ -37,7 +40,7 @@ def save_parquet(df, filepath):
     tmp_path = filepath + ".tmp"
 
     try:
-        df.to_parquet(tmp_path, engine='pyarrow')
+        df.to_parquet(tmp_path, engine='pyarrow', compression=PARQUET_COMPRESSION)
         os.replace(tmp_path, filepath)
     except Exception as e:
         raise RawDataError(f"Failed to save parquet: {filepath}\n{e}")
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# ローン残高の計算（実績: agg_profit_cal.set_loan_balance / 目標: target_asset_cal._cal_target_data で共用）
+
+def rate_on_dates(df_rate, rate_name, dates):
+    """
+    金利テーブルから各日付に適用される金利を返す（ステップ関数）。
+
+    Args:
+        df_rate (pd.DataFrame): "日付" と rate_name 列を持つ金利テーブル。各日付以降その金利を適用する。
+        rate_name (str): 金利の列名（例: "ローン金利"）。
+        dates (pd.DatetimeIndex): 対象日付。
+
+    Returns:
+        np.ndarray: 各日付の金利（年率）。最初の日付より前は最初の金利を使う。
+    """
+    df = df_rate[['日付', rate_name]].dropna().sort_values('日付')
+    key_dates = pd.to_datetime(df["日付"].values)
+    key_values = df[rate_name].to_numpy(dtype=float)
+
+    # side='right' → 同日ならその値を使う
+    idx = np.searchsorted(key_dates.values, pd.to_datetime(dates).values, side='right') - 1
+    idx[idx < 0] = 0
+    return key_values[idx]
+
+def loan_balance_path(initial_balance, daily_rate, payments):
+    """
+    ローン残高の推移を計算する。
+
+        balance[t] = min(balance[t-1] * (1 + daily_rate[t]) + payments[t], 0)
+        balance[-1] = initial_balance
+
+    残高は負値（負債）で持ち、payments は残高を増やす向き（返済は正）で渡す。
+    完済（0 到達）までは累積積による閉形式で一括計算し、0 に達したらそこから計算し直す。
+
+    Args:
+        initial_balance (float): 初日の前日時点の残高。
+        daily_rate (np.ndarray): 日利。
+        payments (np.ndarray): 各日の返済額。
+
+    Returns:
+        np.ndarray: 各日の残高。
+    """
+    daily_rate = np.asarray(daily_rate, dtype=float)
+    payments = np.asarray(payments, dtype=float)
+    n = len(daily_rate)
+    balance = np.zeros(n)
+
+    start, prev = 0, float(initial_balance)
+    while start < n:
+        growth = np.cumprod(1 + daily_rate[start:])
+        path = growth * (prev + np.cumsum(payments[start:] / growth))
+        over = np.flatnonzero(path > 0)
+        if len(over) == 0:
+            balance[start:] = path
+            break
+        stop = start + over[0]
+        balance[start:stop] = path[:over[0]]
+        balance[stop] = 0.0
+        start, prev = stop + 1, 0.0
+    return balance
@@ -1,3 +1,5 @@
+import pandas as pd
+
 
 def safe_load_master(load_tasks: dict):
     """
@@ -55,3 +57,26 @@ def get_value_as_str(df, key):
         val = val[0]
 
     return str(val)
+
+def missing_date_key_rows(df, dates, keys, fill_values, date_col="date", key_col="資産名"):
+    """
+    dates × keys の全組み合わせのうち、df に存在しない (date, key) の行を作る。
+
+    Args:
+        df (pd.DataFrame): 観測済みのデータ（date_col, key_col 列を持つ）
+        dates: 対象日付
+        keys: 対象キー（資産名など）。欠損値と重複は除く
+        fill_values (dict): 追加行に入れる {列名: 値}
+        date_col (str): 日付列名
+        key_col (str): キー列名
+
+    Returns:
+        pd.DataFrame: 追加すべき行（date_col, key_col 順にソート済み）
+    """
+    keys = pd.Index(keys).dropna().unique()
+    grid = pd.MultiIndex.from_product([pd.DatetimeIndex(dates).unique(), keys], names=[date_col, key_col])
+    observed = pd.MultiIndex.from_frame(df[[date_col, key_col]])
+    df_add = grid.difference(observed).to_frame(index=False)
+    for col, value in fill_values.items():
+        df_add[col] = value
+    return df_add
@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+
+# 抽出ロジックを変更したら上げる（古いキャッシュを無効にする）
+EXTRACTOR_VERSION = 1
+
+INDEX_FILE = "index.json"
+OBJECT_DIR = "objects"
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PdfTableCache:
+    """
+    PDF から抽出したテーブル（list[list[list[str]]]）のコンテンツアドレス型キャッシュ
+
+    cache_dir/
+        index.json            : PDFパス -> {size, mtime_ns, sha256}
+        objects/<sha256>.json : 抽出済みテーブル
+
+    size と mtime が index と一致すればハッシュ計算も省略する。
+    一致しない場合は sha256 を計算し、同じ内容の抽出結果があればそれを使う。
+    """
+
+    def __init__(self, cache_dir, rebuild=False):
+        self.cache_dir = cache_dir
+        self.rebuild = rebuild
+        self.stats = {"hit": 0, "miss": 0, "stored": 0}
+        self._index = {} if rebuild else self._load_index()
+        self._dirty = False
+
+    # ---- index ----
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _object_path(self, sha256):
+        return os.path.join(self.cache_dir, OBJECT_DIR, f"{sha256}.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[WARN] PDF table cache index is broken, ignored: {e}")
+            return {}
+        if index.get("version") != EXTRACTOR_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def save(self):
+        """index を書き出す（変更が無ければ何もしない）"""
+        if not self._dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": EXTRACTOR_VERSION, "files": self._index}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path())
+        self._dirty = False
+
+    # ---- lookup ----
+    @staticmethod
+    def _key(file_path):
+        return os.path.abspath(file_path)
+
+    def _fingerprint(self, file_path):
+        st = os.stat(file_path)
+        key = self._key(file_path)
+        entry = self._index.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+
+        sha256 = file_sha256(file_path)
+        self._index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+        self._dirty = True
+        return sha256
+
+    def get(self, file_path):
+        """キャッシュ済みのテーブルを返す。無ければ None（miss として数える）"""
+        if not self.rebuild:
+            sha256 = self._fingerprint(file_path)
+            try:
+                with open(self._object_path(sha256), "r", encoding="utf-8") as f:
+                    tables = json.load(f)
+                self.stats["hit"] += 1
+                return tables
+            except (OSError, ValueError):
+                pass
+        self.stats["miss"] += 1
+        return None
+
+    def put(self, file_path, tables):
+        sha256 = self._fingerprint(file_path)
+        os.makedirs(os.path.join(self.cache_dir, OBJECT_DIR), exist_ok=True)
+        object_path = self._object_path(sha256)
+        tmp_path = object_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, object_path)
+        self.stats["stored"] += 1
+
+    def summary(self):
+        total = self.stats["hit"] + self.stats["miss"]
+        rate = self.stats["hit"] / total * 100 if total else 0.0
+        return (
+            f"PDF table cache: hit={self.stats['hit']} miss={self.stats['miss']} "
+            f"stored={self.stats['stored']} (hit rate {rate:.1f}%)"
+        )
@@ -1,3 +1,5 @@
+import pandas as pd
+
 # 原則、メインモジュールでファイルから読み込む
 df_balance_attribute = None
 df_balance_target = None
@@ -9,6 +11,25 @@ df_target_rate = None
 
 df_target_initial_value = None
 
+# ローン（実績）の金利履歴（各日付以降その金利を適用）と START_DATE 時点の残高
+LOAN_RATE_SCHEDULE = pd.DataFrame({
+    "日付": pd.to_datetime(["2024-10-01", "2025-01-01", "2025-07-01"]),
+    "ローン金利": [0.0065, 0.0075, 0.0100],
+})
+LOAN_INITIAL_BALANCE = -22424499.520794038    # 2024/10/1
+
+# 年金の評価パラメータ（資産サブタイプに一致する資産に適用。資産名を指定するとその資産だけ）
+# 先に書いた行が優先される
+PENSION_PARAMETERS = [
+    {"資産サブタイプ": "確定年金", "資産名": None, "開始日": "2012-03-28", "年利": 0.0111, "月額掛金": 20412},
+]
+
+# 生活費の調整対象: カード等で支払った以下の収支項目は生活費から差し引く（保有金融機関は部分一致）
+LIVING_ADJUST_RULES = {
+    "収支項目": ["子供費用", "子供", "家電", "ふるさと納税", "固定資産税", "自動車税"],
+    "保有金融機関": ["PayPayカード", "Amazon.co.jp", "楽天市場", "Yahoo!ショッピング", "さとふる", "楽天市場(my Rakuten)"],
+}
+
 # 収支抽出条件マッピング
 BALANCE_RULES = {
     # 一般収支
@@ -43,4 +64,100 @@ BALANCE_RULES = {
     # "車検A": [],
     # "車検B": [],
     # "ローン一括": [],
-}
\ No newline at end of file
+}
+
+# 資産属性の部分一致検索用インデックス
+class AssetAttributeIndex:
+    """
+    df_asset_attribute の 資産名 / 金融機関口座 に対する部分一致検索。
+    str.contains で先頭から探して最初に一致した行を返すのと同じ結果を、
+    1文字・2文字の n-gram インデックスで候補行を絞り込んで求める。
+    キーは正規表現ではなく文字列としてそのまま探す。
+    """
+    NGRAM = 2
+
+    def __init__(self, df):
+        self.df = df
+        self.names = [self._as_str(x) for x in df["資産名"]]
+        self.accounts = [self._as_str(x) for x in df["金融機関口座"]] if "金融機関口座" in df.columns else [None] * len(df)
+        self.subtypes = list(df["資産サブタイプ"]) if "資産サブタイプ" in df.columns else [None] * len(df)
+        self._name_grams = self._build(self.names)
+        self._account_grams = self._build(self.accounts)
+        self._rows_by_subtype = {}
+        for row, subtype in enumerate(self.subtypes):
+            self._rows_by_subtype.setdefault(subtype, set()).add(row)
+        self._memo = {}
+
+    @staticmethod
+    def _as_str(value):
+        return value if isinstance(value, str) else None
+
+    @classmethod
+    def _build(cls, values):
+        grams = {}
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            for n in range(1, cls.NGRAM + 1):
+                for i in range(len(value) - n + 1):
+                    grams.setdefault(value[i:i + n], set()).add(row)
+        return grams
+
+    @classmethod
+    def _candidates(cls, grams, values, key):
+        """key を含む可能性のある行（空文字なら値がある全行）"""
+        if key == "":
+            return {row for row, value in enumerate(values) if value is not None}
+        n = min(len(key), cls.NGRAM)
+        rows = sorted(
+            (grams.get(key[i:i + n], set()) for i in range(len(key) - n + 1)),
+            key=len
+        )
+        return set(rows[0]).intersection(*rows[1:])
+
+    def first_row(self, name_key, account=None, subtypes=None):
+        """
+        資産名に name_key を含み、金融機関口座に account を含む最初の行番号（無ければ None）
+        account が空なら口座では絞り込まない。subtypes を指定すると 資産サブタイプ で絞り込む。
+        """
+        if not isinstance(name_key, str):
+            return None
+        if not isinstance(account, str) or account.strip() == "":
+            account = None
+        memo_key = (account, name_key, tuple(subtypes) if subtypes else None)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        rows = self._candidates(self._name_grams, self.names, name_key)
+        if account is not None:
+            rows &= self._candidates(self._account_grams, self.accounts, account)
+        if subtypes:
+            rows &= set().union(*(self._rows_by_subtype.get(x, set()) for x in subtypes))
+
+        result = None
+        for row in sorted(rows):
+            if name_key in self.names[row] and (account is None or account in self.accounts[row]):
+                result = row
+                break
+        self._memo[memo_key] = result
+        return result
+
+    def find_asset_name(self, account, name_key, subtypes=None):
+        row = self.first_row(name_key, account, subtypes)
+        return None if row is None else self.df["資産名"].iloc[row]
+
+    def find_account(self, name_key):
+        row = self.first_row(name_key)
+        return None if row is None else self.df["金融機関口座"].iloc[row]
+
+_asset_attribute_index = None
+
+def get_asset_attribute_index():
+    """
+    df_asset_attribute のインデックスを返す。
+    df_asset_attribute が差し替えられたときだけ作り直す。
+    """
+    global _asset_attribute_index
+    if _asset_attribute_index is None or _asset_attribute_index.df is not df_asset_attribute:
+        _asset_attribute_index = AssetAttributeIndex(df_asset_attribute)
+    return _asset_attribute_index
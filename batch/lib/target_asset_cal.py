@@ -1,6 +1,7 @@
 from .target_balance_cal import cal_total_balance
 from .decorator import require_columns, require_columns_with_dtype, check_args_types
 from ..lib import reference_data_store as urds
+from .loan_engine import rate_on_dates, loan_balance_path
 import pandas as pd
 import numpy as np
 
@@ -33,29 +34,8 @@ def _set_target_rate(df_target_rate, rate_name, dates):
     return target_ratio
 
 def _set_loan_interest(df_target_rate, rate_name, dates):
-    df = df_target_rate[['日付', rate_name]].copy()
-    df.dropna(inplace=True)
-
-    key_dates = pd.to_datetime(df["日付"].values)
-    key_values = df[rate_name].values
-
-    dates = pd.to_datetime(dates)
-
-    # searchsortedに使うため int64 に変換して nanosecond を比較値にする
-    key_int = key_dates.view('int64')
-    date_int = dates.view('int64')
-
-    # ★各 date に対して、key_dates の「直前の位置」を取得
-    # side='right' → 同日ならその値を使う
-    idx = np.searchsorted(key_int, date_int, side='right') - 1
-
-    # 範囲外（最古の日付より前）の場合は欠損にする（必要に応じて処理変更）
-    idx[idx < 0] = 0
-
-    # 前回値をそのまま拾う
-    target_ratio = key_values[idx]
-
-    return target_ratio
+    # 金利は変更日から次の変更日まで一定（ステップ関数）
+    return rate_on_dates(df_target_rate, rate_name, dates)
 
 def _cal_long_col_data(safe_asset, risky_asset, loan_balance,
     safe_total_return, risky_total_return, safe_ratio,
@@ -142,8 +122,10 @@ def _cal_target_data(safe_ratio, risky_ratio, safe_return, risky_return, loan_in
     risky_total_return = np.zeros(n_days)
     loan_balance = np.zeros(n_days)
     mask = df_balance["収支項目"].isin(["ローン返済", "ローン一括"])
-    loan_repayment = df_balance[mask].groupby("date")["目標"].sum().values
-    #print(loan_repayment)
+    loan_repayment = (
+        df_balance[mask].groupby("date")["目標"].sum()
+        .reindex(dates, fill_value=0).to_numpy()
+    )
 
     # --- 初日設定 ---
     asset[0] = INITIAL_ASSET
@@ -151,6 +133,7 @@ def _cal_target_data(safe_ratio, risky_ratio, safe_return, risky_return, loan_in
     risky_asset[0] = asset[0] * risky_ratio[0]
     total_return[0] = 0
     loan_balance[0] = INITIAL_LOAN
+    loan_balance[1:] = loan_balance_path(INITIAL_LOAN, loan_interest[1:], loan_repayment[1:])
 
     # --- 収支設定 ---
     balance_cash = cal_total_balance(df_balance, dates)
@@ -159,7 +142,6 @@ def _cal_target_data(safe_ratio, risky_ratio, safe_return, risky_return, loan_in
     for i in range(1, n_days):
         # 前日資産 + 収支
         prev_total = asset[i-1] + balance_cash[i-1]
-        prev_loan_balance = loan_balance[i-1]
 
         # 安全資産・リスク資産に配分
         safe_asset[i] = prev_total * safe_ratio[i]
@@ -171,13 +153,6 @@ def _cal_target_data(safe_ratio, risky_ratio, safe_return, risky_return, loan_in
 
         # 当日資産額 = 前日資産 + 収支 + 当日リターン
         asset[i] = prev_total + safe_total_return[i] +risky_total_return[i]
-        loan_balance[i] = (
-            prev_loan_balance +                     # 前日残高
-            (prev_loan_balance * loan_interest[i])  # 利息払い
-            + loan_repayment[i]                     # 貸返済
-        )
-        if loan_balance[i] > 0:
-            loan_balance[i] = 0
 
     safe_total_return = np.cumsum(safe_total_return)
     risky_total_return = np.cumsum(risky_total_return)
@@ -2,13 +2,18 @@ from .utils.make_target import make_target_main
 from .utils.asset_aggregation import make_asset_main
 from .utils.balance_aggregation import make_balance_main
 from .utils.profit_aggregation import make_profit_main
-from .lib.file_io import load_parquet, save_csv, load_csv, save_parquet
+from .utils.make_cache import make_cache_main, PATH_OUTPUT as PATH_CACHE_OUTPUT
+from .lib.file_io import load_parquet, save_csv, load_csv, save_parquet, PARQUET_COMPRESSION
 
 import os
 import requests
 import pandas as pd
 import logging
 import argparse
+import io
+import time
+import hashlib
+from contextlib import ExitStack
 from app.utils.db_manager import init_db
 from pathlib import Path
 
@@ -28,7 +33,7 @@ from batch.lib.target_settings import (
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
-def update_master_file(args):
+def update_master_file(args, rebuild_cache=False):
     """
     データを更新し、マスターファイルを更新する。
     """
@@ -37,9 +42,11 @@ def update_master_file(args):
         # データ更新しマスターファイルを保存する
         make_target_main()
         if args == "with_aggregation":
-            make_asset_main()
+            make_asset_main(rebuild_cache=rebuild_cache)
             make_balance_main()
         make_profit_main()
+        # 集計済みキャッシュテーブル（APIが直接参照する）
+        make_cache_main()
 
         logger.info("Master files update finished.")
 
@@ -53,28 +60,138 @@ def get_latest_date_from_api():
     """
     logger.info("Get latest date from API started.")
     try:
-        # APIをたたいて、DBの最新日付を取得する
-        res = requests.get(f"{API_BASE}/api/Portfolio_Command_Center/summary", timeout=10)
+        # APIをたたいて、DBの最新日付を取得する (DBが空の場合は None)
+        res = requests.get(f"{API_BASE}/api/data/latest_date", timeout=10)
         res.raise_for_status() # エラーチェック
         data = res.json()
-        latest_date = pd.to_datetime(data["summary"]["latest_date"])    # - pd.Timedelta(days=1)
+        latest_date = pd.to_datetime(data["latest_date"]) if data["latest_date"] else None
         logger.info(f"Latest date from API: {latest_date}")
         return latest_date
     except Exception as e:
         logger.error(f"Get latest date from API failed: {e}")
         raise
 
-def update_db():
+# 差分アップロードで最新日付以降の行だけを送るファイル
+DELTA_UPLOAD_KEYS = ["file_asset_profit_detail", "file_balance_detail"]
+
+def _make_delta_file(path, latest_date):
+    """
+    最新日付以降（当日を含む）の行だけを parquet にしてメモリ上で返す。
+    """
+    df = load_parquet(path)
+    df = df[df["date"] >= latest_date]
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", index=False, compression=PARQUET_COMPRESSION)
+    buffer.seek(0)
+    return buffer
+
+# ---------------------------------------------------------
+# 分割アップロード (/api/data/upload/session)
+# ---------------------------------------------------------
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024   # 1チャンクのバイト数
+UPLOAD_MAX_RETRIES = 5                # チャンクごとの最大リトライ回数
+UPLOAD_RETRY_WAIT = 2                 # リトライ待ち時間（秒）。リトライごとに倍にする
+UPLOAD_COMMIT_TIMEOUT = 600           # 公開（DB書き込み）の待ち時間（秒）
+
+def _describe_file(file_obj):
+    """sha256 とサイズを返す（読み終わったら先頭に戻す）"""
+    sha = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+        sha.update(block)
+        size += len(block)
+    file_obj.seek(0)
+    return sha.hexdigest(), size
+
+def _request_with_retry(method, url, **kwargs):
+    """接続エラー・タイムアウト・5xx のときだけ待ってから再送する"""
+    wait = UPLOAD_RETRY_WAIT
+    for attempt in range(1, UPLOAD_MAX_RETRIES + 1):
+        try:
+            resp = requests.request(method, url, **kwargs)
+            if resp.status_code < 500:
+                return resp
+            error = f"HTTP {resp.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt == UPLOAD_MAX_RETRIES:
+            raise requests.RequestException(f"{method} {url} failed after {attempt} attempts: {error}")
+        logger.warning(f"{method} {url} failed ({error}). Retry in {wait}s ({attempt}/{UPLOAD_MAX_RETRIES})")
+        time.sleep(wait)
+        wait *= 2
+
+def _upload_file_chunks(session_url, key, file_obj, size, received):
+    """受信済みバイト数 (received) から続きをチャンクで送る"""
+    offset = received
+    while offset < size:
+        file_obj.seek(offset)
+        chunk = file_obj.read(UPLOAD_CHUNK_SIZE)
+        resp = _request_with_retry(
+            "PUT", f"{session_url}/{key}", params={"offset": offset}, data=chunk, timeout=60
+        )
+        if resp.status_code == 409 and "received" in resp.json():
+            # サーバーの受信済み位置に合わせて送り直す（前回の送信が届いていた場合など）
+            offset = resp.json()["received"]
+            continue
+        resp.raise_for_status()
+        offset = resp.json()["received"]
+        logger.info(f"  {key}: {offset:,} / {size:,} bytes ({offset / size:.0%})")
+
+def upload_files_chunked(files, upload_mode, cutoff=None):
+    """
+    ファイルを分割アップロードして公開する。
+    前回公開したものと同じファイルは送らず、中断した場合は次回続きから送る。
+
+    Args:
+        files (dict): 送信キー (file_<table>) とファイルオブジェクト
+        upload_mode (str): "full" または "delta"
+        cutoff (pd.Timestamp): delta のときの基準日（この日以降の行を送っている）
+
+    Returns:
+        dict: commit のレスポンス
+    """
+    described = {key: _describe_file(file_obj) for key, file_obj in files.items()}
+    resp = _request_with_retry(
+        "POST", f"{API_BASE}/api/data/upload/session",
+        json={
+            "mode": upload_mode,
+            "cutoff": cutoff.strftime("%Y-%m-%d") if cutoff is not None else None,
+            "files": {key: {"sha256": sha256, "size": size} for key, (sha256, size) in described.items()},
+        },
+        timeout=30,
+    )
+    resp.raise_for_status()
+    session = resp.json()
+    session_url = f"{API_BASE}/api/data/upload/session/{session['session_id']}"
+    logger.info(
+        f"Upload session {session['session_id']}: "
+        f"{session['received_bytes']:,} / {session['total_bytes']:,} bytes already received"
+    )
+
+    for key, progress in session["files"].items():
+        if progress["status"] == "unchanged":
+            logger.info(f"  {key}: unchanged (skipped)")
+            continue
+        _upload_file_chunks(session_url, key, files[key], progress["size"], progress["received"])
+
+    resp = requests.post(f"{session_url}/commit", timeout=UPLOAD_COMMIT_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+def update_db(upload_mode="delta"):
     """
     APIへデータをアップロードしてDBを更新する。
+
+    upload_mode:
+        delta: 資産・収支の明細はAPIの最新日付以降の行だけを送り、サーバー側で上書きする
+        full: すべて全件置き換える（DBが空の場合も full にフォールバックする）
     """
     logger.info("Update db started.")
     try:
         # ---------------------------------------------------------
         # APIへデータをアップロードしてDBを更新する
         # ---------------------------------------------------------
-        upload_url = f"{API_BASE}/api/data/upload/all"
-        logger.info(f"Uploading data to {upload_url}...")
+        logger.info(f"Uploading data to {API_BASE}/api/data/upload/session...")
 
         try:
             # 資産クラス表のCSVを一度parquetに変換する
@@ -89,28 +206,37 @@ def update_db():
             df["生活防衛資金"] = pd.to_numeric(df["生活防衛資金"], errors="coerce")
             save_parquet(df, PATH_ITEM_ATTRIBUTE_PARQUET)
             
-            # with 文で複数ファイルを同時に開く
-            with open(PATH_ASSET_PROFIT_DETAIL_TEST2, "rb") as asset_profit_detail,\
-                open(PATH_BALANCE_DETAIL, "rb") as balance_detail,\
-                open(PATH_TARGET_ASSET_PROFIT, "rb") as target_asset_profit,\
-                open(PATH_TARGET_PARAMETER, "rb") as target_parameter,\
-                open(PATH_TARGET_RATE, "rb") as target_rate,\
-                open(PATH_ASSET_ATTRIBUTE_PARQUET, "rb") as asset_attribute,\
-                open(PATH_ITEM_ATTRIBUTE_PARQUET, "rb") as item_attribute:
-
-                files = {
-                    "file_asset_profit_detail": ("file_asset_profit_detail", asset_profit_detail, "application/octet-stream"),
-                    "file_balance_detail": ("file_balance_detail", balance_detail, "application/octet-stream"),
-                    "file_target_asset_profit": ("file_target_asset_profit", target_asset_profit, "application/octet-stream"),
-                    "file_target_parameter": ("file_target_parameter", target_parameter, "application/octet-stream"),
-                    "file_target_rate": ("file_target_rate", target_rate, "application/octet-stream"),
-                    "file_asset_attribute": ("file_asset_attribute",asset_attribute, "application/octet-stream"),
-                    "file_item_attribute": ("file_item_attribute",item_attribute, "application/octet-stream")
-                }
-            
-                resp = requests.post(upload_url, files=files, timeout=30)
-                resp.raise_for_status()
-                result = resp.json()
+            upload_paths = {
+                "file_asset_profit_detail": PATH_ASSET_PROFIT_DETAIL_TEST2,
+                "file_balance_detail": PATH_BALANCE_DETAIL,
+                "file_target_asset_profit": PATH_TARGET_ASSET_PROFIT,
+                "file_target_parameter": PATH_TARGET_PARAMETER,
+                "file_target_rate": PATH_TARGET_RATE,
+                "file_asset_attribute": PATH_ASSET_ATTRIBUTE_PARQUET,
+                "file_item_attribute": PATH_ITEM_ATTRIBUTE_PARQUET,
+            }
+            # キャッシュテーブル (file_asset_cache_daily など)
+            for table_name, path in PATH_CACHE_OUTPUT.items():
+                upload_paths[f"file_{table_name}"] = path
+
+            latest_date = None
+            if upload_mode == "delta":
+                latest_date = get_latest_date_from_api()
+                if latest_date is None:
+                    logger.info("DB is empty. Fall back to full upload.")
+                    upload_mode = "full"
+
+            # ExitStack で複数ファイルを同時に開く
+            with ExitStack() as stack:
+                files = {}
+                for key, path in upload_paths.items():
+                    if upload_mode == "delta" and key in DELTA_UPLOAD_KEYS:
+                        file_obj = _make_delta_file(path, latest_date)
+                    else:
+                        file_obj = stack.enter_context(open(path, "rb"))
+                    files[key] = file_obj
+
+                result = upload_files_chunked(files, upload_mode, cutoff=latest_date)
                 logger.info(f"Upload successful: {result}")
 
         except Exception as e:
@@ -136,16 +262,25 @@ if __name__ == "__main__":
         default="with_aggregation",
         help="実行モードを指定 (with_aggregation|wtihout_aggregation)"
     )
+    parser.add_argument(
+        "--upload",
+        choices=["delta", "full"],
+        default="delta",
+        help="アップロード方法を指定 (delta: 最新日付以降の差分 | full: 全件置き換え)"
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="PDF テーブル抽出キャッシュを使わずに全 PDF を再解析する"
+    )
 
     args = parser.parse_args()
     
     #master files(incl. for master/ cache)
-    update_master_file(args.mode)
-
-    #latest_date = get_latest_date_from_api()
+    update_master_file(args.mode, rebuild_cache=args.rebuild_cache)
 
     # cache db
-    update_db()
+    update_db(args.upload)
 
     
 
@@ -1,18 +1,21 @@
 from ..lib.agg_settings import (
     PATH_ASSET_PROFIT_DETAIL, PATH_ASSET_ATTRIBUTE, PATH_ASSET_RAW_DATA,
-    PATH_ASSET_PROFIT_DETAIL_TEST
+    PATH_ASSET_PROFIT_DETAIL_TEST, PATH_PDF_TABLE_CACHE,
+    PDF_MAX_WORKERS, PDF_PAGES_PER_TASK
 )
 from ..lib.file_io import load_parquet, load_csv, save_parquet
 from ..lib.agg_init import get_latest_date_agg, get_latest_date_raw
 from ..lib.agg_asset_collection import get_asset_raw_from_table, load_asset_raw_from_pdf
+from ..lib.pdf_table_cache import PdfTableCache
 from ..lib.agg_asset_cleaning import data_cleaning
 from ..lib.agg_asset_finalize import finalize_clean_data, check_not_registered_columns_before_finalize
 import pandas as pd
+import argparse
 from ..lib import reference_data_store as urds
 
-def make_asset_main():
+def make_asset_main(rebuild_cache=False):
     # ---- settings ----
-    MAX_WORKERS = 8
+    pdf_cache = PdfTableCache(PATH_PDF_TABLE_CACHE, rebuild=rebuild_cache)
 
     # ---- load phase ----
     df_asset_profit = load_parquet(PATH_ASSET_PROFIT_DETAIL)
@@ -32,7 +35,9 @@ def make_asset_main():
         latest_date_agg + pd.Timedelta(days=1),
         latest_date_raw,
         PATH_ASSET_RAW_DATA,
-        max_workers=MAX_WORKERS
+        max_workers=PDF_MAX_WORKERS,
+        cache=pdf_cache,
+        pages_per_task=PDF_PAGES_PER_TASK
     )
 
     df_raw = get_asset_raw_from_table(all_tables_by_file)
@@ -56,4 +61,11 @@ def make_asset_main():
 # Windows の spawn 問題を防ぐための絶対ルール
 # -----------------------------------------------------------
 if __name__ == "__main__":
-    make_asset_main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="asset aggregation")
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="PDF テーブル抽出キャッシュを使わずに全 PDF を再解析する"
+    )
+    args = parser.parse_args()
+    make_asset_main(rebuild_cache=args.rebuild_cache)
\ No newline at end of file
@@ -5,7 +5,8 @@ from ..lib import reference_data_store as urds
 from ..lib.agg_init import get_latest_date_agg, load_balance_raw_file
 from ..lib.agg_settings import (
     PATH_BALANCE_ATTRIBUTE, PATH_ASSET_PROFIT_DETAIL, PATH_BALANCE_RAW_DATA,
-    PATH_BALANCE_DETAIL, PATH_ASSET_PROFIT_DETAIL_TEST
+    PATH_BALANCE_DETAIL, PATH_ASSET_PROFIT_DETAIL_TEST, BALANCE_RULE_MATCH,
+    BALANCE_DETAIL_SPARSE
 )
 from ..lib.target_settings import PATH_TARGET_BALANCE
 
@@ -50,13 +51,13 @@ def make_balance_main():
         df_balance_detail = pd.DataFrame()
         df_pre = (
             df_balance_detail
-            .pipe(safe_pipe(collect_balance, df_balance_raw_filtered))
+            .pipe(safe_pipe(collect_balance, df_balance_raw_filtered, match=BALANCE_RULE_MATCH))
             .pipe(safe_pipe(collect_living_adjust))
             .pipe(safe_pipe(collect_year_end_tax_adjustment, START_DATE, end_date))
             .pipe(safe_pipe(collect_points, df_asset_profit))
         )
         # ---- finalize & save ----
-        df_final = finalize_data(START_DATE, end_date, df_pre)
+        df_final = finalize_data(START_DATE, end_date, df_pre, sparse=BALANCE_DETAIL_SPARSE)
         df_final.sort_values("date", inplace=True)
 
         save_parquet(df_final, PATH_OUTPUT)
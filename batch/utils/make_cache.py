@@ -2,15 +2,18 @@ from batch.lib.agg_settings import (
     PATH_ASSET_PROFIT_DETAIL_TEST2, PATH_BALANCE_DETAIL,
     PATH_ASSET_CACHE_DAILY, PATH_ASSET_CACHE_MONTHLY, PATH_ASSET_CACHE_YEARLY,
     PATH_CATEGORY_CACHE_DAILY, PATH_CATEGORY_CACHE_MONTHLY, PATH_CATEGORY_CACHE_YEARLY,
+    PATH_SUBTYPE_CACHE_DAILY,
 )
 from batch.lib.target_settings import PATH_TARGET_ASSET_PROFIT
 from batch.lib.file_io import load_parquet, save_parquet
 from batch.lib.main_helper import safe_load_master, safe_pipe
 from batch.lib.agg_init import get_latest_date_agg
+from batch.lib.exceptions import DataLoadError
 
 from batch.lib.cache_table_cal import (
     make_asset_cache_daily, make_asset_cache_monthly, make_asset_cache_yearly,
     make_category_cache_daily, make_category_cache_monthly, make_category_cache_yearly,
+    make_subtype_cache_daily,
 )
 
 import pandas as pd
@@ -27,6 +30,7 @@ PATH_OUTPUT = {
     "category_cache_daily": PATH_CATEGORY_CACHE_DAILY,
     "category_cache_monthly": PATH_CATEGORY_CACHE_MONTHLY,
     "category_cache_yearly": PATH_CATEGORY_CACHE_YEARLY,
+    "subtype_cache_daily": PATH_SUBTYPE_CACHE_DAILY,
 }
 def make_cache_table_by_asset_name(df_asset_profit, start_date, start_date_monthly_yearly, end_date):
     df_asset_profit_daily = make_asset_cache_daily(df_asset_profit, start_date, end_date)
@@ -85,6 +89,8 @@ def make_cache_main():
             make_cache_table_by_asset_category(
                 df_asset_profit, df_balance, df_target, start_date, start_date_monthly_yearly, end_date
             )
+
+        df_subtype_daily = make_subtype_cache_daily(df_asset_profit, start_date, end_date)
         
         # ---- save ----
         save_parquet(df_asset_profit_daily, PATH_OUTPUT["asset_cache_daily"])
@@ -93,6 +99,7 @@ def make_cache_main():
         save_parquet(df_asset_category_daily, PATH_OUTPUT["category_cache_daily"])
         save_parquet(df_asset_category_monthly, PATH_OUTPUT["category_cache_monthly"])
         save_parquet(df_asset_category_yearly, PATH_OUTPUT["category_cache_yearly"])
+        save_parquet(df_subtype_daily, PATH_OUTPUT["subtype_cache_daily"])
     
     except Exception as e:
         print(f"[ERROR] {e}")
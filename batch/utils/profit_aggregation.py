@@ -6,7 +6,8 @@ from ..lib.exceptions import DataLoadError
 from ..lib.agg_settings import (
     PATH_ASSET_PROFIT_DETAIL, PATH_OFFSET_UNREALIZED, 
     PATH_BALANCE_RAW_DATA,PATH_ASSET_ATTRIBUTE, PATH_BALANCE_DETAIL,
-    PATH_ASSET_PROFIT_DETAIL_TEST, PATH_ASSET_PROFIT_DETAIL_TEST2
+    PATH_ASSET_PROFIT_DETAIL_TEST, PATH_ASSET_PROFIT_DETAIL_TEST2,
+    REALIZED_CAPITAL_LOT_METHOD
 )
 from ..lib.agg_profit_cal import (
     set_unrealized_profit, set_realized_deposit, set_realized_mrf, set_realized_interest,
@@ -57,7 +58,8 @@ def make_profit_main():
             .pipe(safe_pipe(set_realized_deposit, df_balance_raw_filtered, debug=False))
             .pipe(safe_pipe(set_realized_mrf, debug=False))
             .pipe(safe_pipe(set_realized_interest, df_balance_raw_filtered, debug=False))
-            .pipe(safe_pipe(set_realized_dividend_and_capital, df_balance_raw_filtered, debug=False))
+            .pipe(safe_pipe(set_realized_dividend_and_capital, df_balance_raw_filtered,
+                            lot_method=REALIZED_CAPITAL_LOT_METHOD, debug=False))
             .pipe(safe_pipe(set_realized_cloud_funds, START_DATE, end_date, df_balance_raw_filtered, debug=False))
             .pipe(safe_pipe(set_total_returns, debug=False))
             .pipe(safe_pipe(set_loan_balance, START_DATE, end_date, df_balance, debug=False))
@@ -0,0 +1,100 @@
+"""
+to_sql と bulk_load_table の書き込み速度を比較するベンチマーク
+
+使い方:
+    python -m benchmarks.bulk_load_benchmark --rows 300000
+    DB_TYPE=postgresql python -m benchmarks.bulk_load_benchmark --rows 300000
+
+DB_TYPE=sqlite (既定) の場合は一時ファイルの SQLite を使う。
+DB_TYPE=postgresql の場合は .env の接続先に bench_* テーブルを作成し、終了時に削除する。
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.utils.db_manager import init_db, get_engine
+from app.utils.data_loader import bulk_load_table
+
+
+def make_asset_profit_detail(rows: int) -> pd.DataFrame:
+    """asset_profit_detail と同じ形のダミーデータ"""
+    n_assets = 400
+    n_dates = max(rows // n_assets, 1)
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-10-01", periods=n_dates, freq="D")
+    df = pd.DataFrame({
+        "date": np.repeat(dates, n_assets),
+        "資産名": np.tile([f"資産{i:03d}" for i in range(n_assets)], n_dates),
+        "資産タイプ": np.tile(["株式", "債券", "現金", "年金"], n_dates * n_assets // 4 + 1)[:n_dates * n_assets],
+        "資産サブタイプ": np.tile([f"サブタイプ{i % 23}" for i in range(n_assets)], n_dates),
+        "資産額": rng.normal(1_000_000, 100_000, n_dates * n_assets),
+        "トータルリターン": rng.normal(0, 10_000, n_dates * n_assets),
+        "取得価格": rng.normal(900_000, 50_000, n_dates * n_assets),
+    })
+    # 欠損も含める
+    df.loc[df.sample(frac=0.01, random_state=0).index, "取得価格"] = np.nan
+    return df
+
+
+def _timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows: int, repeat: int):
+    df = make_asset_profit_detail(rows)
+    engine = get_engine("finance")
+
+    def to_sql_replace():
+        with engine.begin() as conn:
+            df.to_sql("bench_to_sql", conn, if_exists="replace", index=False)
+
+    def bulk_replace():
+        bulk_load_table(df, "bench_bulk", if_exists="replace")
+
+    results = {
+        "to_sql (replace)": _timeit(to_sql_replace, repeat),
+        "bulk_load_table (replace)": _timeit(bulk_replace, repeat),
+    }
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_to_sql"))
+        conn.execute(text("DROP TABLE IF EXISTS bench_bulk"))
+
+    print(f"[INFO] dialect={engine.dialect.name} rows={len(df):,} repeat={repeat} (best of)")
+    base = results["to_sql (replace)"]
+    for name, elapsed in results.items():
+        print(f"  {name:<28} {elapsed:8.3f} s  ({len(df) / elapsed:,.0f} rows/s, x{base / elapsed:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bulk load benchmark")
+    parser.add_argument("--rows", type=int, default=300_000, help="ロードする行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数 (最速値を表示)")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    init_db(base_dir)
+
+    from app.utils.db_manager import db_manager
+    tmp_dir = None
+    if db_manager.db_type == "sqlite":
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_manager.finance_db = Path(tmp_dir.name) / "bench.db"
+
+    try:
+        run(args.rows, args.repeat)
+    finally:
+        db_manager.close_pool()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
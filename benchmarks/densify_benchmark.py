@@ -0,0 +1,120 @@
+"""
+欠けている (date, 資産名) の補完処理を旧実装（日付ごとのループ）と比較するベンチマーク
+
+対象:
+    register_nothing_date_asset_by_zero (agg_asset_cleaning)
+    fill_missing_asset_name (agg_asset_finalize)
+
+使い方:
+    python -m benchmarks.densify_benchmark --years 3 --assets 300
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch.lib import reference_data_store as urds
+from batch.lib.agg_asset_cleaning import register_nothing_date_asset_by_zero
+from batch.lib.agg_asset_finalize import fill_missing_asset_name
+
+
+def legacy_register_nothing_date_asset_by_zero(df):
+    """変更前の実装（比較用）"""
+    dfs=[]
+    asset_name_list_ref = urds.df_asset_attribute["資産名"].to_list()
+    for date in df["date"].unique():
+        asset_name_list = df[df["date"] == date]["資産名"].to_list()
+        diff_list = list(set(asset_name_list_ref) - set(asset_name_list))
+        df_add = pd.DataFrame({
+            "date": date,"資産名": diff_list,
+            "金融機関口座":np.nan,"資産額": 0.0,"取得価格":0.0
+        })
+        dfs.append(df_add)
+    df_result = pd.concat(dfs, ignore_index=True)
+    df_final = pd.concat([df, df_result],axis=0)
+    df_final.sort_values("date", inplace=True)
+    return df_final
+
+
+def legacy_fill_missing_asset_name(df, df_asset_profit):
+    """変更前の実装（比較用）"""
+    df_data = df.copy()
+    df_data.reset_index(drop=True, inplace=True)
+    df_ref = urds.df_asset_attribute.copy()
+    end_date = df_asset_profit["date"].max()
+    dfs = []
+    for date in pd.date_range(start="2024-12-01", end=end_date):
+        asset_list_data = df_data[df_data["date"] == date]["資産名"].to_list()
+        asset_list_ref = df_ref["資産名"].to_list()
+        diff_list = list(set(asset_list_ref) - set(asset_list_data))
+        df_add = pd.DataFrame({
+            "date": date,"資産名": diff_list,
+            "資産タイプ":np.nan,"資産サブタイプ":np.nan,
+            "金融機関口座":np.nan,"資産額": 0.0,"トータルリターン":np.nan,
+            "含み損益":np.nan,"実現損益":np.nan,"取得価格":0.0})
+        dfs.append(df_add)
+    df_result = pd.concat(dfs, ignore_index=True)
+    return pd.concat([df_data, df_result],axis=0)
+
+
+def make_history(years: int, assets: int, missing: float) -> pd.DataFrame:
+    """2024-12-01 から years 年分、資産の一部が欠けた日次データ"""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-12-01", periods=365 * years, freq="D")
+    names = [f"資産{i:03d}" for i in range(assets)]
+    df = pd.DataFrame({
+        "date": np.repeat(dates, assets),
+        "資産名": np.tile(names, len(dates)),
+    })
+    df = df[rng.random(len(df)) >= missing].reset_index(drop=True)
+    df["金融機関口座"] = "口座"
+    df["資産額"] = rng.normal(1_000_000, 1_000, len(df))
+    df["取得価格"] = rng.normal(900_000, 1_000, len(df))
+    urds.df_asset_attribute = pd.DataFrame({"資産名": names})
+    return df
+
+
+def _canonical(df):
+    return df.sort_values(["date", "資産名"], kind="stable").reset_index(drop=True)
+
+
+def _timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(years: int, assets: int, missing: float, repeat: int):
+    df = make_history(years, assets, missing)
+
+    cases = {
+        "register_nothing_date_asset_by_zero": (
+            legacy_register_nothing_date_asset_by_zero, register_nothing_date_asset_by_zero, (df,)
+        ),
+        "fill_missing_asset_name": (
+            legacy_fill_missing_asset_name, fill_missing_asset_name, (df, df)
+        ),
+    }
+
+    print(f"[INFO] years={years} assets={assets} rows={len(df):,} missing={missing:.0%} repeat={repeat} (best of)")
+    for name, (legacy, current, args) in cases.items():
+        # 行の並び（同一日付内の順序）以外は一致することを確認
+        pd.testing.assert_frame_equal(_canonical(current(*args)), _canonical(legacy(*args)))
+        old = _timeit(lambda: legacy(*args), repeat)
+        new = _timeit(lambda: current(*args), repeat)
+        print(f"  {name:<38} legacy {old:8.3f} s  new {new:8.3f} s  (x{old / new:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="densify benchmark")
+    parser.add_argument("--years", type=int, default=3, help="履歴の年数")
+    parser.add_argument("--assets", type=int, default=300, help="マスタの資産数")
+    parser.add_argument("--missing", type=float, default=0.1, help="欠けている行の割合")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数 (最速値を表示)")
+    args = parser.parse_args()
+
+    run(args.years, args.assets, args.missing, args.repeat)
@@ -0,0 +1,117 @@
+"""
+目標収支（build_balance_target）の計算を旧実装（日付 × パラメータのクロス結合）と比較するベンチマーク
+
+使い方:
+    python -m benchmarks.target_schedule_benchmark --years 40 --items 40
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from batch.lib.target_init import make_target_parameter
+from batch.lib.target_balance_cal import build_balance_target, cal_total_balance, _finalize_balance
+
+REPEATS = ["MONTHLY", "ANNUALLY", "EVERY 2 YEARS", "EVERY 3 YEARS", "SPECIFIC"]
+
+
+def legacy_build_balance_target(df_raw, start, end):
+    """変更前の実装（比較用）: 全日付 × 全パラメータ行を作り、繰り返し設定ごとにマスクする"""
+    df_items = make_target_parameter(df_raw, start, end)
+    df_cross = pd.DataFrame({"日付": pd.date_range(start, end)}).merge(df_items, how="cross")
+
+    dfs = []
+    for repeat, years in [("MONTHLY", None), ("ANNUALLY", 1), ("EVERY 2 YEARS", 2), ("EVERY 3 YEARS", 3)]:
+        df = df_cross[df_cross["繰り返し設定"] == repeat].copy()
+        mask = (df["日付"] >= df["開始日"]) & (df["日付"] <= df["終了日"]) & (df["日付"].dt.day == df["日"])
+        if years is not None:
+            mask &= (df["日付"].dt.month == df["月"]) & ((df["日付"].dt.year - df["開始日"].dt.year) % years == 0)
+        df["目標"] = np.where(mask, df["目標"], 0)
+        dfs.append(df)
+    df = df_cross[df_cross["繰り返し設定"] == "SPECIFIC"].copy()
+    df["目標"] = np.where(df["日付"] == df["特定日"], df["目標"], 0)
+    dfs.append(df)
+    df = pd.concat(dfs, ignore_index=True)
+
+    # 同一日付＋収支項目で非ゼロがある場合はゼロ行を削除し、非ゼロがない場合はゼロ1行を残す
+    nonzero_keys = df.loc[df["目標"] != 0, ["日付", "収支項目"]].drop_duplicates()
+    df_zero = df[df["目標"] == 0].merge(nonzero_keys, on=["日付", "収支項目"], how="left", indicator=True)
+    df_zero = df_zero[df_zero["_merge"] == "left_only"].drop(columns=["_merge"])
+    df_zero = df_zero.drop_duplicates(subset=["日付", "収支項目"])
+    df = pd.concat([df[df["目標"] != 0], df_zero], axis=0).sort_values("日付")
+    return _finalize_balance(df)
+
+
+def make_parameters(items: int, start: str, end: str) -> pd.DataFrame:
+    """繰り返し設定が混在した目標パラメータのダミー"""
+    rng = np.random.default_rng(0)
+    horizon = pd.date_range(start, end)
+    half = len(horizon) // 2
+
+    def pick(lo, hi):
+        return str(horizon[rng.integers(lo, hi)].date())
+
+    return pd.DataFrame({
+        "収支項目": [f"項目{i:02d}" for i in range(items)],
+        "収支タイプ": "一般収支",
+        "収支カテゴリー": rng.choice(["収入", "支出"], items),
+        "繰り返し設定": [REPEATS[i % len(REPEATS)] for i in range(items)],
+        "開始日": ["TBD" if i % 4 == 0 else pick(0, half) for i in range(items)],
+        "終了日": ["TBD" if i % 3 == 0 else pick(half, len(horizon)) for i in range(items)],
+        "月": rng.integers(1, 13, items).astype(float),
+        "日": rng.integers(1, 32, items).astype(float),
+        "特定日": [pick(0, len(horizon)) for _ in range(items)],
+        "目標": rng.normal(100_000, 10_000, items).round(),
+    })
+
+
+def _canonical(df):
+    df = df[df["目標"] != 0]
+    return df.sort_values(["date", "収支項目"], kind="stable").reset_index(drop=True)
+
+
+def _measure(func, repeat: int):
+    """(最速の実行時間, ピークメモリ) を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(years: int, items: int, repeat: int):
+    start = "2025-01-01"
+    end = str((pd.Timestamp(start) + pd.DateOffset(years=years) - pd.Timedelta(days=1)).date())
+    df_raw = make_parameters(items, start, end)
+    dates = pd.date_range(start, end)
+
+    # 非ゼロの行と日ごとの収支が一致することを確認
+    df_new = build_balance_target(df_raw, start, end)
+    df_old = legacy_build_balance_target(df_raw, start, end)
+    pd.testing.assert_frame_equal(_canonical(df_new), _canonical(df_old))
+    np.testing.assert_allclose(cal_total_balance(df_new, dates), cal_total_balance(df_old, dates))
+
+    old_time, old_peak = _measure(lambda: legacy_build_balance_target(df_raw, start, end), repeat)
+    new_time, new_peak = _measure(lambda: build_balance_target(df_raw, start, end), repeat)
+
+    print(f"[INFO] years={years} items={items} days={len(dates):,} repeat={repeat} (best of)")
+    print(f"  legacy (cross join)   {old_time:8.3f} s  peak {old_peak / 2**20:8.1f} MiB  rows {len(df_old):,}")
+    print(f"  build_balance_target  {new_time:8.3f} s  peak {new_peak / 2**20:8.1f} MiB  rows {len(df_new):,}")
+    print(f"  (x{old_time / new_time:.1f} faster, x{old_peak / new_peak:.1f} less memory)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="target schedule benchmark")
+    parser.add_argument("--years", type=int, default=40, help="計算期間の年数")
+    parser.add_argument("--items", type=int, default=40, help="目標パラメータの行数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数 (最速値を表示)")
+    args = parser.parse_args()
+
+    run(args.years, args.items, args.repeat)
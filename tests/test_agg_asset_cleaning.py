@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+from batch.lib import reference_data_store as urds
+from batch.lib.agg_asset_cleaning import (
+    change_Utf8Code, translate_radicals, get_account_name_from_table, register_nothing_date_asset_by_zero
+)
+
+class TestRadicalTranslation(unittest.TestCase):
+    def test_change_utf8code(self):
+        # ⼈(U+2F08) -> 人, ⾦(U+2FA6) -> 金
+        self.assertEqual(change_Utf8Code("⼈⾦ABC"), "人金ABC")
+        # 変換表に無い部首コードはそのまま
+        self.assertEqual(change_Utf8Code("⺀"), "⺀")
+
+    def test_translate_radicals_keeps_missing_values(self):
+        series = pd.Series(["保有⾦融機関", None, "⾦", np.nan, "保有⾦融機関"], index=[5, 4, 3, 2, 1])
+        result = translate_radicals(series)
+        self.assertEqual(result.tolist()[0], "保有金融機関")
+        self.assertEqual(result.loc[3], "金")
+        self.assertIsNone(result.loc[4])
+        self.assertTrue(pd.isna(result.loc[2]))
+        self.assertEqual(list(result.index), [5, 4, 3, 2, 1])
+
+class TestAssetAttributeIndex(unittest.TestCase):
+    def setUp(self):
+        self.original = urds.df_asset_attribute
+        urds.df_asset_attribute = pd.DataFrame({
+            "資産名": ["普通預金(みずほ)", np.nan, "定期預金(みずほ)", "普通預金(楽天)", "株A(SBI)"],
+            "金融機関口座": ["みずほ銀行", "楽天銀行", np.nan, "楽天銀行", "SBI証券"],
+            "資産サブタイプ": ["普通預金", "普通預金", "定期預金", "普通預金", "国内株式"],
+        })
+
+    def tearDown(self):
+        urds.df_asset_attribute = self.original
+
+    def test_first_match(self):
+        index = urds.get_asset_attribute_index()
+        self.assertEqual(index.find_asset_name(None, "普通"), "普通預金(みずほ)")
+        self.assertEqual(index.find_asset_name("楽天", "普通"), "普通預金(楽天)")
+        self.assertEqual(index.find_asset_name(" ", "定期"), "定期預金(みずほ)")
+        self.assertIsNone(index.find_asset_name("みずほ", "定期"))
+        self.assertEqual(index.find_asset_name(None, "(", ["国内株式"]), "株A(SBI)")
+        self.assertIsNone(index.find_asset_name(None, "普通", ["国内株式"]))
+        # df_asset_attribute を差し替えるとインデックスも作り直される
+        self.assertIs(urds.get_asset_attribute_index(), index)
+        urds.df_asset_attribute = urds.df_asset_attribute.iloc[3:]
+        self.assertEqual(urds.get_asset_attribute_index().find_asset_name(None, "普通"), "普通預金(楽天)")
+
+    def test_get_account_name_from_table(self):
+        df = pd.DataFrame({
+            "資産名": ["株A", "定期預金", "不明", "普通預金"],
+            "金融機関口座": [np.nan, np.nan, np.nan, "指定口座"],
+        })
+        result = get_account_name_from_table(df)
+        self.assertEqual(result.loc[0, "金融機関口座"], "SBI証券")
+        self.assertTrue(pd.isna(result.loc[1, "金融機関口座"]))
+        self.assertTrue(pd.isna(result.loc[2, "金融機関口座"]))
+        self.assertEqual(result.loc[3, "金融機関口座"], "指定口座")
+
+class TestRegisterNothingDateAsset(unittest.TestCase):
+    def setUp(self):
+        self.original = urds.df_asset_attribute
+        urds.df_asset_attribute = pd.DataFrame({"資産名": ["A", "B", "C", np.nan]})
+
+    def tearDown(self):
+        urds.df_asset_attribute = self.original
+
+    def test_missing_assets_are_added_with_zero(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-02", "2025-01-01", "2025-01-01"]),
+            "資産名": ["A", "A", "B"],
+            "金融機関口座": ["x", "x", "y"],
+            "資産額": [1.0, 2.0, 3.0],
+            "取得価格": [1.0, 2.0, 3.0],
+        })
+        result = register_nothing_date_asset_by_zero(df)
+
+        pairs = set(zip(result["date"].dt.strftime("%m%d"), result["資産名"]))
+        self.assertEqual(pairs, {(d, n) for d in ["0101", "0102"] for n in ["A", "B", "C"]})
+        self.assertTrue(result["date"].is_monotonic_increasing)
+        added = result[result["資産名"] == "C"]
+        self.assertEqual(added["資産額"].tolist(), [0.0, 0.0])
+        self.assertTrue(added["金融機関口座"].isna().all())
+
+if __name__ == '__main__':
+    unittest.main()
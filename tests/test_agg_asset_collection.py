@@ -0,0 +1,104 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from batch.lib.agg_asset_collection import (
+    get_asset_raw_from_table, load_asset_raw_from_pdf, extract_pdf_tables, RAW_COLUMNS
+)
+from batch.lib.pdf_table_cache import PdfTableCache
+
+def write_table_pdf(path, pages):
+    """1ページに1つ罫線付きテーブルを描いた最小の PDF を書き出す（ASCII のみ）"""
+    objs = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for rows in pages:
+        x0, y0, w, h = 50, 700, 100, 20
+        ops = [f"{x0} {y0 - r * h} m {x0 + len(rows[0]) * w} {y0 - r * h} l S" for r in range(len(rows) + 1)]
+        ops += [f"{x0 + c * w} {y0} m {x0 + c * w} {y0 - len(rows) * h} l S" for c in range(len(rows[0]) + 1)]
+        ops += [
+            f"BT /F1 10 Tf {x0 + c * w + 5} {y0 - (r + 1) * h + 6} Td ({cell}) Tj ET"
+            for r, row in enumerate(rows) for c, cell in enumerate(row)
+        ]
+        stream = "\n".join(ops).encode()
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objs.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objs)} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        ).encode())
+        kids.append(len(objs))
+    objs[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{off:010d} 00000 n \n".encode() for off in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+class TestGetAssetRawFromTable(unittest.TestCase):
+    def test_tables_are_mapped_to_standard_columns(self):
+        corpus = {
+            "250101": [
+                [["種類・名称", "保有⾦融機関", "残⾼"], ["預金A", "銀行A", "1,000円"], ["預金B"]],
+                [["預⾦‧現⾦‧暗号資産", "x"], ["skip", "1"]],
+                [["銘柄名", "評価額"]],
+                [["銘柄名", "評価額"], ["株A", "10", "余分な列"]],
+            ],
+            "250102": [
+                [["銘柄名", "名称", "評価額", "取得価額"], ["株B", "別名", "20", "15"]],
+                [["不明な列"], ["x"]],
+            ],
+            "invalid": [[["銘柄名"], ["株C"]]],
+        }
+        df = get_asset_raw_from_table(corpus)
+
+        self.assertEqual(list(df.columns), RAW_COLUMNS)
+        self.assertEqual(df["date"].dtype, "datetime64[ns]")
+        self.assertEqual(df["資産名"].tolist(), ["預金A", "預金B", "株B"])
+        self.assertEqual(df.loc[0, "金融機関口座"], "銀行A")
+        # ヘッダーより短い行・対応列が無いセルは欠損になる
+        self.assertTrue(pd.isna(df.loc[1, "資産額"]))
+        self.assertTrue(df["保有数"].isna().all())
+        self.assertEqual(df.loc[2, "取得価格"], "15")
+        self.assertEqual(df["date"].tolist(), list(pd.to_datetime(["2025-01-01", "2025-01-01", "2025-01-02"])))
+
+    def test_empty_input(self):
+        df = get_asset_raw_from_table({})
+        self.assertEqual(list(df.columns), RAW_COLUMNS)
+        self.assertTrue(df.empty)
+        self.assertEqual(df["資産名"].dtype, object)
+
+class TestLoadAssetRawFromPdf(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.raw_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_pages_are_split_and_reassembled_in_order(self):
+        pages = [[["Name", "Value"], [f"A{p}", str(p)]] for p in range(5)]
+        write_table_pdf(os.path.join(self.raw_dir, "250101.pdf"), pages)
+        write_table_pdf(os.path.join(self.raw_dir, "250103.pdf"), pages[:1])
+
+        cache = PdfTableCache(os.path.join(self.raw_dir, "cache"))
+        result = load_asset_raw_from_pdf(
+            pd.Timestamp("2025-01-01"), pd.Timestamp("2025-01-03"), self.raw_dir,
+            max_workers=2, cache=cache, pages_per_task=2
+        )
+
+        self.assertEqual(list(result), ["250101", "250103"])
+        self.assertEqual([list(map(list, t)) for t in result["250101"]], pages)
+        whole, complete = extract_pdf_tables(os.path.join(self.raw_dir, "250101.pdf"), "250101")
+        self.assertTrue(complete)
+        self.assertEqual(result["250101"], whole)
+        self.assertEqual(cache.stats["stored"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
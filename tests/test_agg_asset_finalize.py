@@ -0,0 +1,112 @@
+import unittest
+import datetime
+import numpy as np
+import numpy_financial as npf
+import pandas as pd
+from monthdelta import monthmod
+from batch.lib.agg_asset_finalize import fill_missing_dates_forward, cal_pension
+
+def legacy_fill_missing_dates_forward(df, df_asset_profit):
+    """資産ごとに merge_asof していた変更前の実装"""
+    start_date = df_asset_profit["date"].max()
+    all_dates = pd.DataFrame({"date": pd.date_range(start_date, df["date"].max())})
+    results = []
+    for asset, g in df.groupby("資産名"):
+        merged = pd.merge_asof(all_dates, g.sort_values("date"), on="date", direction="backward")
+        merged["資産名"] = asset
+        merged = merged[merged["date"] >= g["date"].min()]
+        results.append(merged)
+    filled = pd.concat(results, ignore_index=True)
+    df_before = df[df["date"] < start_date]
+    df_updated = pd.concat([df_before, filled], ignore_index=True)
+    return df_updated.sort_values(["date","資産名"]).reset_index(drop=True)
+
+def random_history(rng):
+    """資産ごとに開始日・欠損日がばらばらな履歴"""
+    dates = pd.date_range("2025-01-01", periods=int(rng.integers(5, 40)))
+    rows = []
+    for i in range(int(rng.integers(1, 12))):
+        first = int(rng.integers(0, len(dates)))
+        for date in dates[first:]:
+            if date == dates[first] or rng.random() > 0.4:
+                rows.append({
+                    "date": date, "資産名": f"資産{i}", "金融機関口座": f"口座{i % 3}",
+                    "資産額": float(rng.integers(0, 1000)), "取得価格": rng.choice([np.nan, 1.0]),
+                })
+    df = pd.DataFrame(rows).sample(frac=1, random_state=int(rng.integers(0, 1000)))
+    df_asset_profit = pd.DataFrame({"date": [dates[int(rng.integers(0, len(dates)))]]})
+    return df, df_asset_profit
+
+class TestFillMissingDatesForward(unittest.TestCase):
+    def test_matches_legacy_on_random_gaps(self):
+        rng = np.random.default_rng(0)
+        for _ in range(100):
+            df, df_asset_profit = random_history(rng)
+            pd.testing.assert_frame_equal(
+                fill_missing_dates_forward(df, df_asset_profit),
+                legacy_fill_missing_dates_forward(df, df_asset_profit),
+            )
+
+    def test_assets_start_from_first_date(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-01", "2025-01-03", "2025-01-04"]),
+            "資産名": ["A", "B", "A"],
+            "資産額": [1.0, 2.0, 3.0],
+        })
+        result = fill_missing_dates_forward(df, pd.DataFrame({"date": pd.to_datetime(["2025-01-02"])}))
+        self.assertEqual(
+            list(zip(result["date"].dt.day, result["資産名"], result["資産額"])),
+            [(1, "A", 1.0), (2, "A", 1.0), (3, "A", 1.0), (3, "B", 2.0), (4, "A", 3.0), (4, "B", 2.0)]
+        )
+
+def legacy_cal_pension(df, df_asset_profit):
+    """日付ごとに monthmod / npf.fv を計算していた変更前の実装"""
+    df_cal = df.copy()
+    start_date_PersonalPension = datetime.date(2012,3,28)
+    start_date = df_asset_profit["date"].max().date()
+    end_date = df_cal["date"].max().date()
+    for date in pd.date_range(start=start_date, end=end_date):
+        rel_delta, remainder = monthmod(start_date_PersonalPension, date.date())
+        mask = (df_cal["資産サブタイプ"] == "確定年金") & (df_cal["date"] == date)
+        df_cal.loc[mask, "資産額"] = npf.fv(0.0111/12, rel_delta.months, -20412, 0)
+        df_cal.loc[mask, "取得価格"] = 20412 * rel_delta.months
+    return df_cal
+
+class TestCalPension(unittest.TestCase):
+    def setUp(self):
+        dates = pd.date_range("2025-01-20", "2025-04-10")
+        self.df = pd.DataFrame({
+            "date": np.repeat(dates, 3),
+            "資産名": np.tile(["年金A", "年金B", "株A"], len(dates)),
+            "資産サブタイプ": np.tile(["確定年金", "確定年金", "国内株式"], len(dates)),
+            "資産額": 1.0,
+            "取得価格": 1.0,
+        })
+        self.df_asset_profit = pd.DataFrame({"date": pd.to_datetime(["2025-02-01"])})
+
+    def test_matches_legacy(self):
+        pd.testing.assert_frame_equal(
+            cal_pension(self.df, self.df_asset_profit),
+            legacy_cal_pension(self.df, self.df_asset_profit),
+        )
+
+    def test_multiple_products(self):
+        params = [
+            {"資産サブタイプ": "確定年金", "資産名": "年金B", "開始日": "2025-01-31", "年利": 0.0, "月額掛金": 100},
+            {"資産サブタイプ": "確定年金", "資産名": None, "開始日": "2012-03-28", "年利": 0.0111, "月額掛金": 20412},
+        ]
+        result = cal_pension(self.df, self.df_asset_profit, params).set_index(["date", "資産名"])
+        # 開始日の日付（31日）に達しない月末は1か月に数えない
+        self.assertEqual(result.loc[(pd.Timestamp("2025-02-28"), "年金B"), "取得価格"], 0)
+        self.assertEqual(result.loc[(pd.Timestamp("2025-03-31"), "年金B"), "資産額"], 200)
+        expected = legacy_cal_pension(self.df, self.df_asset_profit).set_index(["date", "資産名"])
+        self.assertEqual(
+            result.loc[(pd.Timestamp("2025-03-31"), "年金A"), "資産額"],
+            expected.loc[(pd.Timestamp("2025-03-31"), "年金A"), "資産額"],
+        )
+        # 対象期間より前と年金以外は変更しない
+        self.assertEqual(result.loc[(pd.Timestamp("2025-01-31"), "年金A"), "資産額"], 1.0)
+        self.assertTrue((result.xs("株A", level="資産名")["資産額"] == 1.0).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import pandas as pd
+from batch.lib.reference_data_store import BALANCE_RULES
+from batch.lib.agg_balance_collection import (
+    collect_balance, collect_living_adjust, BalanceRuleClassifier,
+    single_filter_df_by_value, double_filter_df_by_value
+)
+
+def legacy_collect_balance(df_raw):
+    """ルール・条件ごとに全行を走査していた変更前の実装"""
+    dfs = []
+    for category, conditions in BALANCE_RULES.items():
+        for cond in conditions:
+            if len(cond) == 2 and isinstance(cond[0], str):
+                df = single_filter_df_by_value(df_raw, cond[0], cond[1])
+            else:
+                df = double_filter_df_by_value(df_raw, cond[0][0], cond[0][1], cond[1][0], cond[1][1])
+            dfs.append(df.assign(収支項目=category))
+    return pd.concat(dfs, ignore_index=True)
+
+class TestBalanceRuleClassifier(unittest.TestCase):
+    def setUp(self):
+        rows = [
+            ("給与", "4月分", "みずほ"),
+            ("食費", "フリカエ ペイペイ", "みずほ"),
+            ("交際費", "飲み会", "楽天"),
+            ("カード", "UC 引落", "みずほ銀行"),
+            ("カード", "UC 引落", "楽天銀行"),
+            ("特典", "賞与 特典", "みずほ"),
+            ("その他", None, None),
+            ("ふるさと納税", "口座振替 PayPayカード", "PayPay"),
+        ]
+        self.df_raw = pd.DataFrame({
+            "date": pd.date_range("2025-01-01", periods=len(rows)),
+            "金額": range(len(rows)),
+            "保有金融機関": [r[2] for r in rows],
+            "大項目": "支出",
+            "中項目": [r[0] for r in rows],
+            "内容": [r[1] for r in rows],
+            "メモ": None,
+        })
+
+    def _canonical(self, df):
+        return df.sort_values(["収支項目", "date"]).reset_index(drop=True)
+
+    def test_multi_matches_legacy(self):
+        result = collect_balance(pd.DataFrame(), self.df_raw)
+        pd.testing.assert_frame_equal(
+            self._canonical(result), self._canonical(legacy_collect_balance(self.df_raw)), check_dtype=False
+        )
+
+    def test_first_match_and_hits(self):
+        classifier = BalanceRuleClassifier(BALANCE_RULES)
+        result = classifier.classify(self.df_raw, match="first")
+        # 賞与・特典の両方に一致する行は先に定義された 賞与 のみ
+        labels = dict(zip(result["date"].dt.day, result["収支項目"]))
+        self.assertEqual(labels[6], "賞与")
+        self.assertEqual(len(result), 6)
+        self.assertEqual(classifier.n_multi, 2)
+        self.assertEqual(classifier.n_unmatched, 2)
+        hits = classifier.hits.set_index("条件")["件数"]
+        self.assertEqual(hits["内容⊇UC & 保有金融機関⊇みずほ"], 1)
+        self.assertEqual(hits["中項目⊇給与"], 1)
+
+    def test_duplicate_conditions_in_category_count_once(self):
+        rules = {"生活費": [("内容", "PayPay"), ("内容", "口座振替")]}
+        result = BalanceRuleClassifier(rules).classify(self.df_raw)
+        self.assertEqual(len(result), 1)
+
+class TestCollectLivingAdjust(unittest.TestCase):
+    def test_monthly_adjustment(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2025-01-05", "2025-01-20", "2025-02-03", "2025-02-10", "2025-02-11"]),
+            "収支項目": ["家電", "ふるさと納税", "子供", "家電", "給与"],
+            "保有金融機関": ["Amazon.co.jp", "楽天市場(my Rakuten)", "PayPayカード", "みずほ銀行", "Amazon.co.jp"],
+            "金額": [-1000.0, -2000.0, -300.0, -5000.0, 100.0],
+        })
+        result = collect_living_adjust(df)
+        added = result[result["収支項目"] == "生活費"]
+        # 楽天市場(my Rakuten) は1回だけ数え、翌月1日に計上する
+        self.assertEqual(added["date"].tolist(), list(pd.to_datetime(["2025-02-01", "2025-03-01"])))
+        self.assertEqual(added["金額"].tolist(), [3000.0, 300.0])
+        self.assertEqual(len(result), len(df) + 2)
+
+if __name__ == '__main__':
+    unittest.main()
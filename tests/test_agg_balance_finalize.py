@@ -0,0 +1,99 @@
+import unittest
+import itertools
+import numpy as np
+import pandas as pd
+from batch.lib import reference_data_store as urds
+from batch.lib.agg_balance_finalize import finalize_data, add_type_and_category, BALANCE_ITEMS
+
+def legacy_finalize_data(start_date, end_date, df):
+    """itertools.product の表に merge し、収支項目ごとに .loc で属性を付けていた変更前の実装"""
+    df_unify = df.groupby(["date", "収支項目"], as_index=False)["金額"].sum()
+    all_combinations = pd.DataFrame(
+        list(itertools.product(pd.date_range(start_date, end_date, freq="D"), BALANCE_ITEMS)),
+        columns=["date", "収支項目"]
+    )
+    df_full = pd.merge(all_combinations, df_unify, on=["date", "収支項目"], how="left")
+    df_full["金額"] = df_full["金額"].fillna(0)
+
+    df_full["収支タイプ"] = pd.Series(dtype="object")
+    df_full["収支カテゴリー"] = pd.Series(dtype="object")
+    df_tmp = urds.df_balance_attribute
+    for item in df_full["収支項目"].unique().tolist():
+        df_full.loc[df_full["収支項目"] == item, "収支タイプ"] = df_tmp.loc[df_tmp["収支項目"] == item, "収支タイプ"].iloc[0]
+        df_full.loc[df_full["収支項目"] == item, "収支カテゴリー"] = df_tmp.loc[df_tmp["収支項目"] == item, "収支カテゴリー"].iloc[0]
+
+    mask = (urds.df_balance_target["date"] >= start_date) & (urds.df_balance_target["date"] <= end_date+pd.DateOffset(years=3))
+    df_target = urds.df_balance_target[mask]
+    df_target = df_target[~df_target["収支項目"].str.contains("年金拠出", na=False)].copy()
+    df_target.loc[df_target["収支カテゴリー"] == "支出", "目標"] *= -1
+    df_merge = pd.merge(df_full, df_target, on=["date", "収支項目", "収支タイプ", "収支カテゴリー"], how="outer")
+    df_merge["金額"] = df_merge["金額"].fillna(0)
+    return df_merge
+
+class TestFinalizeData(unittest.TestCase):
+    def setUp(self):
+        self.original_attribute = urds.df_balance_attribute
+        self.original_target = urds.df_balance_target
+        rng = np.random.default_rng(0)
+
+        items = BALANCE_ITEMS + ["年金拠出", "目標のみ"]
+        urds.df_balance_attribute = pd.DataFrame({
+            "収支項目": items + ["給与"],
+            "収支タイプ": ["固定" if i % 2 else "変動" for i in range(len(items))] + ["重複"],
+            "収支カテゴリー": ["収入" if i % 3 else "支出" for i in range(len(items))] + ["重複"],
+        })
+        attr = urds.df_balance_attribute.drop_duplicates("収支項目").set_index("収支項目")
+        target_dates = pd.date_range("2025-01-01", "2025-06-30", freq="MS")
+        df_target = pd.DataFrame(
+            list(itertools.product(target_dates, ["給与", "ローン返済", "年金拠出", "目標のみ"])),
+            columns=["date", "収支項目"]
+        )
+        df_target["収支タイプ"] = df_target["収支項目"].map(attr["収支タイプ"])
+        df_target["収支カテゴリー"] = df_target["収支項目"].map(attr["収支カテゴリー"])
+        df_target["目標"] = rng.normal(1000, 10, len(df_target))
+        urds.df_balance_target = df_target
+
+        n = 300
+        self.df = pd.DataFrame({
+            "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+            "収支項目": rng.choice(BALANCE_ITEMS + ["対象外"], n),
+            "金額": rng.normal(0, 1000, n),
+            "内容": "x", "保有金融機関": "y", "大項目": "z", "中項目": "w", "メモ": None,
+        })
+        self.start, self.end = pd.Timestamp("2025-01-01"), pd.Timestamp("2025-03-31")
+
+    def tearDown(self):
+        urds.df_balance_attribute = self.original_attribute
+        urds.df_balance_target = self.original_target
+
+    def _canonical(self, df):
+        df = df.astype({c: object for c in ["収支項目", "収支タイプ", "収支カテゴリー"]})
+        return df.sort_values(["date", "収支項目"]).reset_index(drop=True)
+
+    def test_matches_legacy(self):
+        result = finalize_data(self.start, self.end, self.df)
+        expected = legacy_finalize_data(self.start, self.end, self.df)
+        pd.testing.assert_frame_equal(self._canonical(result), self._canonical(expected))
+
+        for col in ["収支項目", "収支タイプ", "収支カテゴリー"]:
+            self.assertIsInstance(result[col].dtype, pd.CategoricalDtype)
+        self.assertLess(result.memory_usage(deep=True).sum(), expected.memory_usage(deep=True).sum() / 2)
+
+    def test_sparse_keeps_only_non_zero_rows(self):
+        dense = finalize_data(self.start, self.end, self.df)
+        sparse = finalize_data(self.start, self.end, self.df, sparse=True)
+
+        self.assertLess(len(sparse), len(dense) / 5)
+        self.assertFalse(((sparse["金額"] == 0) & (sparse["目標"].fillna(0) == 0)).any())
+        # 落とした行の金額はすべて 0 なので、日付ごとの合計は変わらない
+        daily_dense = dense.groupby("date")["金額"].sum()
+        daily_sparse = sparse.groupby("date")["金額"].sum().reindex(daily_dense.index, fill_value=0)
+        pd.testing.assert_series_equal(daily_sparse, daily_dense)
+
+    def test_unregistered_item_raises(self):
+        df = pd.DataFrame({"date": [self.start], "収支項目": pd.Categorical(["未登録"])})
+        with self.assertRaises(KeyError):
+            add_type_and_category(df)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import numpy as np
+import pandas as pd
+from batch.lib import reference_data_store as urds
+from batch.lib.agg_profit_cal import _set_realized_capital, _estimated_lot_realized_gain
+
+def legacy_set_realized_capital(df_asset_profit):
+    """資産・売却日ごとに前日の行を探していた変更前の実装"""
+    target_sub_type = ["国内株式","投資信託","セキュリティートークン"]
+    df = urds.df_asset_attribute.copy()
+    mask = df["資産サブタイプ"].isin(target_sub_type) &\
+        (df["金融機関口座"] != "ALTERNA") &\
+        (df["金融機関口座"] != "FOLIO")
+    target_asset = df[mask]["資産名"].to_list()
+    df = df_asset_profit.set_index("date")
+    df_tmp = pd.DataFrame(columns=["date","資産名","実現損益"])
+    for asset in target_asset:
+        df_diff = df[df["資産名"] == asset]["取得価格"].diff().fillna(0)
+        df_sale = df_diff[df_diff<-5]
+        for date, value in df_sale.items():
+            mask = (df.index == (date-pd.Timedelta(days=1))) & (df["資産名"] == asset)
+            predate_acquisition = df[mask]["取得価格"].iloc[0]
+            predate_unrealized_profit = df[mask]["含み損益"].iloc[0]
+            gain_loss_on_sale= predate_unrealized_profit * abs(value / predate_acquisition)
+            df_tmp.loc[len(df_tmp)] = {"date":date, "資産名":asset, "実現損益":gain_loss_on_sale}
+    return df_tmp
+
+def loop_estimated_lot_realized_gain(df, diff):
+    """資産ごと・日ごとのループで保有口数を追っていた変更前の実装"""
+    gains = pd.Series(np.nan, index=df.index)
+    for _, g in df.groupby("資産名", sort=False):
+        d = diff.loc[g.index].to_numpy(dtype=float)
+        value = g["資産額"].to_numpy(dtype=float)
+        acquisition = g["取得価格"].to_numpy(dtype=float)
+
+        ratio = np.ones(len(g))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio[1:] = np.where((d[1:] == 0) & (value[:-1] > 0) & (value[1:] > 0), value[1:] / value[:-1], 1.0)
+        price = np.cumprod(ratio)
+        prev_price = np.concatenate([price[:1], price[:-1]])
+
+        lot_cost = np.where(d > 0, d, 0.0)
+        lot_units = lot_cost / price
+        lot_cost[0], lot_units[0] = acquisition[0], max(value[0], 0.0) / price[0]
+
+        units_sold = np.zeros(len(g))
+        held = lot_units[0]
+        for i in range(1, len(g)):
+            if d[i] < 0 and acquisition[i - 1] > 0:
+                units_sold[i] = min(-d[i] / acquisition[i - 1], 1.0) * held
+            held += lot_units[i] - units_sold[i]
+
+        has_lot = lot_units > 0
+        cum_units = np.concatenate([[0.0], np.cumsum(lot_units[has_lot])])
+        cum_cost = np.concatenate([[0.0], np.cumsum(lot_cost[has_lot])])
+        sold_end = np.cumsum(units_sold)
+        sold_cost = np.interp(sold_end, cum_units, cum_cost) - np.interp(sold_end - units_sold, cum_units, cum_cost)
+        gains.loc[g.index] = units_sold * prev_price - sold_cost
+    return gains
+
+class TestSetRealizedCapital(unittest.TestCase):
+    def setUp(self):
+        self.original = urds.df_asset_attribute
+        urds.df_asset_attribute = pd.DataFrame({
+            "資産名": ["株A", "投信B", "株C", "預金D"],
+            "資産サブタイプ": ["国内株式", "投資信託", "国内株式", "普通預金"],
+            "金融機関口座": ["SBI証券", "楽天証券", "FOLIO", "銀行"],
+        })
+
+    def tearDown(self):
+        urds.df_asset_attribute = self.original
+
+    def _history(self, rng, floor=100.0):
+        dates = pd.date_range("2025-01-01", periods=60)
+        frames = []
+        for name in urds.df_asset_attribute["資産名"]:
+            flows = rng.choice([0.0, 0.0, 0.0, 500.0, -300.0, -3.0], size=len(dates))
+            acquisition = np.maximum(1000.0 + np.cumsum(flows), floor)
+            frames.append(pd.DataFrame({
+                "date": dates, "資産名": name, "取得価格": acquisition,
+                "資産額": acquisition * rng.uniform(0.8, 1.3, len(dates)),
+                "含み損益": rng.normal(0, 100, len(dates)),
+            }))
+        return pd.concat(frames).sort_values("date", kind="stable").reset_index(drop=True)
+
+    def test_average_matches_legacy(self):
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            df = self._history(rng)
+            key = ["資産名", "date"]
+            result = _set_realized_capital(df, None).sort_values(key).reset_index(drop=True)
+            expected = legacy_set_realized_capital(df).sort_values(key).reset_index(drop=True)
+            self.assertGreater(len(expected), 0)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_estimated_lots_matches_loop(self):
+        rng = np.random.default_rng(1)
+        full_sales = 0
+        for floor in [100.0, 0.0, 0.0, 0.0, 0.0]:
+            # floor=0 では全量売却（取得価格が 0 になる日）と、その後の買い直しを含む
+            df = self._history(rng, floor=floor)
+            full_sales += (df["取得価格"] == 0).sum()
+            diff = df.groupby("資産名", sort=False)["取得価格"].diff().fillna(0)
+            result = _estimated_lot_realized_gain(df, diff)
+            expected = loop_estimated_lot_realized_gain(df, diff)
+            self.assertGreater((expected.abs() > 0).sum(), 0)
+            np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-6)
+        self.assertGreater(full_sales, 0)
+
+    def test_estimated_lots_sells_oldest_lot_first(self):
+        # 1/1 に 1000円で1000口、1/3 に基準価額2倍で 2000円分(1000口)買付、1/5 に 1000口売却
+        # 取得価格は移動平均なので、売却で 1000口 × 平均単価1.5円 = 1500円減る
+        df = pd.DataFrame({
+            "date": pd.date_range("2025-01-01", periods=5),
+            "資産名": "株A",
+            "取得価格": [1000.0, 1000.0, 3000.0, 3000.0, 1500.0],
+            "資産額": [1000.0, 2000.0, 4000.0, 4000.0, 2000.0],
+            "含み損益": [0.0, 1000.0, 1000.0, 1000.0, 500.0],
+        })
+        lots = _set_realized_capital(df, None, lot_method="estimated_lots")
+        average = _set_realized_capital(df, None, lot_method="average")
+        self.assertEqual(lots["date"].tolist(), [pd.Timestamp("2025-01-05")])
+        # 古いロット 1000口 × 2円 - 原価 1000円
+        self.assertAlmostEqual(lots["実現損益"].iloc[0], 1000.0)
+        # 移動平均: 含み損益 1000円 × 1500/3000
+        self.assertAlmostEqual(average["実現損益"].iloc[0], 500.0)
+        with self.assertRaises(ValueError):
+            _set_realized_capital(df, None, lot_method="fifo")
+
+if __name__ == '__main__':
+    unittest.main()
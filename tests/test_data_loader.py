@@ -3,8 +3,16 @@ import pandas as pd
 import os
 import sqlite3
 import tempfile
-from app.utils.data_loader import append_to_table
-from app.utils.db_manager import init_db
+from unittest import mock
+from flask import Flask
+from app.utils.data_loader import (
+    append_to_table, get_row_count, get_attribute_table, invalidate_metadata_cache,
+    get_data_version, replace_to_table, query_table_columns,
+    table_exists, drop_table_if_exists, bulk_load_table, get_raw_table,
+    publish_tables, find_missing_indexes, INDEX_SPECS, densify_date_grid
+)
+from app.routes.routes_helper import versioned_cache_key
+from app.utils.db_manager import init_db, get_pool_metrics, get_engine
 from pathlib import Path
 
 class TestDataLoader(unittest.TestCase):
@@ -38,6 +46,9 @@ class TestDataLoader(unittest.TestCase):
         except OSError:
             pass
         
+        invalidate_metadata_cache()
+        db_manager.close_pool()
+
         # Restore db_manager
         db_manager.db_type = self.original_db_type
         if self.original_finance_db:
@@ -54,5 +65,218 @@ class TestDataLoader(unittest.TestCase):
             df_read = pd.read_sql_query("SELECT * FROM test_table", conn)
         self.assertEqual(len(df_read), 2)
 
+    def test_row_count_is_memoized_until_write(self):
+        invalidate_metadata_cache()
+        app = Flask(__name__)
+        with app.app_context():
+            self.assertEqual(get_row_count('test_table'), 0)
+        with app.app_context():
+            # 別リクエストではデータバージョンの確認だけで済む
+            checkouts = get_pool_metrics("finance")["checkouts"]
+            self.assertEqual(get_row_count('test_table'), 0)
+            self.assertEqual(get_pool_metrics("finance")["checkouts"], checkouts + 1)
+
+        # 書き込みでメモが無効化される
+        append_to_table(pd.DataFrame({'col1': [1], 'col2': ['a']}), 'test_table')
+        with app.app_context():
+            self.assertEqual(get_row_count('test_table'), 1)
+
+    def test_attribute_table_memo_is_scoped_to_request(self):
+        invalidate_metadata_cache()
+        append_to_table(pd.DataFrame({'col1': [1], 'col2': ['a']}), 'test_table')
+        with Flask(__name__).app_context():
+            df = get_attribute_table('test_table')
+            df["col1"] = 99
+            checkouts = get_pool_metrics("finance")["checkouts"]
+            # 呼び出し側の加工はメモに影響しない
+            self.assertEqual(get_attribute_table('test_table')["col1"].tolist(), [1])
+            self.assertEqual(get_pool_metrics("finance")["checkouts"], checkouts)
+
+    def test_data_version_changes_cache_key(self):
+        make_key = versioned_cache_key("payload")
+        self.assertEqual(get_data_version(), 0)
+        key_before = make_key(include_graphs=True)
+
+        self.assertEqual(publish_tables({'table_a': pd.DataFrame({'v': [1]})}), 1)
+        self.assertEqual(publish_tables({'table_a': pd.DataFrame({'v': [2]})}), 2)
+        self.assertEqual(get_data_version(), 2)
+        self.assertNotEqual(make_key(include_graphs=True), key_before)
+        self.assertIn(":v2:", make_key(include_graphs=True))
+
+    def test_query_table_columns_reads_cache_table(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03']),
+            '資産_実績_資産額': [100.0, 200.0, 300.0],
+            '資産_目標_資産額': [110.0, 210.0, 310.0],
+        })
+        replace_to_table(df, 'category_cache_daily')
+        self.assertTrue(table_exists('category_cache_daily'))
+
+        df_read = query_table_columns(
+            'category_cache_daily', ['date', '資産_実績_資産額'],
+            start_date=pd.Timestamp('2025-01-02'), end_date=pd.Timestamp('2025-01-03'),
+            order_by=['date']
+        )
+        self.assertEqual(df_read.columns.tolist(), ['date', '資産_実績_資産額'])
+        self.assertEqual(df_read['資産_実績_資産額'].tolist(), [200.0, 300.0])
+
+        drop_table_if_exists('category_cache_daily')
+        self.assertFalse(table_exists('category_cache_daily'))
+
+    def test_publish_tables_upserts_matching_keys(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-01', '2025-01-02']),
+            '資産名': ['A', 'B', None],
+            '資産額': [1.0, 2.0, 3.0],
+        })
+        replace_to_table(df, 'asset_profit_detail')
+
+        df_delta = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03']),
+            '資産名': ['B', None, 'A'],
+            '資産額': [20.0, 30.0, 4.0],
+        })
+        publish_tables({'asset_profit_detail': df_delta}, upsert_keys={'asset_profit_detail': ['date', '資産名']})
+
+        with sqlite3.connect(self.db_path) as conn:
+            df_read = pd.read_sql_query('SELECT * FROM asset_profit_detail ORDER BY date, 資産額', conn)
+        self.assertEqual(df_read['資産額'].tolist(), [1.0, 20.0, 30.0, 4.0])
+        self.assertFalse(table_exists('asset_profit_detail__shadow'))
+
+    def test_bulk_load_matches_to_sql(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-02', None]),
+            '資産名': ['A', None, 'C'],
+            '資産額': [1.5, float('nan'), 3.0],
+            '件数': [1, 2, 3],
+        })
+        self.assertEqual(bulk_load_table(df, 'test_table', if_exists="replace"), 3)
+        with get_engine("finance").begin() as conn:
+            df.to_sql('expected_table', conn, index=False)
+
+        pd.testing.assert_frame_equal(get_raw_table('test_table'), get_raw_table('expected_table'))
+        with sqlite3.connect(self.db_path) as conn:
+            stored = conn.execute('SELECT * FROM test_table').fetchall()
+            expected = conn.execute('SELECT * FROM expected_table').fetchall()
+        self.assertEqual(stored, expected)
+
+        bulk_load_table(df, 'test_table', if_exists="append")
+        self.assertEqual(len(get_raw_table('test_table')), 6)
+        self.assertFalse(table_exists('test_table__load'))
+
+    def test_publish_tables_swaps_all_or_nothing(self):
+        replace_to_table(pd.DataFrame({'v': [1]}), 'table_a')
+        replace_to_table(pd.DataFrame({'v': [1]}), 'table_b')
+
+        # 2つ目のロードで失敗した場合は何も公開されない
+        with self.assertRaises(Exception):
+            publish_tables({
+                'table_a': pd.DataFrame({'v': [2]}),
+                'table_b': pd.DataFrame({'v': [{'not': 'storable'}]}),
+            })
+        self.assertEqual(get_raw_table('table_a')['v'].tolist(), [1])
+        self.assertEqual(get_raw_table('table_b')['v'].tolist(), [1])
+        self.assertFalse(table_exists('table_a__shadow'))
+
+        version = publish_tables(
+            {'table_a': pd.DataFrame({'v': [2]}), 'table_b': pd.DataFrame({'v': [2, 3]})},
+            drop_tables=['test_table']
+        )
+        self.assertEqual(version, get_data_version())
+        self.assertEqual(get_raw_table('table_a')['v'].tolist(), [2])
+        self.assertEqual(get_raw_table('table_b')['v'].tolist(), [2, 3])
+        self.assertFalse(table_exists('test_table'))
+
+    def test_publish_tables_rolls_back_failed_swap(self):
+        replace_to_table(pd.DataFrame({'v': [1]}), 'table_a')
+        replace_to_table(pd.DataFrame({'v': [1]}), 'table_b')
+        version = get_data_version()
+
+        # 1つ目の入れ替えの後、2つ目の入れ替えで失敗させる
+        from app.utils import data_loader
+        swap_table = data_loader._swap_table
+        calls = []
+        def failing_swap(conn, staging_table, table_name):
+            calls.append(table_name)
+            if len(calls) == 2:
+                raise RuntimeError("swap failed")
+            swap_table(conn, staging_table, table_name)
+
+        with mock.patch.object(data_loader, '_swap_table', side_effect=failing_swap):
+            with self.assertRaises(Exception):
+                publish_tables({'table_a': pd.DataFrame({'v': [2]}), 'table_b': pd.DataFrame({'v': [2]})})
+
+        invalidate_metadata_cache()
+        self.assertEqual(calls, ['table_a', 'table_b'])
+        self.assertEqual(get_raw_table('table_a')['v'].tolist(), [1])
+        self.assertEqual(get_raw_table('table_b')['v'].tolist(), [1])
+        self.assertEqual(get_data_version(), version)
+        self.assertFalse(table_exists('table_a__shadow'))
+
+    def test_indexes_are_created_after_replace(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-02']),
+            '資産名': ['A', 'B'],
+            '資産サブタイプ': ['S', 'S'],
+            '資産額': [1.0, 2.0],
+        })
+        replace_to_table(df, 'asset_profit_detail')
+        self.assertNotIn('asset_profit_detail', find_missing_indexes())
+
+        with sqlite3.connect(self.db_path) as conn:
+            names = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'asset_profit_detail'"
+            )}
+        self.assertEqual(names, {name for name, _ in INDEX_SPECS['asset_profit_detail']})
+
+    def test_publish_tables_replaces_date_range(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-10', '2025-01-11', '2025-01-12']),
+            '収支項目': ['給与', '生活費', '車', '給与'],
+            '金額': [1.0, -5.0, 3.0, 2.0],
+        })
+        replace_to_table(df, 'balance_detail')
+
+        def read_amounts():
+            with sqlite3.connect(self.db_path) as conn:
+                return pd.read_sql_query('SELECT * FROM balance_detail ORDER BY date', conn)['金額'].tolist()
+
+        # 基準日 01-10 以降で 0 に戻った行は送られない。最小の送信日 (01-12) より前の行も基準日から消える
+        df_delta = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-12']),
+            '収支項目': ['給与'],
+            '金額': [20.0],
+        })
+        publish_tables(
+            {'balance_detail': df_delta},
+            upsert_keys={'balance_detail': ['date', '収支項目']},
+            replace_from={'balance_detail': '2025-01-10'}
+        )
+        self.assertEqual(read_amounts(), [1.0, 20.0])
+
+        # 送る行が無い場合も基準日以降は消える
+        publish_tables(
+            {'balance_detail': df_delta.iloc[:0]},
+            replace_from={'balance_detail': '2025-01-02'}
+        )
+        self.assertEqual(read_amounts(), [1.0])
+
+    def test_densify_date_grid(self):
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-01', '2025-01-03', '2025-02-01']),
+            '収支項目': ['給与', '車', '給与'],
+            '金額': [1.0, 3.0, 0.0],
+            '目標': [None, 5.0, 7.0],
+        })
+        result = densify_date_grid(df, pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-03'), ['収支項目'], {'金額': 0})
+
+        self.assertEqual(len(result), 3 * 2 + 1)
+        day2 = result[result['date'] == pd.Timestamp('2025-01-02')]
+        self.assertEqual(day2['金額'].tolist(), [0.0, 0.0])
+        self.assertTrue(day2['目標'].isna().all())
+        # 期間外の行と元の値はそのまま
+        self.assertEqual(result['金額'].sum(), 4.0)
+        self.assertEqual(result['目標'].sum(), 12.0)
+
 if __name__ == '__main__':
     unittest.main()
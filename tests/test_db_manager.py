@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from pathlib import Path
+from app.utils.db_manager import init_db, get_engine, get_pool_metrics
+from app.utils.data_loader import get_raw_table, replace_to_table
+
+class TestDbManagerEngine(unittest.TestCase):
+    def setUp(self):
+        init_db()
+
+        # Create a temporary database
+        self.db_fd, self.db_path = tempfile.mkstemp()
+
+        # Patch db_manager to use temp sqlite db
+        from app.utils.db_manager import db_manager
+        self.original_db_type = db_manager.db_type
+        self.original_finance_db = getattr(db_manager, 'finance_db', None)
+
+        db_manager.db_type = "sqlite"
+        db_manager.finance_db = Path(self.db_path)
+
+    def tearDown(self):
+        from app.utils.db_manager import db_manager
+        db_manager.close_pool()
+
+        os.close(self.db_fd)
+        try:
+            os.remove(self.db_path)
+        except OSError:
+            pass
+
+        # Restore db_manager
+        db_manager.db_type = self.original_db_type
+        if self.original_finance_db:
+            db_manager.finance_db = self.original_finance_db
+
+    def test_engine_is_reused(self):
+        self.assertIs(get_engine("finance"), get_engine("finance"))
+
+    def test_engine_follows_database_path(self):
+        from app.utils.db_manager import db_manager
+        engine = get_engine("finance")
+
+        other_fd, other_path = tempfile.mkstemp()
+        try:
+            db_manager.finance_db = Path(other_path)
+            self.assertIsNot(get_engine("finance"), engine)
+            self.assertIn(other_path, str(get_engine("finance").url))
+        finally:
+            db_manager.finance_db = Path(self.db_path)
+            os.close(other_fd)
+
+    def test_pool_metrics_count_checkouts(self):
+        df = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+        replace_to_table(df, 'test_table')
+        get_raw_table('test_table')
+        get_raw_table('test_table')
+
+        metrics = get_pool_metrics("finance")
+        self.assertTrue(metrics["initialized"])
+        self.assertGreaterEqual(metrics["checkouts"], 3)
+        # 物理接続はプールで再利用される
+        self.assertEqual(metrics["connects"], 1)
+        self.assertEqual(metrics["checked_out"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from batch.lib import reference_data_store as urds
+from batch.lib.loan_engine import rate_on_dates, loan_balance_path
+from batch.lib.agg_profit_cal import set_loan_balance
+
+def loop_balance_path(initial_balance, daily_rate, payments):
+    balance, prev = [], initial_balance
+    for rate, payment in zip(daily_rate, payments):
+        prev = min(prev + prev * rate + payment, 0)
+        balance.append(prev)
+    return np.array(balance)
+
+class TestLoanEngine(unittest.TestCase):
+    def test_balance_path_matches_daily_loop(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            n = int(rng.integers(1, 3000))
+            daily_rate = rng.choice([0.0065, 0.0075, 0.01], size=n) / 365
+            payments = np.where(rng.random(n) < 0.05, rng.uniform(0, 200_000, n), 0.0)
+            # 完済後の再借入も含める
+            payments[rng.random(n) < 0.002] = -1_000_000
+            initial = -float(rng.uniform(0, 5_000_000))
+            np.testing.assert_allclose(
+                loan_balance_path(initial, daily_rate, payments),
+                loop_balance_path(initial, daily_rate, payments),
+                rtol=1e-9, atol=1e-6,
+            )
+
+    def test_rate_on_dates_is_step_function(self):
+        dates = pd.date_range("2024-09-30", "2025-07-02")
+        rate = pd.Series(rate_on_dates(urds.LOAN_RATE_SCHEDULE, "ローン金利", dates), index=dates)
+        self.assertEqual(rate["2024-09-30"], 0.0065)
+        self.assertEqual(rate["2024-12-31"], 0.0065)
+        self.assertEqual(rate["2025-01-01"], 0.0075)
+        self.assertEqual(rate["2025-06-30"], 0.0075)
+        self.assertEqual(rate["2025-07-01"], 0.0100)
+
+    def test_set_loan_balance_writes_debt_rows(self):
+        start, end = pd.Timestamp("2024-10-01"), pd.Timestamp("2025-08-31")
+        dates = pd.date_range(start, end)
+        df_asset_profit = pd.DataFrame({
+            "date": np.repeat(dates, 2),
+            "資産名": np.tile(["住宅ローン", "預金"], len(dates)),
+            "資産タイプ": np.tile(["負債", "現金"], len(dates)),
+            "資産額": 1.0,
+        })
+        df_balance = pd.DataFrame({
+            "date": pd.date_range(start, end, freq="MS") + pd.Timedelta(days=26),
+            "収支項目": "ローン返済",
+            "目標": -80_000.0,
+        })
+        result = set_loan_balance(df_asset_profit, start, end, df_balance)
+
+        # 変更前の日次ループと同じ残高
+        expected, balance = [], urds.LOAN_INITIAL_BALANCE
+        repayment = df_balance.set_index("date")["目標"].reindex(dates, fill_value=0)
+        for d in dates:
+            rate = 0.0065 if d < pd.Timestamp("2025-01-01") else 0.0075 if d < pd.Timestamp("2025-07-01") else 0.0100
+            balance = min(balance + balance * rate / 365 - repayment[d], 0)
+            expected.append(balance)
+        np.testing.assert_allclose(result.loc[result["資産タイプ"] == "負債", "資産額"], expected, rtol=1e-12)
+        self.assertTrue((result.loc[result["資産タイプ"] == "現金", "資産額"] == 1.0).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from batch.lib.pdf_table_cache import PdfTableCache
+from batch.lib.agg_asset_collection import load_asset_raw_from_pdf
+
+class TestPdfTableCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.raw_dir = os.path.join(self.tmp_dir.name, "raw")
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        os.makedirs(self.raw_dir)
+        self.tables = [[["種類・名称", "評価額"], ["資産A", "1,000"]]]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_pdf(self, fname, content=b"%PDF-dummy"):
+        path = os.path.join(self.raw_dir, fname + ".pdf")
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_hit_miss_and_change(self):
+        path = self._write_pdf("250101")
+
+        cache = PdfTableCache(self.cache_dir)
+        self.assertIsNone(cache.get(path))
+        cache.put(path, self.tables)
+        cache.save()
+
+        cache = PdfTableCache(self.cache_dir)
+        self.assertEqual(cache.get(path), self.tables)
+
+        # mtime だけ変わっても内容が同じならヒットする
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(cache.get(path), self.tables)
+
+        # 内容が変われば再解析が必要
+        self._write_pdf("250101", b"%PDF-changed")
+        self.assertIsNone(cache.get(path))
+        self.assertEqual(cache.stats, {"hit": 2, "miss": 1, "stored": 0})
+
+        # rebuild 指定時はキャッシュを使わない
+        self._write_pdf("250101")
+        self.assertIsNone(PdfTableCache(self.cache_dir, rebuild=True).get(path))
+
+    def test_load_uses_cache_without_parsing(self):
+        path = self._write_pdf("250101")
+        cache = PdfTableCache(self.cache_dir)
+        cache.put(path, self.tables)
+        cache.save()
+
+        # ダミー PDF は解析できないので、結果が返ればキャッシュから読んでいる
+        cache = PdfTableCache(self.cache_dir)
+        result = load_asset_raw_from_pdf(
+            pd.Timestamp("2025-01-01"), pd.Timestamp("2025-01-02"), self.raw_dir, cache=cache
+        )
+        self.assertEqual(result, {"250101": self.tables})
+        self.assertEqual(cache.stats["hit"], 1)
+        self.assertEqual(cache.stats["miss"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
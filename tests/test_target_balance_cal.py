@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import pandas as pd
+from batch.lib.target_balance_cal import build_balance_target, cal_total_balance
+
+class TestBuildBalanceTarget(unittest.TestCase):
+    def setUp(self):
+        self.df_raw = pd.DataFrame({
+            "収支項目": ["給与", "家賃", "車検", "旅行", "一時金", "期間外"],
+            "収支タイプ": "一般収支",
+            "収支カテゴリー": ["収入", "支出", "支出", "支出", "収入", "収入"],
+            "繰り返し設定": ["MONTHLY", "MONTHLY", "EVERY 2 YEARS", "ANNUALLY", "SPECIFIC", "SPECIFIC"],
+            "開始日": ["TBD", "2025-02-15", "2024-03-01", "TBD", "TBD", "TBD"],
+            "終了日": ["TBD", "2025-06-30", "TBD", "2025-12-31", "TBD", "TBD"],
+            "月": [np.nan, np.nan, 3.0, 2.0, np.nan, np.nan],
+            "日": [25.0, 31.0, 10.0, 29.0, np.nan, np.nan],
+            "特定日": ["2025-01-01", "2025-01-01", "2025-01-01", "2025-01-01", "2026-05-05", "2030-01-01"],
+            "目標": [300.0, 100.0, 50.0, 80.0, 1000.0, 1.0],
+        })
+
+    def _dates(self, df, item):
+        return df.loc[df["収支項目"] == item, "date"].dt.strftime("%Y-%m-%d").tolist()
+
+    def test_occurrences_only(self):
+        df = build_balance_target(self.df_raw, "2025-01-01", "2027-12-31")
+
+        self.assertEqual(len(self._dates(df, "給与")), 36)
+        # 31日のない月・開始日より前は発生しない
+        self.assertEqual(self._dates(df, "家賃"), ["2025-03-31", "2025-05-31"])
+        # 2年ごとは 開始日 の年が基準
+        self.assertEqual(self._dates(df, "車検"), ["2026-03-10"])
+        # 2/29 のない年は発生しない
+        self.assertEqual(self._dates(df, "旅行"), [])
+        self.assertEqual(self._dates(df, "一時金"), ["2026-05-05"])
+        self.assertEqual(self._dates(df, "期間外"), [])
+        self.assertTrue(df["date"].is_monotonic_increasing)
+        self.assertNotIn("繰り返し設定", df.columns)
+
+    def test_cal_total_balance_fills_days_without_events(self):
+        df = build_balance_target(self.df_raw, "2025-01-01", "2025-03-31")
+        dates = pd.date_range("2025-01-01", "2025-03-31")
+        balance_cash = cal_total_balance(df, dates)
+
+        self.assertEqual(len(balance_cash), len(dates))
+        self.assertEqual(balance_cash[dates.get_loc(pd.Timestamp("2025-01-25"))], 300.0)
+        self.assertEqual(balance_cash[dates.get_loc(pd.Timestamp("2025-03-31"))], -100.0)
+        self.assertEqual(balance_cash.sum(), 300.0 * 3 - 100.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import os
+import io
+import pandas as pd
+import tempfile
+import sqlite3
+import hashlib
+from unittest import mock
+from app import create_app
+import app.routes.routes_data as routes_data
+import app.utils.db_manager as db_manager_module
+from pathlib import Path
+
+class TestUploadStream(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary database
+        self.db_fd, self.db_path = tempfile.mkstemp()
+
+        self.spool_dir = tempfile.TemporaryDirectory()
+
+        self.app = create_app()
+        self.app.config['UPLOAD'] = {'spool_dir': self.spool_dir.name}
+        self.app.testing = True
+        self.client = self.app.test_client()
+
+        # Patch db_manager to use temp sqlite db
+        self.original_db_type = db_manager_module.db_manager.db_type
+        self.original_finance_db = getattr(db_manager_module.db_manager, 'finance_db', None)
+
+        db_manager_module.db_manager.db_type = "sqlite"
+        db_manager_module.db_manager.finance_db = Path(self.db_path)
+
+    def tearDown(self):
+        db_manager_module.db_manager.close_pool()
+        self.spool_dir.cleanup()
+
+        os.close(self.db_fd)
+        try:
+            os.remove(self.db_path)
+        except OSError:
+            pass
+
+        # Restore db_manager
+        db_manager_module.db_manager.db_type = self.original_db_type
+        if self.original_finance_db:
+            db_manager_module.db_manager.finance_db = self.original_finance_db
+
+    def _parquet(self, df, row_group_size=None):
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, row_group_size=row_group_size)
+        buffer.seek(0)
+        return buffer
+
+    def test_upload_all_streams_row_groups(self):
+        df_asset = pd.DataFrame({
+            'date': pd.date_range('2025-01-01', periods=10),
+            '資産名': ['A'] * 10,
+            '資産額': [float(i) for i in range(10)],
+            '件数': pd.array([1, None] * 5, dtype='Int64'),
+        })
+        df_small = pd.DataFrame({'date': pd.to_datetime(['2025-01-01']), 'value': [1]})
+
+        data = {
+            # 3行ずつの行グループに分けて送る
+            'file_asset_profit_detail': (self._parquet(df_asset, row_group_size=3), 'asset.parquet'),
+            'file_balance_detail': (self._parquet(df_small), 'balance.parquet'),
+            'file_target_asset_profit': (self._parquet(df_small), 'target.parquet'),
+            'file_target_parameter': (self._parquet(df_small), 'parameter.parquet'),
+            'file_target_rate': (self._parquet(df_small), 'rate.parquet'),
+            'file_asset_attribute': (self._parquet(df_small), 'asset_attribute.parquet'),
+            # 0行のファイルでもテーブルは作成される
+            'file_item_attribute': (self._parquet(df_small.head(0)), 'item_attribute.parquet'),
+        }
+        response = self.client.post('/api/data/upload/all', data=data)
+
+        self.assertEqual(response.status_code, 200, f"Response was: {response.data.decode('utf-8')}")
+        body = response.get_json()
+        self.assertEqual(body["rows"]["asset_profit_detail"], 10)
+        self.assertEqual(body["rows"]["item_attribute"], 0)
+
+        with sqlite3.connect(self.db_path) as conn:
+            df_read = pd.read_sql_query('SELECT * FROM asset_profit_detail ORDER BY date', conn)
+            item_count = conn.execute('SELECT COUNT(*) FROM item_attribute').fetchone()[0]
+        self.assertEqual(df_read['資産額'].tolist(), df_asset['資産額'].tolist())
+        self.assertEqual(df_read['件数'].isna().sum(), 5)
+        self.assertEqual(item_count, 0)
+
+    def _session_files(self):
+        df_asset = pd.DataFrame({
+            'date': pd.date_range('2025-01-01', periods=200),
+            '資産名': ['A'] * 200,
+            '資産額': [float(i) for i in range(200)],
+        })
+        df_small = pd.DataFrame({'date': pd.to_datetime(['2025-01-01']), 'value': [1]})
+        files = {'file_asset_profit_detail': self._parquet(df_asset).getvalue()}
+        for table in ['balance_detail', 'target_asset_profit', 'target_parameter',
+                      'target_rate', 'asset_attribute', 'item_attribute']:
+            files[f'file_{table}'] = self._parquet(df_small).getvalue()
+        return files
+
+    def _create_session(self, files):
+        response = self.client.post('/api/data/upload/session', json={
+            'mode': 'full',
+            'files': {
+                key: {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}
+                for key, data in files.items()
+            },
+        })
+        self.assertEqual(response.status_code, 201, response.data.decode('utf-8'))
+        return response.get_json()
+
+    def test_chunked_session_resumes_and_skips_unchanged(self):
+        files = self._session_files()
+        session = self._create_session(files)
+        url = f"/api/data/upload/session/{session['session_id']}"
+        key = 'file_asset_profit_detail'
+        data = files[key]
+
+        # 最初のチャンクだけ送って中断する
+        response = self.client.put(f'{url}/{key}?offset=0', data=data[:1000])
+        self.assertEqual(response.get_json()['received'], 1000)
+        # offset がずれている場合は受信済み位置が返る
+        response = self.client.put(f'{url}/{key}?offset=0', data=data[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['received'], 1000)
+        self.assertEqual(self.client.post(f'{url}/commit').status_code, 409)
+
+        # 新しいセッションでも続きから再開できる
+        session = self._create_session(files)
+        self.assertEqual(session['files'][key]['received'], 1000)
+        url = f"/api/data/upload/session/{session['session_id']}"
+        for file_key, progress in session['files'].items():
+            offset = progress['received']
+            while offset < len(files[file_key]):
+                response = self.client.put(
+                    f'{url}/{file_key}?offset={offset}', data=files[file_key][offset:offset + 4096]
+                )
+                offset = response.get_json()['received']
+        self.assertEqual(self.client.get(url).get_json()['received_bytes'], sum(len(d) for d in files.values()))
+
+        response = self.client.post(f'{url}/commit')
+        self.assertEqual(response.status_code, 200, response.data.decode('utf-8'))
+        self.assertEqual(response.get_json()['rows']['asset_profit_detail'], 200)
+
+        # 同じファイルは送信不要
+        session = self._create_session(files)
+        self.assertTrue(all(f['status'] == 'unchanged' for f in session['files'].values()))
+        self.assertEqual(session['total_bytes'], 0)
+
+    def _upload_all(self, url, files):
+        # 同じ内容のファイルは spool を共有するため、受信済みのものは送らない
+        for file_key, data in files.items():
+            received = self.client.get(url).get_json()['files'][file_key]['received']
+            if received < len(data):
+                response = self.client.put(f'{url}/{file_key}?offset={received}', data=data[received:])
+                self.assertEqual(response.status_code, 200, response.data.decode('utf-8'))
+
+    def test_conflicts_return_json(self):
+        files = self._session_files()
+        session = self._create_session(files)
+        url = f"/api/data/upload/session/{session['session_id']}"
+        key = 'file_asset_profit_detail'
+
+        # 宣言より多く届いた場合は spool を消し、先頭から送り直させる
+        response = self.client.put(f'{url}/{key}?offset=0', data=files[key] + b'extra')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['received'], 0)
+        self.assertEqual(self.client.get(url).get_json()['files'][key]['received'], 0)
+
+        # 進捗の確認後に spool が消えた場合（同じ内容の別セッションの commit など）も JSON で返す
+        self._upload_all(url, files)
+        original_progress = routes_data._session_progress
+        def progress_then_remove(session):
+            progress = original_progress(session)
+            os.remove(routes_data._part_path(hashlib.sha256(files[key]).hexdigest()))
+            return progress
+        with mock.patch.object(routes_data, '_session_progress', side_effect=progress_then_remove):
+            response = self.client.post(f'{url}/commit')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['file'], key)
+
+    def test_delta_session_requires_cutoff(self):
+        files = {
+            key: {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}
+            for key, data in self._session_files().items()
+        }
+        response = self.client.post('/api/data/upload/session', json={'mode': 'delta', 'files': files})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/data/upload/session', json={
+            'mode': 'delta', 'cutoff': '2025-01-10', 'files': files
+        })
+        self.assertEqual(response.status_code, 201, response.data.decode('utf-8'))
+
+if __name__ == '__main__':
+    unittest.main()